@@ -29,7 +29,10 @@ logging.getLogger("discord.http").setLevel(logging.WARNING)
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.config.settings import settings
+from src.database.sqlite_backend import create_database_manager
 from src.database.supabase_models import DatabaseManager
+from src.database.instrumentation import db_metrics, start_metrics_server, stop_metrics_server
+from src.database.transport import close_supabase_client
 from src.utils.helpers import (
     create_embed,
     embed_helper,
@@ -38,7 +41,8 @@ from src.utils.helpers import (
     safe_send_message,
     system_helper,
 )
-from src.utils.logger import get_logger, log_critical, log_startup_verification, log_system
+from src.utils.logger import get_logger, log_critical, log_startup_verification, log_system, log_watchdog
+from src.utils.migration_check import verify_schema
 
 
 class MalaBoT(commands.Bot):
@@ -63,6 +67,7 @@ class MalaBoT(commands.Bot):
         # Core components
         self.db_manager: Optional[DatabaseManager] = None
         self.scheduler: Optional[AsyncIOScheduler] = None
+        self.metrics_runner = None
         self.start_time: Optional[datetime] = None
         self.safe_mode: bool = False
         self.logger = get_logger("bot")
@@ -215,10 +220,24 @@ class MalaBoT(commands.Bot):
     async def _initialize_database(self):
         """Initialize database connection."""
         try:
-            self.db_manager = DatabaseManager()
+            self.db_manager = create_database_manager()
             await self.db_manager.initialize()
+            await self.db_manager.start_xp_buffer()
+            await self.db_manager.start_audit_pipeline()
+            await self.db_manager.start_departure_cleanup()
+            await self.db_manager.start_table_mirror()
             self.logger.info("Database initialized successfully")
 
+            if settings.ENABLE_STARTUP_VERIFICATION:
+                # Logs any tables, columns or hot-path indexes missing, with the DDL to add them
+                await verify_schema(self.db_manager)
+
+            if db_metrics.enabled and settings.DB_METRICS_PORT:
+                try:
+                    self.metrics_runner = await start_metrics_server(settings.DB_METRICS_PORT)
+                except Exception as e:
+                    self.logger.warning(f"Could not start metrics endpoint: {e}")
+
             # Log startup event
             await self.db_manager.log_event(
                 category="SYSTEM",
@@ -361,6 +380,15 @@ The bot will start in safe mode to prevent further issues.
         # Start daily digest task
         asyncio.create_task(self._daily_digest_task())
 
+        # Prune zero-XP users rows; lookups no longer create them, but older ones remain
+        if self.scheduler and self.db_manager and settings.USER_PRUNE_INTERVAL > 0:
+            self.scheduler.add_job(
+                self._prune_placeholder_users,
+                "interval",
+                hours=settings.USER_PRUNE_INTERVAL,
+                next_run_time=datetime.now() + timedelta(minutes=5),
+            )
+
         # Birthday check is handled by the birthdays cog
 
     async def _health_monitor_loop(self):
@@ -368,22 +396,19 @@ The bot will start in safe mode to prevent further issues.
         while self.is_ready():
             try:
                 if self.db_manager:
-                    # Check database connection
+                    # Check database connection. Outages are ridden out by the executor's
+                    # circuit breaker, so they don't set the crash flag (which forces safe mode)
                     try:
-                        await self.db_manager.get_connection()
+                        await self.db_manager.ping()
                         await self.db_manager.log_health_check("database", "OK")
                     except Exception as e:
                         await self.db_manager.log_health_check(
                             "database", "CRITICAL", details=str(e)
                         )
-                        # Set crash flag for recovery
-                        await self.db_manager.set_flag(
-                            "crash_detected", "database_connection_lost"
-                        )
 
                 # Check system resources
                 sys_info = get_system_info()
-                if sys_info:
+                if sys_info and self.db_manager:
                     if sys_info.get("cpu_percent", 0) > 80:
                         await self.db_manager.log_health_check(
                             "cpu",
@@ -391,6 +416,10 @@ The bot will start in safe mode to prevent further issues.
                             sys_info["cpu_percent"],
                             "High CPU usage detected",
                         )
+                    else:
+                        await self.db_manager.log_health_check(
+                            "cpu", "OK", sys_info.get("cpu_percent")
+                        )
 
                     if sys_info.get("memory_percent", 0) > 80:
                         await self.db_manager.log_health_check(
@@ -399,6 +428,10 @@ The bot will start in safe mode to prevent further issues.
                             sys_info["memory_percent"],
                             "High memory usage detected",
                         )
+                    else:
+                        await self.db_manager.log_health_check(
+                            "memory", "OK", sys_info.get("memory_percent")
+                        )
 
                 await asyncio.sleep(300)  # Check every 5 minutes
 
@@ -419,6 +452,24 @@ The bot will start in safe mode to prevent further issues.
                         "latency", "CRITICAL", latency, "Bot appears to be unresponsive"
                     )
                     await self.db_manager.set_flag("crash_detected", "high_latency")
+                elif latency:
+                    await self.db_manager.log_health_check("latency", "OK", latency)
+
+                # Report the database circuit; an open circuit means queries are failing fast
+                db_state = self.db_manager.get_database_state()
+                if db_state["state"] == "closed":
+                    await self.db_manager.log_health_check("database_circuit", "OK")
+                else:
+                    log_watchdog(
+                        "DATABASE_CIRCUIT",
+                        f"Circuit {db_state['state']} for {db_state['open_for']:.0f}s: {db_state['last_error']}",
+                    )
+                    await self.db_manager.log_health_check(
+                        "database_circuit",
+                        "CRITICAL" if db_state["state"] == "open" else "WARNING",
+                        db_state["open_for"],
+                        db_state["last_error"],
+                    )
 
                 # Check if logs are being updated
                 current_time = datetime.now()
@@ -426,6 +477,8 @@ The bot will start in safe mode to prevent further issues.
                     await self.db_manager.log_health_check(
                         "logs", "WARNING", details="No log updates detected recently"
                     )
+                else:
+                    await self.db_manager.log_health_check("logs", "OK")
 
                 last_log_time = current_time
                 await asyncio.sleep(settings.WATCHDOG_INTERVAL)
@@ -434,6 +487,15 @@ The bot will start in safe mode to prevent further issues.
                 self.logger.error(f"Watchdog error: {e}")
                 await asyncio.sleep(60)
 
+    async def _prune_placeholder_users(self):
+        """Maintenance job: bulk-delete users rows that hold no XP."""
+        try:
+            removed = await self.db_manager.prune_placeholder_users()
+            if removed:
+                log_system(f"Pruned {removed} zero-XP user rows")
+        except Exception as e:
+            self.logger.error(f"User prune failed: {e}")
+
     async def _daily_digest_task(self):
         """Daily digest task for owner notifications."""
         while True:
@@ -482,43 +544,22 @@ The bot will start in safe mode to prevent further issues.
                 else "Unknown"
             )
 
-            # Get recent audit logs for statistics
-            recent_logs = await self.db_manager.get_audit_logs(guild_id, 1000)
-            stats = await self.db_manager.get_daily_digest_stats(guild_id)
+            # Today's audit counts across every guild, grouped in the database
+            stats = await self.db_manager.get_daily_digest_stats()
 
             digest_data = {
                 "date": datetime.now().strftime("%Y-%m-%d"),
                 "uptime": uptime,
-                "active_users": len(
-                    set(log["user_id"] for log in recent_logs if log["user_id"])
-                ),
-                "total_xp": sum(
-                    1
-                    for log in recent_logs
-                    if log["category"] == "XP" and log["action"] == "GAIN"
-                ),
-                "birthdays": sum(
-                    1
-                    for log in recent_logs
-                    if log["category"] == "BDAY" and log["action"] == "CELEBRATED"
-                ),
+                "total_xp": stats["xp_gains"],
+                "birthdays": stats["birthdays"],
                 "total_logs": stats["total_logs"],
                 "critical_events": stats["critical_events"],
                 "warnings": stats["warnings"],
                 "moderation_actions": stats["moderation_actions"],
                 "user_events": stats["user_events"],
                 "commands": stats["total_logs"],
-                "restarts": sum(
-                    1
-                    for log in recent_logs
-                    if log["category"] == "SYSTEM"
-                    and log["action"] in ["STARTUP", "RESTART"]
-                ),
-                "errors": sum(
-                    1
-                    for log in recent_logs
-                    if log["category"] == "SYSTEM" and "ERROR" in log["action"].upper()
-                ),
+                "restarts": stats["restarts"],
+                "errors": stats["errors"],
                 "memory": f"{get_system_info().get('memory_used_mb', 'Unknown')} MB",
                 "db_size": "Supabase Cloud",
             }
@@ -557,7 +598,7 @@ The bot will start in safe mode to prevent further issues.
 
             # Send to owner(s)
             for owner_id in settings.OWNER_IDS:
-                owner = self.get_user(owner_id, interaction.guild.id)
+                owner = self.get_user(owner_id)
                 if owner:
                     try:
                         await owner.send(embed=embed)
@@ -652,6 +693,20 @@ The bot will start in safe mode to prevent further issues.
                 details=f"Left guild: {guild.name}",
             )
 
+    async def on_member_join(self, member: discord.Member):
+        """Called when a member joins; a quick rejoin keeps their data."""
+        if self.db_manager:
+            self.db_manager.cancel_departure_cleanup(member.id, member.guild.id)
+
+    async def on_member_remove(self, member: discord.Member):
+        """Called when a member leaves; their data is removed once here for every cog."""
+        if self.db_manager:
+            try:
+                # XP, birthday, verification and pending appeals, deleted in the next cleanup batch
+                await self.db_manager.cleanup_departed_member(member.id, member.guild.id)
+            except Exception as e:
+                self.logger.error(f"Error cleaning up data for {member.id} leaving guild {member.guild.id}: {e}")
+
     async def on_command_error(
         self, ctx: commands.Context, error: commands.CommandError
     ):
@@ -716,10 +771,25 @@ The bot will start in safe mode to prevent further issues.
             except Exception as e:
                 self.logger.warning(f"Error closing Discord connection: {e}")
 
+            # Drain buffered XP now that no more events can arrive
+            if self.db_manager and self.db_manager.xp_buffer:
+                try:
+                    flushed = await self.db_manager.xp_buffer.flush()
+                    self.logger.info(f"Flushed {flushed} buffered XP rows")
+                except Exception as e:
+                    self.logger.warning(f"Error flushing XP buffer (journal kept for next start): {e}")
+
+            if self.metrics_runner:
+                try:
+                    await stop_metrics_server(self.metrics_runner)
+                except Exception as e:
+                    self.logger.warning(f"Error stopping metrics endpoint: {e}")
+
             # Close database connection (do this last to ensure all operations complete)
             if self.db_manager:
                 try:
                     await self.db_manager.close()
+                    close_supabase_client()
                     self.logger.info("Database connection closed")
                 except Exception as e:
                     self.logger.warning(f"Error closing database: {e}")
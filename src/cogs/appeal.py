@@ -328,21 +328,6 @@ class Appeal(commands.Cog):
         if hasattr(self, "_appeal_group"):
             self.bot.tree.remove_command(self._appeal_group.name)
 
-    @commands.Cog.listener()
-    async def on_member_remove(self, member: discord.Member):
-        """Cancel pending appeals when a user leaves the server"""
-        try:
-            # Update any pending appeals to cancelled status using Supabase
-            self.bot.db_manager.supabase.table('appeals').update({
-                'status': 'cancelled'
-            }).eq('user_id', str(member.id)).eq('guild_id', str(member.guild.id)).eq('status', 'pending').execute()
-
-            log_system(
-                f"[APPEAL] Cancelled pending appeals for {member.name} (left server)"
-            )
-        except Exception as e:
-            log_system(f"Error cancelling appeals on member leave: {e}", level="error")
-
 
 async def setup(bot: commands.Bot):
     appeal_cog = Appeal(bot)
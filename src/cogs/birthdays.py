@@ -155,9 +155,10 @@ class BirthdayModal(discord.ui.Modal, title="Set Your Birthday"):
                 try:
                     from datetime import datetime
                     import pytz
-                    birthday_time_str = await self.bot.db_manager.get_setting('birthday_time', guild_id)
-                    timezone_str = await self.bot.db_manager.get_setting('timezone', guild_id)
-                    birthday_channel_id = await self.bot.db_manager.get_setting('birthday_channel', guild_id)
+                    config = await self.bot.db_manager.get_settings(guild_id, ['birthday_time', 'timezone', 'birthday_channel'])
+                    birthday_time_str = config['birthday_time']
+                    timezone_str = config['timezone']
+                    birthday_channel_id = config['birthday_channel']
                     if birthday_time_str and birthday_channel_id:
                         hour, minute = map(int, birthday_time_str.split(':'))
                         tz = pytz.timezone(timezone_str) if timezone_str else pytz.UTC
@@ -211,21 +212,6 @@ class Birthdays(commands.Cog):
         self.logger = get_logger("birthdays")
         # Type ignore to handle MyPy Bot class attribute issue
         self.db = bot.db_manager  # type: ignore
-    @commands.Cog.listener()
-    async def on_member_remove(self, member: discord.Member):
-        """Clean up user data when they leave the server."""
-        try:
-            # Remove birthday data
-            await self.bot.db_manager.remove_user_birthday(member.id, member.guild.id)
-            self.logger.info(f"Removed birthday data for {member.name} ({member.id}) who left guild {member.guild.id}")
-            
-            # Remove XP data for this guild
-            self.bot.db_manager.supabase.table('users').delete().eq('user_id', member.id).eq('guild_id', member.guild.id).execute()
-            self.logger.info(f"Removed XP data for {member.name} ({member.id}) in guild {member.guild.id}")
-            
-        except Exception as e:
-            self.logger.error(f"Error cleaning up data for user {member.id} leaving guild {member.guild.id}: {e}")
-
 
     @app_commands.command(name="bday", description="Birthday commands")
     @app_commands.describe(action="What birthday action would you like to perform?")
@@ -494,18 +480,23 @@ class Birthdays(commands.Cog):
             for guild in self.bot.guilds:
                 guild_id = guild.id
                 
-                # Check if birthday announcements are enabled
-                announcements_enabled = await self.bot.db_manager.get_setting("birthday_announcements_enabled", guild_id)
+                # Get birthday settings in one query
+                config = await self.bot.db_manager.get_settings(guild_id, [
+                    "birthday_announcements_enabled",
+                    "birthday_channel",
+                    "birthday_time",
+                    "birthday_message",
+                    "timezone",
+                ])
                 
                 # Skip if disabled (default to enabled if not set)
-                if announcements_enabled == "false":
+                if config["birthday_announcements_enabled"] == "false":
                     continue
                 
-                # Get birthday settings
-                birthday_channel_id = await self.bot.db_manager.get_setting("birthday_channel", guild_id)
-                birthday_time = await self.bot.db_manager.get_setting("birthday_time", guild_id)
-                birthday_message = await self.bot.db_manager.get_setting("birthday_message", guild_id)
-                timezone_str = await self.bot.db_manager.get_setting("timezone", guild_id)
+                birthday_channel_id = config["birthday_channel"]
+                birthday_time = config["birthday_time"]
+                birthday_message = config["birthday_message"]
+                timezone_str = config["timezone"]
                 
 
                 # Check if current time is past the configured announcement time
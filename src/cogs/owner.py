@@ -16,6 +16,7 @@ from discord.ext import commands
 
 from src.config.constants import COLORS
 from src.config.settings import settings
+from src.database.instrumentation import db_metrics
 from src.utils.helpers import (
     embed_helper,
     get_system_info,
@@ -48,6 +49,9 @@ class Owner(commands.Cog):
             app_commands.Choice(name="shutdown", value="shutdown"),
             app_commands.Choice(name="clearcrash", value="clearcrash"),
             app_commands.Choice(name="setonline", value="setonline"),
+            app_commands.Choice(name="reloadsettings", value="reloadsettings"),
+            app_commands.Choice(name="health", value="health"),
+            app_commands.Choice(name="metrics", value="metrics"),
         ]
     )
     async def owner(self, interaction: discord.Interaction, action: str):
@@ -81,6 +85,12 @@ class Owner(commands.Cog):
                 await self._owner_clearcrash(interaction)
             elif action == "setonline":
                 await self._owner_setonline(interaction)
+            elif action == "reloadsettings":
+                await self._owner_reloadsettings(interaction)
+            elif action == "health":
+                await self._owner_health(interaction)
+            elif action == "metrics":
+                await self._owner_metrics(interaction)
             else:
                 embed = embed_helper.error_embed(
                     title="Unknown Action",
@@ -145,6 +155,81 @@ class Owner(commands.Cog):
                 inline=True,
             )
 
+            if self.bot.db_manager:
+                db_stats = self.bot.db_manager.get_executor_stats()
+                embed.add_field(
+                    name=" Database Queue",
+                    value=f"Queued: {db_stats['queued']} (peak {db_stats['peak_queued']})\n"
+                    f"Running: {db_stats['running']}/{db_stats['max_workers']}\n"
+                    f"Avg Wait: {db_stats['avg_wait_ms']:.1f}ms (max {db_stats['max_wait_ms']:.1f}ms)\n"
+                    f"Queries: {db_stats['total_queries']:,} ({db_stats['total_errors']} errors, {db_stats['total_retries']} retries)\n"
+                    f"Circuit: {db_stats['circuit']}",
+                    inline=True,
+                )
+
+            if self.bot.db_manager and self.bot.db_manager.xp_buffer:
+                xp_stats = self.bot.db_manager.xp_buffer.get_stats()
+                embed.add_field(
+                    name=" XP Buffer",
+                    value=f"Pending: {xp_stats['pending']} (tracking {xp_stats['tracked']})\n"
+                    f"Events: {xp_stats['events']:,}\n"
+                    f"Rows Written: {xp_stats['rows_written']:,} in {xp_stats['flushes']} flushes\n"
+                    f"Last Flush: {xp_stats['last_flush_ms']:.1f}ms",
+                    inline=True,
+                )
+
+            if self.bot.db_manager and self.bot.db_manager.audit_pipeline:
+                audit_stats = self.bot.db_manager.audit_pipeline.get_stats()
+                embed.add_field(
+                    name=" Audit Queue",
+                    value=f"Queued: {audit_stats['queued']}/{audit_stats['max_queue']} ({audit_stats['policy']})\n"
+                    f"Written: {audit_stats['written']:,}\n"
+                    f"Dropped: {audit_stats['dropped']:,} ({audit_stats['failed_flushes']} failed flushes)",
+                    inline=True,
+                )
+
+            if self.bot.db_manager and self.bot.db_manager.departure_cleanup:
+                departure_stats = self.bot.db_manager.departure_cleanup.get_stats()
+                embed.add_field(
+                    name=" Departure Cleanup",
+                    value=f"Queued: {departure_stats['queued']} ({departure_stats['cancelled']} rejoined)\n"
+                    f"Cleaned: {departure_stats['cleaned']:,} in {departure_stats['batches']} batches\n"
+                    f"Failed Flushes: {departure_stats['failed_flushes']}",
+                    inline=True,
+                )
+
+            xp_cog = self.bot.get_cog("XP")
+            if xp_cog:
+                voice_stats = xp_cog.voice_sessions.get_stats()
+                embed.add_field(
+                    name=" Voice Sessions",
+                    value=f"Active: {voice_stats['active']} ({voice_stats['eligible']} earning)\n"
+                    f"Credited: {voice_stats['credited_minutes']:,} min in {voice_stats['ticks']} ticks\n"
+                    f"Failed Ticks: {voice_stats['failed_ticks']}",
+                    inline=True,
+                )
+
+            if self.bot.db_manager:
+                flight_stats = self.bot.db_manager.single_flight.get_stats()
+                embed.add_field(
+                    name=" Coalesced Reads",
+                    value=f"Shared: {flight_stats['coalesced']:,} of {flight_stats['calls']:,} "
+                    f"({flight_stats['hit_rate']:.1f}%)\n"
+                    f"In Flight: {flight_stats['inflight']}",
+                    inline=True,
+                )
+
+            if self.bot.db_manager and self.bot.db_manager.table_mirror:
+                mirror_stats = self.bot.db_manager.table_mirror.get_stats()
+                rows = mirror_stats["rows"]
+                embed.add_field(
+                    name=" Table Mirror",
+                    value=f"Settings: {rows['settings']:,} | Level Roles: {rows['level_roles']:,} | Birthdays: {rows['birthdays']:,}\n"
+                    f"Refreshed {mirror_stats['seconds_since_refresh']:.0f}s ago "
+                    f"({mirror_stats['failed_refreshes']} failed)",
+                    inline=True,
+                )
+
             embed.set_footer(
                 text=f"Status requested by {interaction.user.display_name}"
             )
@@ -224,6 +309,151 @@ class Owner(commands.Cog):
             self.logger.error(f"Error clearing crash flags: {e}")
             await self._error_response(interaction, "Failed to clear crash flags")
 
+    async def _owner_reloadsettings(self, interaction: discord.Interaction):
+        """Drop the in-memory settings cache so edits made outside the bot apply now."""
+        try:
+            if self.bot.db_manager:
+                stats = self.bot.db_manager.settings_cache.get_stats()
+                self.bot.db_manager.invalidate_settings()
+                if self.bot.db_manager.table_mirror:
+                    # Mirrored settings are served ahead of the cache, so reload them too
+                    await self.bot.db_manager.table_mirror.resync()
+
+                embed = embed_helper.success_embed(
+                    title=" Settings Cache Cleared",
+                    description=f"Dropped {stats['entries']} cached settings across {stats['guilds']} servers.\n"
+                    f"Hit rate before reload: {stats['hit_rate']:.1f}%",
+                )
+
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                self.logger.info(f"Settings cache cleared by owner {interaction.user.id}")
+            else:
+                embed = embed_helper.error_embed(
+                    title="Database Error",
+                    description="Database is not available.",
+                )
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            self.logger.error(f"Error clearing settings cache: {e}")
+            await self._error_response(interaction, "Failed to clear settings cache")
+
+    async def _owner_metrics(self, interaction: discord.Interaction):
+        """Show which database methods and tables take the most time."""
+        try:
+            if not db_metrics.enabled:
+                embed = embed_helper.error_embed(
+                    title="Metrics Disabled",
+                    description="Set DB_METRICS_ENABLED=true and restart to record database metrics.",
+                )
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
+
+            snapshot = db_metrics.snapshot()
+            embed = embed_helper.create_embed(
+                title=" Database Metrics",
+                description=f"Recorded since <t:{int(snapshot['since'])}:R>",
+                color=COLORS["info"],
+            )
+
+            def fmt(name, s):
+                return (
+                    f"**{name}** {s['calls']:,} calls, {s['errors']} err, {s['rows']:,} rows\n"
+                    f"  p50 {s['p50_ms']:.1f} / p95 {s['p95_ms']:.1f} / p99 {s['p99_ms']:.1f}ms, "
+                    f"total {s['total_ms'] / 1000:.1f}s"
+                )
+
+            methods = list(snapshot["methods"].items())[:8]
+            if methods:
+                embed.add_field(
+                    name=" Top Methods (by total time)",
+                    value="\n".join(fmt(name, s) for name, s in methods)[:1024],
+                    inline=False,
+                )
+
+            tables = sorted(snapshot["tables"].items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[:8]
+            if tables:
+                embed.add_field(
+                    name=" Tables",
+                    value="\n".join(fmt(name, s) for name, s in tables)[:1024],
+                    inline=False,
+                )
+
+            if not methods and not tables:
+                embed.description = "No database calls recorded yet."
+
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            self.logger.error(f"Error showing database metrics: {e}")
+            await self._error_response(interaction, "Failed to show database metrics")
+
+    async def _owner_health(self, interaction: discord.Interaction):
+        """Show recent health history from memory (no database queries)."""
+        try:
+            if not self.bot.db_manager:
+                embed = embed_helper.error_embed(
+                    title="Database Error",
+                    description="Database is not available.",
+                )
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
+
+            ring = self.bot.db_manager.health_ring
+            embed = embed_helper.create_embed(
+                title=" Health History",
+                description="Recent health checks held in memory",
+                color=COLORS["info"],
+            )
+
+            latest = ring.latest()
+            if latest:
+                embed.add_field(
+                    name=" Current",
+                    value="\n".join(
+                        f"**{name}**: {status}"
+                        + (f" ({value:.2f})" if value is not None else "")
+                        + f" <t:{int(ts)}:R>"
+                        for name, (ts, status, value, _) in sorted(latest.items())
+                    ),
+                    inline=False,
+                )
+
+            problems = [s for s in ring.recent(limit=200) if s[2] != "OK"][:5]
+            if problems:
+                embed.add_field(
+                    name=" Recent Issues",
+                    # Details can be whole exception messages; keep the field under Discord's limit
+                    value="\n".join(
+                        f"<t:{int(ts)}:R> **{name}** {status}" + (f" - {details[:150]}" if details else "")
+                        for ts, name, status, value, details in problems
+                    )[:1024],
+                    inline=False,
+                )
+
+            rollups = ring.rollups(limit=6)
+            if rollups:
+                embed.add_field(
+                    name=" Rollups",
+                    value="\n".join(
+                        f"<t:{int(r['end'])}:t> **{r['component']}** {r['status']} "
+                        f"({r['count']} samples, {r['non_ok']} non-OK"
+                        + (f", avg {r['avg']:.2f}" if r["avg"] is not None else "")
+                        + ")"
+                        for r in rollups
+                    ),
+                    inline=False,
+                )
+
+            if not latest:
+                embed.description = "No health samples recorded yet."
+
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            self.logger.error(f"Error showing health history: {e}")
+            await self._error_response(interaction, "Failed to show health history")
+
     async def _owner_setonline(self, interaction: discord.Interaction):
         """Set online message configuration."""
         try:
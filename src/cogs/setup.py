@@ -279,12 +279,16 @@ class VerificationSetupView(View):
         label="View Current Config", style=discord.ButtonStyle.secondary)
     async def view_config(self, interaction: discord.Interaction, button: Button):
         """View current verification configuration"""
-        verify_channel_id = await self.db.get_setting("verify_channel", self.guild.id)
-        verify_role_id = await self.db.get_setting("verify_role", self.guild.id)
-        cheater_role_id = await self.db.get_setting("cheater_role", self.guild.id)
-        cheater_jail_id = await self.db.get_setting(
-            "cheater_jail_channel", self.guild.id
-        )
+        config = await self.db.get_settings(self.guild.id, [
+            "verify_channel",
+            "verify_role",
+            "cheater_role",
+            "cheater_jail_channel",
+        ])
+        verify_channel_id = config["verify_channel"]
+        verify_role_id = config["verify_role"]
+        cheater_role_id = config["cheater_role"]
+        cheater_jail_id = config["cheater_jail_channel"]
 
         config_text = ""
         if verify_channel_id:
@@ -686,12 +690,17 @@ class GeneralSettingsView(View):
         label="View Current Config", style=discord.ButtonStyle.secondary)
     async def view_config(self, interaction: discord.Interaction, button: Button):
         """View current general settings"""
-        timezone = await self.db.get_setting("timezone", self.guild_id)
-        online_message = await self.db.get_setting("online_message", self.guild_id)
-        online_channel_id = await self.db.get_setting(
-            "online_message_channel", self.guild_id
-        )
-        mod_role_id = await self.db.get_setting("mod_role", self.guild_id)
+        config = await self.db.get_settings(self.guild_id, [
+            "timezone",
+            "online_message",
+            "online_message_channel",
+            "mod_role",
+            "onboarding_role",
+        ])
+        timezone = config["timezone"]
+        online_message = config["online_message"]
+        online_channel_id = config["online_message_channel"]
+        mod_role_id = config["mod_role"]
         mod_role_text = "Not set"
         if mod_role_id:
             try:
@@ -708,7 +717,7 @@ class GeneralSettingsView(View):
             online_channel_text = f"<#{online_channel_id}>"
 
         # Get onboarding role
-        onboarding_role_id = await self.db.get_setting("onboarding_role", self.guild_id)
+        onboarding_role_id = config["onboarding_role"]
         onboarding_role_text = "Not set"
         if onboarding_role_id:
             try:
@@ -1110,46 +1119,47 @@ class SetupSelect(Select):
         bot = interaction.client
         db = bot.db_manager
         guild_id = interaction.guild.id
-        # Fetch all settings
-        verify_channel_id = await db.get_setting("verify_channel", guild_id)
-        verify_role_id = await db.get_setting("verify_role", guild_id)
-        cheater_role_id = await db.get_setting("cheater_role", guild_id)
-        cheater_jail_id = await db.get_setting("cheater_jail_channel", guild_id)
-        mod_role_id = await db.get_setting("mod_role", guild_id)
-        welcome_channel_id = await db.get_setting("welcome_channel", guild_id)
-        welcome_message = await db.get_setting("welcome_message", guild_id)
-        welcome_title = await db.get_setting("welcome_title", guild_id)
-        goodbye_channel_id = await db.get_setting("goodbye_channel", guild_id)
-        goodbye_message = await db.get_setting("goodbye_message", guild_id)
-        goodbye_title = await db.get_setting("goodbye_title", guild_id)
-        birthday_channel_id = await db.get_setting("birthday_channel", guild_id)
-        birthday_time = await db.get_setting("birthday_time", guild_id)
-        birthday_message = await db.get_setting("birthday_message", guild_id)
-        xp_channel_id = await db.get_setting("xp_channel", guild_id)
-        xp_per_message = await db.get_setting("xp_per_message", guild_id)
-        xp_per_reaction = await db.get_setting("xp_per_reaction", guild_id)
-        xp_per_voice = await db.get_setting("xp_per_voice_minute", guild_id)
-        xp_cooldown = await db.get_setting("xp_cooldown", guild_id)
-        timezone = await db.get_setting("timezone", guild_id)
-        online_message = await db.get_setting("online_message", guild_id)
-        
-        # Fetch all toggle settings
-        welcome_enabled = await db.get_setting("welcome_enabled", guild_id)
-        goodbye_enabled = await db.get_setting("goodbye_enabled", guild_id)
-        birthday_announcements_enabled = await db.get_setting("birthday_announcements_enabled", guild_id)
-        birthday_pending_enabled = await db.get_setting("birthday_pending_enabled", guild_id)
-        xp_message_enabled = await db.get_setting("xp_message_enabled", guild_id)
-        xp_reaction_enabled = await db.get_setting("xp_reaction_enabled", guild_id)
-        xp_voice_enabled = await db.get_setting("xp_voice_enabled", guild_id)
-        
-        # Fetch additional settings
-        welcome_image = await db.get_setting("welcome_image", guild_id)
-        goodbye_image = await db.get_setting("goodbye_image", guild_id)
-        birthday_xp = await db.get_setting("birthday_set_xp", guild_id)
-        birthday_pending_role_id = await db.get_setting("birthday_pending_role", guild_id)
-        birthday_reminder_channel_id = await db.get_setting("birthday_reminder_channel", guild_id)
-        online_channel_id = await db.get_setting("online_message_channel", guild_id)
-        onboarding_role_id = await db.get_setting("onboarding_role", guild_id)
+        # Fetch all settings in a single query
+        config = await db.get_all_settings(guild_id)
+        verify_channel_id = config.get("verify_channel")
+        verify_role_id = config.get("verify_role")
+        cheater_role_id = config.get("cheater_role")
+        cheater_jail_id = config.get("cheater_jail_channel")
+        mod_role_id = config.get("mod_role")
+        welcome_channel_id = config.get("welcome_channel")
+        welcome_message = config.get("welcome_message")
+        welcome_title = config.get("welcome_title")
+        goodbye_channel_id = config.get("goodbye_channel")
+        goodbye_message = config.get("goodbye_message")
+        goodbye_title = config.get("goodbye_title")
+        birthday_channel_id = config.get("birthday_channel")
+        birthday_time = config.get("birthday_time")
+        birthday_message = config.get("birthday_message")
+        xp_channel_id = config.get("xp_channel")
+        xp_per_message = config.get("xp_per_message")
+        xp_per_reaction = config.get("xp_per_reaction")
+        xp_per_voice = config.get("xp_per_voice_minute")
+        xp_cooldown = config.get("xp_cooldown")
+        timezone = config.get("timezone")
+        online_message = config.get("online_message")
+        
+        # Toggle settings
+        welcome_enabled = config.get("welcome_enabled")
+        goodbye_enabled = config.get("goodbye_enabled")
+        birthday_announcements_enabled = config.get("birthday_announcements_enabled")
+        birthday_pending_enabled = config.get("birthday_pending_enabled")
+        xp_message_enabled = config.get("xp_message_enabled")
+        xp_reaction_enabled = config.get("xp_reaction_enabled")
+        xp_voice_enabled = config.get("xp_voice_enabled")
+        
+        # Additional settings
+        welcome_image = config.get("welcome_image")
+        goodbye_image = config.get("goodbye_image")
+        birthday_xp = config.get("birthday_set_xp")
+        birthday_pending_role_id = config.get("birthday_pending_role")
+        birthday_reminder_channel_id = config.get("birthday_reminder_channel")
+        online_channel_id = config.get("online_message_channel")
+        onboarding_role_id = config.get("onboarding_role")
 
         embed = discord.Embed(
             title=" Current Bot Configuration",
@@ -1485,11 +1495,18 @@ class WelcomeSetupView(View):
     @discord.ui.button(label="View Config", style=ButtonStyle.secondary, row=1)
     async def view_welcome_config(self, interaction: discord.Interaction, button: Button):
         """View current welcome configuration"""
-        welcome_channel_id = await self.db_manager.get_setting("welcome_channel", self.guild_id)
-        welcome_title = await self.db_manager.get_setting("welcome_title", self.guild_id)
-        welcome_message = await self.db_manager.get_setting("welcome_message", self.guild_id)
-        welcome_enabled = await self.db_manager.get_setting("welcome_enabled", self.guild_id)
-        welcome_image = await self.db_manager.get_setting("welcome_image", self.guild_id)
+        config = await self.db_manager.get_settings(self.guild_id, [
+            "welcome_channel",
+            "welcome_title",
+            "welcome_message",
+            "welcome_enabled",
+            "welcome_image",
+        ])
+        welcome_channel_id = config["welcome_channel"]
+        welcome_title = config["welcome_title"]
+        welcome_message = config["welcome_message"]
+        welcome_enabled = config["welcome_enabled"]
+        welcome_image = config["welcome_image"]
         
         config_text = ""
         if welcome_channel_id:
@@ -1689,11 +1706,18 @@ class GoodbyeSetupView(View):
     @discord.ui.button(label="View Config", style=ButtonStyle.secondary, row=1)
     async def view_goodbye_config(self, interaction: discord.Interaction, button: Button):
         """View current goodbye configuration"""
-        goodbye_channel_id = await self.db_manager.get_setting("goodbye_channel", self.guild_id)
-        goodbye_title = await self.db_manager.get_setting("goodbye_title", self.guild_id)
-        goodbye_message = await self.db_manager.get_setting("goodbye_message", self.guild_id)
-        goodbye_enabled = await self.db_manager.get_setting("goodbye_enabled", self.guild_id)
-        goodbye_image = await self.db_manager.get_setting("goodbye_image", self.guild_id)
+        config = await self.db_manager.get_settings(self.guild_id, [
+            "goodbye_channel",
+            "goodbye_title",
+            "goodbye_message",
+            "goodbye_enabled",
+            "goodbye_image",
+        ])
+        goodbye_channel_id = config["goodbye_channel"]
+        goodbye_title = config["goodbye_title"]
+        goodbye_message = config["goodbye_message"]
+        goodbye_enabled = config["goodbye_enabled"]
+        goodbye_image = config["goodbye_image"]
         
         config_text = ""
         if goodbye_channel_id:
@@ -1886,9 +1910,14 @@ class BirthdaySetupView(View):
         
         view = BirthdayPendingSetupView(self.guild_id, self.db_manager)
         
-        enabled = await self.db_manager.get_setting("birthday_pending_enabled", self.guild_id)
-        pending_role_id = await self.db_manager.get_setting("birthday_pending_role", self.guild_id)
-        reminder_channel_id = await self.db_manager.get_setting("birthday_reminder_channel", self.guild_id)
+        config = await self.db_manager.get_settings(self.guild_id, [
+            "birthday_pending_enabled",
+            "birthday_pending_role",
+            "birthday_reminder_channel",
+        ])
+        enabled = config["birthday_pending_enabled"]
+        pending_role_id = config["birthday_pending_role"]
+        reminder_channel_id = config["birthday_reminder_channel"]
         
         status = " Enabled" if enabled == "true" else " Disabled"
         role_text = f"<@&amp;{pending_role_id}>" if pending_role_id else "Not set"
@@ -1959,13 +1988,22 @@ class BirthdaySetupView(View):
     @discord.ui.button(label="View Config", style=ButtonStyle.secondary, row=2)
     async def view_birthday_config(self, interaction: discord.Interaction, button: Button):
         """View current birthday configuration"""
-        birthday_channel_id = await self.db_manager.get_setting("birthday_channel", self.guild_id)
-        birthday_time = await self.db_manager.get_setting("birthday_time", self.guild_id)
-        birthday_message = await self.db_manager.get_setting("birthday_message", self.guild_id)
-        birthday_xp = await self.db_manager.get_setting("birthday_set_xp", self.guild_id)
-        pending_enabled = await self.db_manager.get_setting("birthday_pending_enabled", self.guild_id)
-        pending_role_id = await self.db_manager.get_setting("birthday_pending_role", self.guild_id)
-        reminder_channel_id = await self.db_manager.get_setting("birthday_reminder_channel", self.guild_id)
+        config = await self.db_manager.get_settings(self.guild_id, [
+            "birthday_channel",
+            "birthday_time",
+            "birthday_message",
+            "birthday_set_xp",
+            "birthday_pending_enabled",
+            "birthday_pending_role",
+            "birthday_reminder_channel",
+        ])
+        birthday_channel_id = config["birthday_channel"]
+        birthday_time = config["birthday_time"]
+        birthday_message = config["birthday_message"]
+        birthday_xp = config["birthday_set_xp"]
+        pending_enabled = config["birthday_pending_enabled"]
+        pending_role_id = config["birthday_pending_role"]
+        reminder_channel_id = config["birthday_reminder_channel"]
         
         config_text = "**Birthday Announcements:**\n"
         config_text += f"Channel: <#{birthday_channel_id}>\n" if birthday_channel_id else "Channel: Not set\n"
@@ -2144,10 +2182,16 @@ class BirthdayPendingSetupView(View):
     @discord.ui.button(label="View Config", style=ButtonStyle.secondary, row=2)
     async def view_birthday_pending_config(self, interaction: discord.Interaction, button: Button):
         """View current Birthday Pending system configuration"""
-        enabled = await self.db_manager.get_setting("birthday_pending_enabled", self.guild_id)
-        pending_role_id = await self.db_manager.get_setting("birthday_pending_role", self.guild_id)
-        reminder_channel_id = await self.db_manager.get_setting("birthday_reminder_channel", self.guild_id)
-        reminder_message_id = await self.db_manager.get_setting("birthday_reminder_message_id", self.guild_id)
+        config = await self.db_manager.get_settings(self.guild_id, [
+            "birthday_pending_enabled",
+            "birthday_pending_role",
+            "birthday_reminder_channel",
+            "birthday_reminder_message_id",
+        ])
+        enabled = config["birthday_pending_enabled"]
+        pending_role_id = config["birthday_pending_role"]
+        reminder_channel_id = config["birthday_reminder_channel"]
+        reminder_message_id = config["birthday_reminder_message_id"]
         
         config_text = f"**Status:** {' Enabled' if enabled == 'true' else ' Disabled'}\n"
         
@@ -2633,7 +2677,22 @@ class XPSetupView(View):
         
         async def progression_callback(interaction: discord.Interaction):
             progression_type = select.values[0]
-            await self.db_manager.set_setting("xp_progression_type", progression_type, self.guild_id)
+            await interaction.response.defer(ephemeral=True)
+            try:
+                await self.db_manager.set_setting("xp_progression_type", progression_type, self.guild_id)
+                # Stored levels were computed with the old curve
+                updated = await self.db_manager.recalculate_levels(self.guild_id)
+            except Exception as e:
+                log_system(f"Error setting XP progression type: {e}", level="error")
+                await interaction.followup.send(
+                    embed=create_embed(
+                        "Error",
+                        "Failed to set XP progression type. Please try again.",
+                        COLORS["error"],
+                    ),
+                    ephemeral=True,
+                )
+                return
             
             type_names = {
                 "basic": "Linear (100 XP per level)",
@@ -2643,10 +2702,11 @@ class XPSetupView(View):
             
             embed = discord.Embed(
                 title=" XP Progression Set",
-                description=f"XP progression type set to: **{type_names[progression_type]}**",
+                description=f"XP progression type set to: **{type_names[progression_type]}**\n"
+                f"Recalculated levels for {updated} member(s).",
                 color=COLORS["success"]
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         
         select.callback = progression_callback
         view.add_item(select)
@@ -2778,14 +2838,24 @@ class XPSetupView(View):
     @discord.ui.button(label="View Config", style=ButtonStyle.secondary, row=2)
     async def view_xp_config(self, interaction: discord.Interaction, button: Button):
         """View current XP system configuration"""
-        xp_channel_id = await self.db_manager.get_setting("xp_channel", self.guild_id)
-        xp_per_message = await self.db_manager.get_setting("xp_per_message", self.guild_id)
-        xp_per_reaction = await self.db_manager.get_setting("xp_per_reaction", self.guild_id)
-        xp_per_voice = await self.db_manager.get_setting("xp_per_voice_minute", self.guild_id)
-        xp_cooldown = await self.db_manager.get_setting("xp_cooldown", self.guild_id)
-        message_enabled = await self.db_manager.get_setting("xp_message_enabled", self.guild_id)
-        reaction_enabled = await self.db_manager.get_setting("xp_reaction_enabled", self.guild_id)
-        voice_enabled = await self.db_manager.get_setting("xp_voice_enabled", self.guild_id)
+        config = await self.db_manager.get_settings(self.guild_id, [
+            "xp_channel",
+            "xp_per_message",
+            "xp_per_reaction",
+            "xp_per_voice_minute",
+            "xp_cooldown",
+            "xp_message_enabled",
+            "xp_reaction_enabled",
+            "xp_voice_enabled",
+        ])
+        xp_channel_id = config["xp_channel"]
+        xp_per_message = config["xp_per_message"]
+        xp_per_reaction = config["xp_per_reaction"]
+        xp_per_voice = config["xp_per_voice_minute"]
+        xp_cooldown = config["xp_cooldown"]
+        message_enabled = config["xp_message_enabled"]
+        reaction_enabled = config["xp_reaction_enabled"]
+        voice_enabled = config["xp_voice_enabled"]
         
         config_text = "**Toggles:**\n"
         config_text += f"Message XP: {' Enabled' if message_enabled == 'true' else ' Disabled'}\n"
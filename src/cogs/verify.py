@@ -90,14 +90,14 @@ class PlatformSelect(Select):
             db = bot.db_manager
 
             # Insert verification into Supabase
-            db.supabase.table('verifications').insert({
+            await db.run_query(db.supabase.table('verifications').insert({
                 'user_id': str(self.user_id),
                 'activision_id': self.activision_id,
                 'platform': platform,
                 'screenshot_url': self.screenshot_url,
                 'status': 'pending',
                 'guild_id': str(interaction.guild_id)
-            }).execute()
+            }))
 
             # Delete the platform selection message to clean up the channel
             try:
@@ -331,11 +331,11 @@ class VerifyGroup(app_commands.Group):
                 return
 
             # Update verification in Supabase
-            self.cog.db.supabase.table('verifications').update({
+            await self.cog.db.run_query(self.cog.db.supabase.table('verifications').update({
                 'status': decision_value,
                 'reviewed_by': str(interaction.user.id),
                 'notes': notes
-            }).eq('user_id', str(user.id)).execute()
+            }).eq('user_id', str(user.id)))
 
             guild = interaction.guild
             member = guild.get_member(user.id)
@@ -36,9 +36,21 @@ class Welcome(commands.Cog):
 
             guild_id = member.guild.id
 
+            # Fetch every setting this handler needs in one query
+            guild_settings = await self.bot.db_manager.get_settings(guild_id, [
+                "onboarding_role",
+                "birthday_pending_enabled",
+                "birthday_pending_role",
+                "welcome_enabled",
+                "welcome_channel",
+                "welcome_title",
+                "welcome_message",
+                "welcome_image",
+            ])
+
             # Assign "Onboarding" role to pending members
             if member.pending:
-                onboarding_role_id = await self.bot.db_manager.get_setting("onboarding_role", guild_id)
+                onboarding_role_id = guild_settings["onboarding_role"]
                 if onboarding_role_id:
                     onboarding_role = discord.utils.get(member.guild.roles, id=int(onboarding_role_id))
                     if onboarding_role:
@@ -51,9 +63,9 @@ class Welcome(commands.Cog):
                         self.logger.warning(f"Onboarding role ID {onboarding_role_id} not found in guild")
 
             # Assign "Birthday Pending" role to all new members (if system enabled)
-            birthday_pending_enabled = await self.bot.db_manager.get_setting("birthday_pending_enabled", guild_id)
+            birthday_pending_enabled = guild_settings["birthday_pending_enabled"]
             if birthday_pending_enabled == "true":
-                birthday_pending_role_id = await self.bot.db_manager.get_setting("birthday_pending_role", guild_id)
+                birthday_pending_role_id = guild_settings["birthday_pending_role"]
                 if birthday_pending_role_id:
                     birthday_pending_role = discord.utils.get(member.guild.roles, id=int(birthday_pending_role_id))
                     if birthday_pending_role:
@@ -66,28 +78,17 @@ class Welcome(commands.Cog):
                         self.logger.warning(f"Birthday Pending role ID {birthday_pending_role_id} not found in guild")
 
             # Check if welcome system is enabled
-            guild_id = member.guild.id
-            welcome_enabled = await self.bot.db_manager.get_setting("welcome_enabled", guild_id)
+            welcome_enabled = guild_settings["welcome_enabled"]
             
             # Skip if disabled (default to enabled if not set)
             if welcome_enabled == "false":
                 return
             
             # Get welcome settings
-            welcome_channel_id = await self.bot.db_manager.get_setting(
-                "welcome_channel", guild_id
-            )
-            welcome_title = (
-                await self.bot.db_manager.get_setting("welcome_title", guild_id)
-                or DEFAULT_WELCOME_TITLE
-            )
-            welcome_message = (
-                await self.bot.db_manager.get_setting("welcome_message", guild_id)
-                or DEFAULT_WELCOME_MESSAGE
-            )
-            welcome_image = await self.bot.db_manager.get_setting(
-                "welcome_image", guild_id
-            )
+            welcome_channel_id = guild_settings["welcome_channel"]
+            welcome_title = guild_settings["welcome_title"] or DEFAULT_WELCOME_TITLE
+            welcome_message = guild_settings["welcome_message"] or DEFAULT_WELCOME_MESSAGE
+            welcome_image = guild_settings["welcome_image"]
 
             if not welcome_channel_id:
                 return
@@ -146,40 +147,17 @@ class Welcome(commands.Cog):
                 return
 
             guild_id = member.guild.id
-            user_id = member.id
 
-                        #  RESET ALL USER DATA WHEN THEY LEAVE
-            try:
-                # Reset XP data using Supabase
-                self.bot.db_manager.supabase.table('users').delete().eq('guild_id', guild_id).eq('user_id', user_id).execute()
-                
-                # Reset birthday data using Supabase
-                self.bot.db_manager.supabase.table('birthdays').delete().eq('guild_id', guild_id).eq('user_id', user_id).execute()
-                
-                # Reset warnings data using Supabase
-                
-                # Reset verification data using Supabase
-                self.bot.db_manager.supabase.table('verifications').delete().eq('guild_id', guild_id).eq('user_id', user_id).execute()
-                
-                self.logger.info(f"Reset all data for user {member.name} ({user_id}) who left {member.guild.name}")
-            except Exception as e:
-                self.logger.error(f"Error resetting user data: {e}")
+            # Their XP, birthday, verification and pending appeals are cleaned up by the bot's on_member_remove
 
             # Get goodbye settings
-            goodbye_channel_id = await self.bot.db_manager.get_setting(
-                "goodbye_channel", guild_id
-            )
-            goodbye_title = (
-                await self.bot.db_manager.get_setting("goodbye_title", guild_id)
-                or DEFAULT_GOODBYE_TITLE
-            )
-            goodbye_message = (
-                await self.bot.db_manager.get_setting("goodbye_message", guild_id)
-                or DEFAULT_GOODBYE_MESSAGE
-            )
-            goodbye_image = await self.bot.db_manager.get_setting(
-                "goodbye_image", guild_id
-            )
+            guild_settings = await self.bot.db_manager.get_settings(guild_id, [
+                "goodbye_channel", "goodbye_title", "goodbye_message", "goodbye_image"
+            ])
+            goodbye_channel_id = guild_settings["goodbye_channel"]
+            goodbye_title = guild_settings["goodbye_title"] or DEFAULT_GOODBYE_TITLE
+            goodbye_message = guild_settings["goodbye_message"] or DEFAULT_GOODBYE_MESSAGE
+            goodbye_image = guild_settings["goodbye_image"]
 
             if not goodbye_channel_id:
                 return
@@ -3,7 +3,10 @@ XP and leveling system cog for MalaBoT.
 Handles user XP gains, level progression, and XP administration.
 """
 # Test comment - verifying deployment workflow
+import asyncio
 import datetime
+import time
+from collections import OrderedDict
 from typing import Optional
 
 import discord
@@ -13,18 +16,21 @@ from discord.ext import commands
 from src.config.constants import (
     COLORS,
     DAILY_CHECKIN_XP,
+    LEVEL_UP_DEDUP_SIZE,
     STREAK_BONUS_PERCENT,
     XP_COOLDOWN_SECONDS,
     XP_PER_MESSAGE,
     XP_PER_REACTION,
-    XP_PER_VOICE_MINUTE,
-    XP_TABLE,
 )
+from src.config.settings import settings
 from src.utils.helpers import (
     create_embed,
     embed_helper,
 )
+from src.utils.cooldowns import CooldownTracker
+from src.utils.level_engine import get_curve
 from src.utils.logger import get_logger
+from src.utils.voice_sessions import VoiceSessionEngine
 
 
 class XPGroup(app_commands.Group):
@@ -57,20 +63,14 @@ class XPGroup(app_commands.Group):
                 target.id, interaction.guild.id
             )
 
-            # Calculate XP for next level using XP_TABLE
-            if level < len(XP_TABLE):
-                next_level_xp = XP_TABLE[min(level + 1, len(XP_TABLE) - 1)]
-                current_level_xp = XP_TABLE[level]
-            else:
-                # For very high levels, use a formula
-                next_level_xp = 1000 * (level + 1) * level
-                current_level_xp = 1000 * level * (level - 1)
-            xp_needed = next_level_xp - xp
-            xp_progress = xp - current_level_xp
-            xp_total_needed = next_level_xp - current_level_xp
+            # Calculate XP for next level using the guild's level curve
+            curve = await self.cog.bot.db_manager.get_level_curve(interaction.guild.id)
+            stats = curve.progress(xp)
+            next_level_xp = stats["next_level_xp"]
+            xp_needed = stats["xp_needed"]
 
             # Create progress bar
-            progress = int((xp_progress / xp_total_needed) * 20)
+            progress = min(20, int(stats["xp_percentage"] / 5))
             progress_bar = "" * progress + "" * (20 - progress)
 
             embed = create_embed(
@@ -285,26 +285,58 @@ class XPGroup(app_commands.Group):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
 
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        guild = interaction.guild
+        members = [m.id for m in guild.members if not m.bot]
+        last_update = 0.0
+
+        async def report(title: str, done: int, total: int) -> None:
+            # Edit the response at most every couple of seconds to stay clear of rate limits
+            nonlocal last_update
+            now = time.monotonic()
+            if done < total and now - last_update < 2:
+                return
+            last_update = now
+            embed = create_embed(
+                title=title,
+                description=f"{done:,} / {total:,}",
+                color=COLORS["info"],
+            )
+            await interaction.edit_original_response(embed=embed)
+
         try:
-            # Add XP to all users in the server
-            for member in interaction.guild.members:
-                if not member.bot:
-                    new_xp, new_level, leveled_up = await self.cog.bot.db_manager.update_user_xp(member.id, amount, interaction.guild.id)
+            # One select + one multi-row upsert per page of members
+            leveled_up = await self.cog.bot.db_manager.grant_xp_bulk(
+                guild.id,
+                members,
+                amount,
+                progress=lambda done, total: report(" Adding XP...", done, total),
+            )
 
-                    # Check for level-up and assign roles
-                    if leveled_up:
-                        await self.cog._check_level_up(member)
+            # Level roles for everyone who leveled up; per-member level-up messages are skipped.
+            # Role changes are one API call per member, which can outlast the interaction token,
+            # so they run in the background and report to the channel when done
+            level_roles = await self.cog.bot.db_manager.get_level_roles(guild.id)
+            description = (
+                f"Added **{amount:,} XP** to {len(members):,} users in the server "
+                f"({len(leveled_up):,} leveled up)"
+            )
+            if level_roles and leveled_up:
+                self.cog.start_background(
+                    self.cog._sync_level_roles_bulk(guild, leveled_up, level_roles, interaction.channel)
+                )
+                description += "\nLevel roles are being assigned; a summary will be posted here."
 
             embed = create_embed(
                 title=" XP Added to All Users",
-                description=f"Added **{amount:,} XP** to all users in the server",
+                description=description,
                 color=COLORS["success"],
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await interaction.edit_original_response(embed=embed)
         except Exception as e:
             self.cog.logger.error(f"Error in add_all command: {e}")
             embed = embed_helper.error_embed("Error", "Failed to add XP to all users.")
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await interaction.edit_original_response(embed=embed)
 
     @app_commands.command(
         name="remove", description="Remove XP from a user (Server Owner only)"
@@ -524,13 +556,41 @@ class XP(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.logger = get_logger("xp")
-        self.last_xp_time = {}  # Track last XP gain time per user
-        self.level_up_sent = {}  # Track level-up messages sent (user_id: level)
+        # (guild_id, user_id) -> when message XP is next allowed; forgets users once their cooldown ends
+        self.xp_cooldowns = CooldownTracker()
+        # Recently announced (guild_id, user_id, level), least recently seen first; the users row has the rest
+        self.level_up_sent: OrderedDict[tuple[int, int, int], None] = OrderedDict()
+        # Long-running jobs started by commands (e.g. /xp add-all role sync), cancelled on unload
+        self._background: set[asyncio.Task] = set()
+        # Everyone in voice, credited with voice XP on a fixed tick
+        self.voice_sessions = VoiceSessionEngine(
+            bot,
+            on_level_up=self._check_level_up,
+            tick_interval=settings.VOICE_XP_TICK_INTERVAL,
+            checkpoint_path=settings.VOICE_CHECKPOINT_PATH,
+            exclude_afk=settings.VOICE_XP_EXCLUDE_AFK,
+            exclude_muted=settings.VOICE_XP_EXCLUDE_MUTED,
+            exclude_solo=settings.VOICE_XP_EXCLUDE_SOLO,
+        )
+
+    async def cog_load(self):
+        """Start voice session tracking (picking up members already in voice on a reload)."""
+        await self.voice_sessions.start()
+        if self.bot.is_ready():
+            self.voice_sessions.snapshot(self.bot.guilds)
 
     async def cog_unload(self):
-        """Remove the command group when cog is unloaded."""
+        """Remove the command group and credit open voice sessions when cog is unloaded."""
         if hasattr(self, "_xp_group"):
             self.bot.tree.remove_command(self._xp_group.name)
+        for task in self._background:
+            task.cancel()
+        await self.voice_sessions.stop()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Start sessions for members already in voice (also runs after reconnects)."""
+        self.voice_sessions.snapshot(self.bot.guilds)
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -540,14 +600,11 @@ class XP(commands.Cog):
             if message.author.bot or not message.guild:
                 return
 
-            # Check cooldown
+            # Check cooldown before touching settings
             user_id = message.author.id
-            current_time = datetime.datetime.now().timestamp()
-
-            if user_id in self.last_xp_time:
-                time_diff = current_time - self.last_xp_time[user_id]
-                if time_diff < XP_COOLDOWN_SECONDS:
-                    return
+            cooldown_key = (message.guild.id, user_id)
+            if self.xp_cooldowns.remaining(cooldown_key) > 0:
+                return
 
             # Check if message XP is enabled
             message_xp_enabled = await self.bot.db_manager.get_setting("xp_message_enabled", message.guild.id)
@@ -561,11 +618,16 @@ class XP(commands.Cog):
             if xp_amount <= 0:
                 return
 
+            # Per-guild cooldown from /setup; claimed before awarding so a burst of messages earns once
+            cooldown_str = await self.bot.db_manager.get_setting("xp_cooldown", message.guild.id)
+            cooldown = int(cooldown_str) if cooldown_str and cooldown_str.isdigit() else XP_COOLDOWN_SECONDS
+            if not self.xp_cooldowns.try_start(cooldown_key, cooldown):
+                return
+
             # Award XP and check for level up
             new_xp, new_level, leveled_up = await self.bot.db_manager.update_user_xp(
                 user_id, xp_amount, message.guild.id
             )
-            self.last_xp_time[user_id] = current_time
 
             # Check and assign level roles
             if leveled_up:
@@ -615,54 +677,82 @@ class XP(commands.Cog):
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        """Award XP for time spent in voice chat."""
+        """Track voice sessions; XP is credited by the voice session engine's tick."""
         try:
-            # Check if user joined a voice channel
-            if before.channel is None and after.channel is not None and not member.bot:
-                # Start tracking voice time
-                if not hasattr(self.bot, "voice_time"):
-                    self.bot.voice_time = {}
-                self.bot.voice_time[member.id] = datetime.datetime.now()
-
-            # Check if user left a voice channel
-            elif (
-                before.channel is not None and after.channel is None and not member.bot
-            ):
-                # Calculate time spent and award XP
-                if hasattr(self.bot, "voice_time") and member.id in self.bot.voice_time:
-                    time_spent = (
-                        datetime.datetime.now() - self.bot.voice_time[member.id]
-                    )
-                    minutes = int(time_spent.total_seconds() / 60)
-
-                    if minutes > 0:
-                        # Check if voice XP is enabled
-                        voice_xp_enabled = await self.bot.db_manager.get_setting("xp_voice_enabled", member.guild.id)
-                        if voice_xp_enabled == "false":
-                            del self.bot.voice_time[member.id]
-                            return
-                        
-                        # Get XP amount from database or use default
-                        xp_per_minute_str = await self.bot.db_manager.get_setting("xp_per_voice_minute", member.guild.id)
-                        xp_per_minute = int(xp_per_minute_str) if xp_per_minute_str else XP_PER_VOICE_MINUTE
-                        
-                        if xp_per_minute <= 0:
-                            del self.bot.voice_time[member.id]
-                            return
-                        
-                        xp_gained = minutes * xp_per_minute
-                        # Award voice XP
-                        new_xp, new_level, leveled_up = await self.bot.db_manager.update_user_xp(member.id, xp_gained, member.guild.id)
-                        
-                        # Check for level-up
-                        if leveled_up:
-                            await self._check_level_up(member)
-
-                    del self.bot.voice_time[member.id]
-
+            self.voice_sessions.update(member, before, after)
         except Exception as e:
             self.logger.error(f"Error in voice XP tracking: {e}")
 
+    async def _sync_level_roles(self, member: discord.Member, level: int, level_roles: list) -> None:
+        """Give a member every level role up to their level in one API call."""
+        missing = [
+            role
+            for role_level, role_id in level_roles
+            if level >= role_level
+            and (role := member.guild.get_role(int(role_id)))
+            and role not in member.roles
+        ]
+        if missing:
+            try:
+                await member.add_roles(*missing, reason=f"Reached level {level}")
+            except discord.HTTPException as e:
+                self.logger.error(f"Failed to assign level roles to {member.name}: {e}")
+
+    def start_background(self, coro) -> asyncio.Task:
+        """Run a job outside the command that started it, keeping a reference until it ends."""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def _sync_level_roles_bulk(
+        self,
+        guild: discord.Guild,
+        leveled_up: list[tuple[int, int]],
+        level_roles: list,
+        channel: Optional[discord.abc.Messageable],
+    ) -> None:
+        """Assign level roles to everyone in leveled_up, then post a summary to channel."""
+        synced = 0
+        try:
+            for user_id, level in leveled_up:
+                member = guild.get_member(user_id)
+                if member:
+                    await self._sync_level_roles(member, level, level_roles)
+                    synced += 1
+        except Exception as e:
+            self.logger.error(f"Level role sync for guild {guild.id} stopped after {synced} members: {e}")
+
+        if channel:
+            embed = create_embed(
+                title=" Level Roles Assigned",
+                description=f"Checked level roles for {synced:,} of {len(leveled_up):,} members who leveled up.",
+                color=COLORS["success"],
+            )
+            try:
+                await channel.send(embed=embed)
+            except discord.HTTPException as e:
+                self.logger.error(f"Failed to post level role summary: {e}")
+
+    async def _claim_level_up(self, user: discord.Member, level: int) -> bool:
+        """
+        True if this level-up hasn't been announced yet (and claim it).
+
+        Only remembered locally once the database claim succeeds, so a failed
+        claim (e.g. database unavailable) leaves the level to be announced later.
+        """
+        key = (user.guild.id, user.id, level)
+        if key in self.level_up_sent:
+            self.level_up_sent.move_to_end(key)
+            return False
+
+        claimed = await self.bot.db_manager.claim_level_announcement(user.id, user.guild.id, level)
+        if claimed:
+            self.level_up_sent[key] = None
+            if len(self.level_up_sent) > LEVEL_UP_DEDUP_SIZE:
+                self.level_up_sent.popitem(last=False)
+        return claimed
+
     async def _check_level_up(self, user):
         """Check if user leveled up and assign roles if needed."""
         self.logger.debug(f"_check_level_up called for {user.name}")
@@ -673,13 +763,9 @@ class XP(commands.Cog):
             self.logger.info(f"[LEVEL ROLE DEBUG] User {user.name} is level {current_level}")
 
             # Check if we already sent a level-up message for this level
-            level_key = f"{user.id}_{current_level}"
-            if level_key in self.level_up_sent:
+            if not await self._claim_level_up(user, current_level):
                 self.logger.info(f"[LEVEL ROLE DEBUG] Already sent level-up message for {user.name} level {current_level}, skipping")
             else:
-                # Mark this level as sent
-                self.level_up_sent[level_key] = True
-                
                 # Send level-up message to XP channel
                 xp_channel_id = await self.bot.db_manager.get_setting("xp_channel", user.guild.id)
                 levelup_message = await self.bot.db_manager.get_setting("xp_levelup_message", user.guild.id)
@@ -741,12 +827,4 @@ def calculate_level(xp: int) -> int:
     if xp < 0:
         return 1
 
-    level = 1
-    # Sort levels in descending order and find the highest level we qualify for
-    for lvl in sorted(XP_TABLE.keys(), reverse=True):
-        if xp >= XP_TABLE[lvl]:
-            level = lvl
-            break
-
-    return level
-
+    return get_curve("custom").level(xp)
@@ -21,6 +21,7 @@ XP_PER_MESSAGE = 10  # Fixed XP per message (no range)
 XP_PER_REACTION = 2  # Fixed XP per reaction received
 XP_PER_VOICE_MINUTE = 5  # Fixed XP per minute in voice
 XP_COOLDOWN_SECONDS = 60
+LEVEL_UP_DEDUP_SIZE = 10000  # Recent (guild, user, level) announcements remembered in memory
 DAILY_CHECKIN_XP = 50
 STREAK_BONUS_PERCENT = 10
 ROAST_LEADERBOARD_LIMIT = 10
@@ -33,7 +33,86 @@ class Settings:
         self.SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
         self.GUILD_ID: str = os.getenv("GUILD_ID", "542004156513255445")
         
-        # Legacy SQLite support (deprecated)
+        # Query executor: max concurrent blocking Supabase calls
+        self.DB_MAX_WORKERS: int = int(os.getenv("DB_MAX_WORKERS", "8"))
+        # Reads are retried on transient errors with jittered backoff; after
+        # DB_BREAKER_THRESHOLD straight failures queries fail fast for DB_BREAKER_RESET_TIMEOUT seconds
+        self.DB_RETRY_ATTEMPTS: int = int(os.getenv("DB_RETRY_ATTEMPTS", "2"))
+        self.DB_RETRY_BASE_DELAY: float = float(os.getenv("DB_RETRY_BASE_DELAY", "0.2"))
+        self.DB_RETRY_MAX_DELAY: float = float(os.getenv("DB_RETRY_MAX_DELAY", "2"))
+        self.DB_BREAKER_THRESHOLD: int = int(os.getenv("DB_BREAKER_THRESHOLD", "5"))
+        self.DB_BREAKER_RESET_TIMEOUT: float = float(os.getenv("DB_BREAKER_RESET_TIMEOUT", "30"))
+        # Rows per request when streaming whole tables (keep at or below PostgREST's max-rows)
+        self.DB_PAGE_SIZE: int = int(os.getenv("DB_PAGE_SIZE", "1000"))
+        # IDs per IN (...) filter; filters go in the URL, so keep it well under gateway URL limits
+        self.DB_IN_LIST_SIZE: int = int(os.getenv("DB_IN_LIST_SIZE", "150"))
+        # Per-method/per-table query metrics (/owner metrics); DB_METRICS_PORT > 0 also serves
+        # them on http://127.0.0.1:<port>/metrics
+        self.DB_METRICS_ENABLED: bool = self._parse_bool(
+            os.getenv("DB_METRICS_ENABLED", "false")
+        )
+        self.DB_METRICS_PORT: int = int(os.getenv("DB_METRICS_PORT", "0"))
+        # Shared HTTP pool for Supabase (keep-alive; HTTP/2 if the h2 package is installed)
+        self.DB_POOL_MAX_CONNECTIONS: int = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "20"))
+        self.DB_POOL_MAX_KEEPALIVE: int = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "10"))
+        self.DB_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("DB_POOL_KEEPALIVE_EXPIRY", "60"))
+        self.DB_REQUEST_TIMEOUT: float = float(os.getenv("DB_REQUEST_TIMEOUT", "10"))
+        self.DB_CONNECT_TIMEOUT: float = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+        # Seconds a cached guild setting stays valid before re-reading Supabase
+        self.SETTINGS_CACHE_TTL: int = int(os.getenv("SETTINGS_CACHE_TTL", "300"))
+        # Write-behind XP buffer: flush every N seconds or once M users are pending
+        self.XP_BUFFER_ENABLED: bool = self._parse_bool(
+            os.getenv("XP_BUFFER_ENABLED", "true")
+        )
+        self.XP_FLUSH_INTERVAL: int = int(os.getenv("XP_FLUSH_INTERVAL", "10"))
+        self.XP_FLUSH_MAX_PENDING: int = int(os.getenv("XP_FLUSH_MAX_PENDING", "500"))
+        self.XP_JOURNAL_PATH: str = os.getenv("XP_JOURNAL_PATH", "data/xp_journal.log")
+        # Voice XP is credited to everyone in voice every VOICE_XP_TICK_INTERVAL seconds;
+        # open sessions are checkpointed to VOICE_CHECKPOINT_PATH so restarts keep them
+        self.VOICE_XP_TICK_INTERVAL: int = int(os.getenv("VOICE_XP_TICK_INTERVAL", "60"))
+        self.VOICE_CHECKPOINT_PATH: str = os.getenv("VOICE_CHECKPOINT_PATH", "data/voice_sessions.json")
+        self.VOICE_XP_EXCLUDE_AFK: bool = self._parse_bool(
+            os.getenv("VOICE_XP_EXCLUDE_AFK", "true")
+        )
+        self.VOICE_XP_EXCLUDE_MUTED: bool = self._parse_bool(
+            os.getenv("VOICE_XP_EXCLUDE_MUTED", "false")
+        )
+        self.VOICE_XP_EXCLUDE_SOLO: bool = self._parse_bool(
+            os.getenv("VOICE_XP_EXCLUDE_SOLO", "false")
+        )
+        # Hours between bulk deletes of users rows left at all defaults (0 disables)
+        self.USER_PRUNE_INTERVAL: int = int(os.getenv("USER_PRUNE_INTERVAL", "24"))
+        # Serve /xp leaderboard and /xp rank from in-memory per-guild indexes
+        self.LEADERBOARD_CACHE_ENABLED: bool = self._parse_bool(
+            os.getenv("LEADERBOARD_CACHE_ENABLED", "true")
+        )
+        # Mirror settings, level_roles and birthdays in memory; refresh changed rows every
+        # TABLE_MIRROR_REFRESH_INTERVAL seconds and reload everything every TABLE_MIRROR_RESYNC_INTERVAL
+        self.TABLE_MIRROR_ENABLED: bool = self._parse_bool(
+            os.getenv("TABLE_MIRROR_ENABLED", "true")
+        )
+        self.TABLE_MIRROR_REFRESH_INTERVAL: int = int(os.getenv("TABLE_MIRROR_REFRESH_INTERVAL", "30"))
+        self.TABLE_MIRROR_RESYNC_INTERVAL: int = int(os.getenv("TABLE_MIRROR_RESYNC_INTERVAL", "3600"))
+        # Audit log pipeline: queue rows and insert them in batches
+        self.AUDIT_PIPELINE_ENABLED: bool = self._parse_bool(
+            os.getenv("AUDIT_PIPELINE_ENABLED", "true")
+        )
+        self.AUDIT_QUEUE_SIZE: int = int(os.getenv("AUDIT_QUEUE_SIZE", "5000"))
+        self.AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+        self.AUDIT_FLUSH_INTERVAL: int = int(os.getenv("AUDIT_FLUSH_INTERVAL", "5"))
+        # drop_oldest or block (callers wait for room when the queue is full)
+        self.AUDIT_OVERFLOW_POLICY: str = os.getenv("AUDIT_OVERFLOW_POLICY", "drop_oldest")
+        # Departed members are queued and their rows deleted in bulk per guild
+        self.DEPARTURE_CLEANUP_ENABLED: bool = self._parse_bool(
+            os.getenv("DEPARTURE_CLEANUP_ENABLED", "true")
+        )
+        self.DEPARTURE_BATCH_SIZE: int = int(os.getenv("DEPARTURE_BATCH_SIZE", "200"))
+        self.DEPARTURE_FLUSH_INTERVAL: int = int(os.getenv("DEPARTURE_FLUSH_INTERVAL", "5"))
+        # Seconds of health samples summarised into each persisted health_logs rollup
+        self.HEALTH_ROLLUP_INTERVAL: int = int(os.getenv("HEALTH_ROLLUP_INTERVAL", "3600"))
+
+        # "supabase" (default) or "sqlite" for an embedded database file at DATABASE_URL
+        self.DATABASE_BACKEND: str = os.getenv("DATABASE_BACKEND", "supabase").lower()
         self.DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///data/bot.db")
 
         # Logging Configuration
@@ -119,7 +198,12 @@ class Settings:
             errors.append("OWNER_IDS must contain at least one owner ID")
 
         # Validate database configuration
-        if not self.SUPABASE_URL or not self.SUPABASE_KEY:
+        if self.DATABASE_BACKEND not in ("supabase", "sqlite"):
+            errors.append("DATABASE_BACKEND must be 'supabase' or 'sqlite'")
+        elif self.DATABASE_BACKEND == "sqlite":
+            if not self.DATABASE_URL.startswith("sqlite:///"):
+                errors.append("DATABASE_URL must be a sqlite:/// path when DATABASE_BACKEND=sqlite")
+        elif not self.SUPABASE_URL or not self.SUPABASE_KEY:
             if self.DATABASE_URL.startswith("sqlite://"):
                 errors.append("WARNING: Using deprecated SQLite. Please migrate to Supabase.")
             else:
@@ -0,0 +1,89 @@
+"""
+Daily digest aggregation for MalaBoT.
+Counts audit_log rows grouped by (category, action) in the database, so the
+digest is one small result set however many rows were logged that day.
+
+The Postgres function below must be created once in the Supabase SQL editor.
+Until it exists the counts are grouped client-side from a category/action scan.
+"""
+
+import sqlite3
+from collections import Counter
+from typing import Iterable, Optional
+
+AUDIT_COUNTS_FUNCTION = "audit_log_counts"
+
+AUDIT_COUNTS_SQL = """
+create index if not exists audit_log_timestamp_idx on audit_log (timestamp);
+
+create or replace function audit_log_counts(
+    p_since timestamptz,
+    p_guild_id text default null
+)
+returns table (category text, action text, total bigint)
+language sql
+stable
+as $$
+    select a.category, a.action, count(*)
+    from audit_log a
+    where a.timestamp >= p_since
+      and (p_guild_id is null or a.guild_id::text = p_guild_id)
+    group by a.category, a.action;
+$$;
+"""
+
+
+def count_rows(rows: Iterable[dict]) -> list[dict]:
+    """Group raw category/action rows the way audit_log_counts does (fallback path)."""
+    counts = Counter((r.get("category"), r.get("action")) for r in rows)
+    return [{"category": c, "action": a, "total": n} for (c, a), n in counts.items()]
+
+
+def summarize_counts(counts: Iterable[dict]) -> dict:
+    """Turn grouped {category, action, total} rows into the digest statistics."""
+    stats = {
+        "total_logs": 0,
+        "critical_events": 0,
+        "warnings": 0,
+        "moderation_actions": 0,
+        "user_events": 0,
+        "xp_gains": 0,
+        "birthdays": 0,
+        "restarts": 0,
+        "errors": 0,
+    }
+    for row in counts:
+        category = row.get("category") or ""
+        action = row.get("action") or ""
+        total = int(row.get("total") or 0)
+
+        stats["total_logs"] += total
+        if category == "CRITICAL":
+            stats["critical_events"] += total
+        elif category == "WARNING":
+            stats["warnings"] += total
+        if any(x in action for x in ("BAN", "KICK", "MUTE")):
+            stats["moderation_actions"] += total
+        if any(x in action for x in ("JOIN", "LEAVE")):
+            stats["user_events"] += total
+        if category == "XP" and action == "GAIN":
+            stats["xp_gains"] += total
+        if category == "BDAY" and action == "CELEBRATED":
+            stats["birthdays"] += total
+        if category == "SYSTEM":
+            if action in ("STARTUP", "RESTART"):
+                stats["restarts"] += total
+            if "ERROR" in action.upper():
+                stats["errors"] += total
+    return stats
+
+
+def audit_counts_sqlite(conn: sqlite3.Connection, since: str, guild_id: Optional[str] = None) -> list[dict]:
+    """SQLite stand-in for audit_log_counts."""
+    rows = conn.execute(
+        "SELECT category, action, count(*) FROM audit_log "
+        "WHERE timestamp >= ? AND (? IS NULL OR guild_id = ?) "
+        "GROUP BY category, action",
+        (since, guild_id, guild_id),
+    ).fetchall()
+    return [{"category": c, "action": a, "total": n} for c, a, n in rows]
@@ -0,0 +1,185 @@
+"""
+Asynchronous audit-log pipeline for MalaBoT.
+Queues audit rows in memory and writes them in batched inserts from a background task.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+from src.database.circuit_breaker import is_transient
+
+logger = logging.getLogger("audit_pipeline")
+
+OVERFLOW_POLICIES = ("drop_oldest", "block")
+
+
+class AuditLogPipeline:
+    """
+    Bounded queue of (table, row) inserts flushed in batches.
+
+    When the queue is full, "drop_oldest" discards the oldest queued row and
+    "block" makes the caller wait for the next flush to make room. Rows are
+    only requeued after transient errors; rows the database rejects are
+    dropped one at a time so they can't stall the queue.
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        max_queue: int = 5000,
+        batch_size: int = 200,
+        flush_interval: float = 5.0,
+        overflow_policy: str = "drop_oldest",
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
+
+        self.db = db_manager
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+
+        self._queue: deque[tuple[str, dict]] = deque()
+        self._flush_event: Optional[asyncio.Event] = None
+        self._space_event: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+
+    async def start(self) -> None:
+        """Start the background flush loop."""
+        self._flush_event = asyncio.Event()
+        self._space_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write everything still queued."""
+        if self._task:
+            # Holding the flush lock means the loop isn't midway through a write
+            async with self._flush_lock:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._task = None
+
+        while self._queue:
+            if not await self.flush():
+                logger.error(f"Dropping {len(self._queue)} audit rows that could not be written on shutdown")
+                self.dropped += len(self._queue)
+                self._queue.clear()
+
+    async def submit(self, table: str, row: dict) -> None:
+        """Queue a row for insertion. Only waits when full under the "block" policy."""
+        while len(self._queue) >= self.max_queue:
+            if self.overflow_policy == "drop_oldest":
+                self._queue.popleft()
+                self.dropped += 1
+                break
+            self._space_event.clear()
+            self._flush_event.set()
+            await self._space_event.wait()
+
+        self._queue.append((table, row))
+        self.submitted += 1
+        if len(self._queue) >= self.batch_size:
+            self._flush_event.set()
+
+    async def flush(self) -> bool:
+        """Write up to one batch per table. Returns False if the insert failed."""
+        async with self._flush_lock:
+            if not self._queue:
+                return True
+
+            started = time.perf_counter()
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._space_event.set()
+
+            by_table: dict[str, list[dict]] = {}
+            for table, row in batch:
+                by_table.setdefault(table, []).append(row)
+
+            unwritten: list[tuple[str, dict]] = []
+            for table, rows in by_table.items():
+                if unwritten:
+                    # The database is unreachable; don't try the remaining tables
+                    unwritten += [(table, row) for row in rows]
+                    continue
+                try:
+                    await self.db.run_query(self.db.supabase.table(table).insert(rows))
+                    self.written += len(rows)
+                except Exception as e:
+                    if is_transient(e):
+                        logger.error(f"Audit log flush failed: {e}")
+                        unwritten += [(table, row) for row in rows]
+                    else:
+                        logger.warning(f"{table} rejected a batch of {len(rows)} audit rows ({e}); inserting them one by one")
+                        unwritten += await self._insert_each(table, rows)
+
+            if unwritten:
+                self.failed_flushes += 1
+                # Put unwritten rows back at the front without exceeding the bound
+                room = max(0, self.max_queue - len(self._queue))
+                self.dropped += max(0, len(unwritten) - room)
+                self._queue.extendleft(reversed(unwritten[-room:] if room else []))
+                return False
+
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return True
+
+    async def _insert_each(self, table: str, rows: list[dict]) -> list[tuple[str, dict]]:
+        """
+        Insert rows one at a time, dropping any the database rejects.
+
+        Returns the rows left unwritten because the database became unreachable.
+        """
+        for i, row in enumerate(rows):
+            try:
+                await self.db.run_query(self.db.supabase.table(table).insert(row))
+                self.written += 1
+            except Exception as e:
+                if is_transient(e):
+                    logger.error(f"Audit log flush failed: {e}")
+                    return [(table, r) for r in rows[i:]]
+                self.dropped += 1
+                logger.error(f"Dropping audit row rejected by {table}: {e} - {row}")
+        return []
+
+    def get_stats(self) -> dict:
+        """Get queue depth and write counters."""
+        return {
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "policy": self.overflow_policy,
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+    async def _flush_loop(self) -> None:
+        """Flush every flush_interval seconds, or as soon as a full batch is queued."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+
+            # Drain full batches back to back; stop early if the database is failing
+            while self._queue:
+                if not await self.flush() or len(self._queue) < self.batch_size:
+                    break
@@ -0,0 +1,107 @@
+"""
+Circuit breaker for MalaBoT's database calls.
+After repeated transport failures, queries fail fast instead of each waiting
+for a timeout; one probe is let through after a cool-down to test recovery.
+"""
+
+import sqlite3
+import time
+from typing import Optional
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DatabaseUnavailable(Exception):
+    """Raised without contacting the database while the circuit is open."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for failures that say the backend is unreachable or overloaded, not that the query was wrong."""
+    if isinstance(error, DatabaseUnavailable):
+        return True
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in (502, 503, 504)
+    if isinstance(error, sqlite3.OperationalError):
+        return "locked" in str(error) or "busy" in str(error)
+    # postgrest APIError carries the HTTP status as its code for gateway errors
+    return str(getattr(error, "code", "")) in ("502", "503", "504")
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures.
+
+    While open every call fails fast with DatabaseUnavailable. After
+    reset_timeout seconds one call is allowed through (half-open): success
+    closes the circuit, failure re-opens it for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_inflight = False
+
+        # Stats
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def check(self) -> bool:
+        """
+        Call before each query. Raises DatabaseUnavailable while open.
+
+        Returns:
+            True if this call is the half-open probe (pass it to record_*).
+        """
+        if self.state == CLOSED:
+            return False
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probe_inflight:
+            self._probe_inflight = True
+            return True
+        self.rejected += 1
+        raise DatabaseUnavailable(f"Database circuit is open after {self.consecutive_failures} failures: {self.last_error}")
+
+    def record_success(self, probe: bool = False) -> None:
+        if probe:
+            self._probe_inflight = False
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            self.state = CLOSED
+            self.opened_at = None
+
+    def abandon_probe(self) -> None:
+        """The probe was cancelled before it finished; let the next call probe instead."""
+        self._probe_inflight = False
+
+    def record_failure(self, error: BaseException, probe: bool = False) -> None:
+        if probe:
+            self._probe_inflight = False
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:200]
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> dict:
+        """Get the circuit state and failure counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "open_for": (time.monotonic() - self.opened_at) if self.opened_at else 0.0,
+            "last_error": self.last_error,
+        }
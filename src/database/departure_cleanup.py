@@ -0,0 +1,143 @@
+"""
+Departure cleanup queue for MalaBoT.
+Collects members who left a guild and deletes their rows in bulk IN (...) queries
+from a background task, so a mass kick or prune isn't hundreds of single deletes.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger("departure_cleanup")
+
+
+class DepartureCleanup:
+    """
+    Set of departed (guild, user) pairs flushed per guild in batches.
+
+    Each batch is one query per table plus one audit entry. The cleanup is
+    idempotent, so a failed batch is simply queued again.
+    """
+
+    def __init__(self, db_manager, batch_size: int = 200, flush_interval: float = 5.0):
+        self.db = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # guild_id -> user IDs waiting for cleanup (dicts keep departure order)
+        self._pending: dict[int, dict[int, None]] = {}
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.submitted = 0
+        self.cancelled = 0
+        self.cleaned = 0
+        self.batches = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(users) for users in self._pending.values())
+
+    async def start(self) -> None:
+        """Start the background flush loop."""
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and clean up everyone still queued."""
+        if self._task:
+            async with self._flush_lock:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._task = None
+
+        while self._pending:
+            if not await self.flush():
+                logger.error(f"Leaving {self.queued} departed members uncleaned on shutdown")
+                self._pending.clear()
+
+    def submit(self, user_id: int, guild_id: int) -> None:
+        """Queue a departed member. Repeat submissions for the same member are merged."""
+        users = self._pending.setdefault(guild_id, {})
+        if user_id not in users:
+            users[user_id] = None
+            self.submitted += 1
+        if len(users) >= self.batch_size:
+            self._flush_event.set()
+
+    def cancel(self, user_id: int, guild_id: int) -> bool:
+        """Unqueue a member who came back before their batch ran. Returns True if they were queued."""
+        users = self._pending.get(guild_id)
+        if not users or user_id not in users:
+            return False
+        del users[user_id]
+        if not users:
+            del self._pending[guild_id]
+        self.cancelled += 1
+        return True
+
+    async def flush(self) -> bool:
+        """Clean up one batch per guild. Returns False if a batch failed."""
+        async with self._flush_lock:
+            if not self._pending:
+                return True
+
+            started = time.perf_counter()
+            for guild_id in list(self._pending):
+                users = self._pending[guild_id]
+                batch = list(users)[:self.batch_size]
+                for user_id in batch:
+                    del users[user_id]
+                if not users:
+                    del self._pending[guild_id]
+
+                try:
+                    await self.db.delete_departed_members(guild_id, batch)
+                except Exception as e:
+                    self.failed_flushes += 1
+                    logger.error(f"Departure cleanup for guild {guild_id} failed: {e}")
+                    # Requeue for the next flush; members who departed meanwhile stay queued too
+                    requeued = self._pending.setdefault(guild_id, {})
+                    self._pending[guild_id] = {**dict.fromkeys(batch), **requeued}
+                    return False
+
+                self.cleaned += len(batch)
+                self.batches += 1
+
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return True
+
+    def get_stats(self) -> dict:
+        """Get queue depth and cleanup counters."""
+        return {
+            "queued": self.queued,
+            "submitted": self.submitted,
+            "cancelled": self.cancelled,
+            "cleaned": self.cleaned,
+            "batches": self.batches,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+    async def _flush_loop(self) -> None:
+        """Flush every flush_interval seconds, or as soon as a guild has a full batch."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+
+            while self._pending:
+                full = any(len(users) >= self.batch_size for users in self._pending.values())
+                if not await self.flush() or not full:
+                    break
@@ -0,0 +1,157 @@
+﻿"""
+Query execution layer for MalaBoT.
+Runs blocking supabase-py queries on a bounded thread pool so the event loop keeps running.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.database.circuit_breaker import CLOSED, CircuitBreaker, is_transient
+
+
+class QueryExecutor:
+    """Runs synchronous database calls off the event loop with bounded concurrency."""
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        breaker: Optional[CircuitBreaker] = None,
+        retry_attempts: int = 2,
+        retry_base_delay: float = 0.2,
+        retry_max_delay: float = 2.0,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.breaker = breaker or CircuitBreaker()
+        # Retries apply to reads only; a retried write could be applied twice
+        self.retry_attempts = max(0, retry_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="db-query"
+        )
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Stats (guarded by _lock, updated from worker threads)
+        self.queued = 0
+        self.running = 0
+        self.peak_queued = 0
+        self.total_started = 0
+        self.total_queries = 0
+        self.total_errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_runtime = 0.0
+        self.total_retries = 0
+
+    async def run(self, query: Any) -> Any:
+        """
+        Execute a query builder and return its response.
+
+        Transient failures of reads are retried with jittered exponential backoff.
+        Every query fails fast with DatabaseUnavailable while the circuit is open.
+        """
+        attempts = self.retry_attempts if is_read(query) else 0
+        attempt = 0
+        while True:
+            probe = self.breaker.check()
+            try:
+                result = await self.call(query.execute)
+            except asyncio.CancelledError:
+                if probe:
+                    self.breaker.abandon_probe()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # The database answered; the query itself was rejected
+                    self.breaker.record_success(probe)
+                    raise
+                self.breaker.record_failure(e, probe)
+                if attempt >= attempts or self.breaker.state != CLOSED:
+                    raise
+                # Full jitter keeps a crowd of retrying handlers from hitting the backend in step
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                attempt += 1
+                with self._lock:
+                    self.total_retries += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success(probe)
+            return result
+
+    async def call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking callable on the pool and await its result."""
+        if self._closed:
+            raise RuntimeError("Query executor is closed")
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, self._timed_call, submitted, func, args
+        )
+
+    def _timed_call(self, submitted: float, func: Callable[..., Any], args: tuple) -> Any:
+        """Worker-side wrapper that records queue wait and runtime."""
+        started = time.perf_counter()
+        wait = started - submitted
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_started += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+        failed = False
+        try:
+            return func(*args)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            runtime = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self.total_queries += 1
+                self.total_runtime += runtime
+                if failed:
+                    self.total_errors += 1
+
+    def get_stats(self) -> dict:
+        """Get a snapshot of queue depth and wait-time statistics."""
+        with self._lock:
+            started = self.total_started
+            completed = self.total_queries
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "peak_queued": self.peak_queued,
+                "total_queries": completed,
+                "total_errors": self.total_errors,
+                "avg_wait_ms": (self.total_wait / started * 1000) if started else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "avg_runtime_ms": (self.total_runtime / completed * 1000) if completed else 0.0,
+                "total_retries": self.total_retries,
+                "circuit": self.breaker.state,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting queries and release worker threads."""
+        self._closed = True
+        self._pool.shutdown(wait=wait)
+
+
+def is_read(query: Any) -> bool:
+    """True for select queries (safe to retry); rpc calls and writes are not retried."""
+    method = getattr(query, "http_method", None)
+    if method is not None:
+        return str(method).upper() in ("GET", "HEAD")
+    return getattr(query, "op", None) == "select"
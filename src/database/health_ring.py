@@ -0,0 +1,136 @@
+"""
+Health sample ring buffer for MalaBoT.
+Keeps recent health checks in memory and rolls them up per interval, so only
+rollups and status changes are written to the health_logs table.
+"""
+
+import time
+from collections import deque
+from typing import Optional
+
+# Worst status wins when rolling samples up
+STATUS_SEVERITY = {"OK": 0, "WARNING": 1, "CRITICAL": 2}
+
+
+class HealthRing:
+    """Per-component ring buffer of health samples with min/max/avg rollups."""
+
+    def __init__(self, capacity: int = 720, rollup_interval: float = 3600.0, rollup_capacity: int = 168):
+        self.capacity = capacity
+        self.rollup_interval = rollup_interval
+        # component -> deque of (timestamp, status, value, details)
+        self._samples: dict[str, deque] = {}
+        # component -> deque of finished rollup dicts
+        self._rollups: dict[str, deque] = {}
+        self._rollup_capacity = rollup_capacity
+        # component -> rollup in progress
+        self._windows: dict[str, dict] = {}
+        self._last_status: dict[str, str] = {}
+
+    def record(
+        self,
+        component: str,
+        status: str,
+        value: Optional[float] = None,
+        details: Optional[str] = None,
+    ) -> bool:
+        """
+        Add a sample. Returns True if it is a status change that should be
+        persisted right away (any change into or out of a non-OK status).
+        """
+        now = time.time()
+        self._samples.setdefault(component, deque(maxlen=self.capacity)).append(
+            (now, status, value, details)
+        )
+
+        window = self._windows.get(component)
+        if window is None:
+            window = self._windows[component] = self._new_window(now)
+        window["count"] += 1
+        if status != "OK":
+            window["non_ok"] += 1
+        if STATUS_SEVERITY.get(status, 2) > STATUS_SEVERITY.get(window["status"], 2):
+            window["status"] = status
+        if value is not None:
+            window["min"] = value if window["min"] is None else min(window["min"], value)
+            window["max"] = value if window["max"] is None else max(window["max"], value)
+            window["total"] += value
+            window["values"] += 1
+
+        previous = self._last_status.get(component, "OK")
+        self._last_status[component] = status
+        return status != previous
+
+    def due_rollups(self, force: bool = False) -> list[dict]:
+        """Close rollup windows older than rollup_interval (or all, with force) and return them."""
+        now = time.time()
+        closed = []
+        for component, window in list(self._windows.items()):
+            if force or now - window["start"] >= self.rollup_interval:
+                rollup = {
+                    "component": component,
+                    "start": window["start"],
+                    "end": now,
+                    "count": window["count"],
+                    "non_ok": window["non_ok"],
+                    "status": window["status"],
+                    "min": window["min"],
+                    "max": window["max"],
+                    "avg": (window["total"] / window["values"]) if window["values"] else None,
+                }
+                self._rollups.setdefault(component, deque(maxlen=self._rollup_capacity)).append(rollup)
+                closed.append(rollup)
+                del self._windows[component]
+        return closed
+
+    def recent(self, component: Optional[str] = None, limit: int = 20) -> list[tuple]:
+        """Get the most recent (timestamp, component, status, value, details) samples, newest first."""
+        components = [component] if component else list(self._samples)
+        samples = [
+            (ts, name, status, value, details)
+            for name in components
+            for ts, status, value, details in self._samples.get(name, ())
+        ]
+        samples.sort(key=lambda s: s[0], reverse=True)
+        return samples[:limit]
+
+    def rollups(self, component: Optional[str] = None, limit: int = 24) -> list[dict]:
+        """Get finished rollups, newest first."""
+        components = [component] if component else list(self._rollups)
+        rollups = [r for name in components for r in self._rollups.get(name, ())]
+        rollups.sort(key=lambda r: r["end"], reverse=True)
+        return rollups[:limit]
+
+    def latest(self) -> dict[str, tuple]:
+        """Get the newest (timestamp, status, value, details) sample for every component."""
+        return {name: samples[-1] for name, samples in self._samples.items() if samples}
+
+    @staticmethod
+    def rollup_row(rollup: dict) -> dict:
+        """Format a rollup as a health_logs row."""
+        def fmt(value):
+            return "-" if value is None else f"{value:.2f}"
+
+        return {
+            "component": rollup["component"],
+            "status": rollup["status"],
+            "value": rollup["avg"],
+            "details": (
+                f"rollup {int(rollup['end'] - rollup['start'])}s: "
+                f"samples={rollup['count']} non_ok={rollup['non_ok']} "
+                f"min={fmt(rollup['min'])} max={fmt(rollup['max'])} avg={fmt(rollup['avg'])}"
+            ),
+        }
+
+    @staticmethod
+    def _new_window(start: float) -> dict:
+        return {
+            "start": start,
+            "count": 0,
+            "non_ok": 0,
+            "status": "OK",
+            "min": None,
+            "max": None,
+            "total": 0.0,
+            "values": 0,
+        }
@@ -0,0 +1,219 @@
+"""
+Query instrumentation for MalaBoT.
+Records call counts, errors, latency percentiles and row counts for every
+public DatabaseManager method and every table it queries. Off by default;
+when DB_METRICS_ENABLED is false the methods are left unwrapped.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Optional
+
+from src.config.settings import settings
+
+logger = logging.getLogger("db_metrics")
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is +Inf)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# [method name] whose queries are running in the current task, so run_query can credit its rows.
+# A list so it can be cleared on return: tasks spawned inside the method inherit the context.
+_current_method: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("db_method", default=None)
+
+
+class LatencyStats:
+    """Counters, a fixed-bucket histogram and a window of recent samples for percentiles."""
+
+    __slots__ = ("calls", "errors", "rows", "total_ms", "max_ms", "buckets", "recent")
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def record(self, elapsed_ms: float, error: bool) -> None:
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.buckets[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.recent.append(elapsed_ms)
+
+    def snapshot(self) -> dict:
+        samples = sorted(self.recent)
+
+        def pct(p: float) -> float:
+            return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_ms": self.total_ms,
+            "avg_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "buckets": list(self.buckets),
+        }
+
+
+class QueryMetrics:
+    """Process-wide registry of per-method and per-table stats."""
+
+    def __init__(self, enabled: bool = False, window: int = 1024):
+        self.enabled = enabled
+        self.window = window
+        self.started = time.time()
+        self.methods: dict[str, LatencyStats] = {}
+        self.tables: dict[str, LatencyStats] = {}
+
+    def _stats(self, registry: dict, name: str) -> LatencyStats:
+        stats = registry.get(name)
+        if stats is None:
+            stats = registry[name] = LatencyStats(self.window)
+        return stats
+
+    def record_method(self, name: str, elapsed_ms: float, error: bool) -> None:
+        self._stats(self.methods, name).record(elapsed_ms, error)
+
+    def record_query(self, query: Any, elapsed_ms: float, result: Any, error: bool) -> None:
+        """Record one executed query builder against its table (and its rows against the calling method)."""
+        stats = self._stats(self.tables, query_table(query))
+        stats.record(elapsed_ms, error)
+
+        data = getattr(result, "data", None)
+        rows = len(data) if isinstance(data, list) else 0
+        stats.rows += rows
+        frame = _current_method.get()
+        if frame and frame[0]:
+            self._stats(self.methods, frame[0]).rows += rows
+
+    def reset(self) -> None:
+        self.started = time.time()
+        self.methods.clear()
+        self.tables.clear()
+
+    def snapshot(self) -> dict:
+        """Get every method and table stat, methods ordered by total time spent."""
+        methods = {name: stats.snapshot() for name, stats in self.methods.items()}
+        return {
+            "enabled": self.enabled,
+            "since": self.started,
+            "methods": dict(sorted(methods.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)),
+            "tables": {name: stats.snapshot() for name, stats in sorted(self.tables.items())},
+        }
+
+    def prometheus(self) -> str:
+        """Render the stats in the Prometheus text exposition format."""
+        lines = []
+        for kind, registry in (("method", self.methods), ("table", self.tables)):
+            metric = f"malabot_db_{kind}"
+            lines.append(f"# TYPE {metric}_duration_ms histogram")
+            for name, stats in sorted(registry.items()):
+                label = f'{kind}="{name}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS_MS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_duration_ms_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f"{metric}_duration_ms_sum{{{label}}} {stats.total_ms:.3f}")
+                lines.append(f"{metric}_duration_ms_count{{{label}}} {stats.calls}")
+            for suffix, attr in (("errors_total", "errors"), ("rows_total", "rows")):
+                lines.append(f"# TYPE {metric}_{suffix} counter")
+                for name, stats in sorted(registry.items()):
+                    lines.append(f'{metric}_{suffix}{{{kind}="{name}"}} {getattr(stats, attr)}')
+        return "\n".join(lines) + "\n"
+
+
+db_metrics = QueryMetrics(enabled=settings.DB_METRICS_ENABLED)
+
+
+def query_table(query: Any) -> str:
+    """Best-effort table name for a query builder (rpc calls show up as rpc/<name>)."""
+    name = getattr(query, "table_name", None)
+    if name:
+        return name
+    if getattr(query, "name", None) and hasattr(query, "params"):
+        return f"rpc/{query.name}"
+    path = getattr(query, "path", "") or ""
+    return str(path).strip("/") or "unknown"
+
+
+def instrumented(func):
+    """Time an async method and count its calls and errors under its qualified name."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        frame = [name]
+        token = _current_method.set(frame)
+        started = time.perf_counter()
+        error = False
+        try:
+            return await func(*args, **kwargs)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            db_metrics.record_method(name, (time.perf_counter() - started) * 1000, error)
+            frame[0] = None
+            _current_method.reset(token)
+
+    return wrapper
+
+
+def instrument_methods(exclude: tuple[str, ...] = ()):
+    """Class decorator: wrap every public coroutine method (except exclude) when metrics are enabled."""
+    def decorate(cls):
+        if not db_metrics.enabled:
+            return cls
+        for attr, value in list(vars(cls).items()):
+            if not attr.startswith("_") and attr not in exclude and inspect.iscoroutinefunction(value):
+                setattr(cls, attr, instrumented(value))
+        return cls
+
+    return decorate
+
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json on a local port.
+
+    Returns:
+        The aiohttp AppRunner; pass it to stop_metrics_server on shutdown.
+    """
+    from aiohttp import web
+
+    async def metrics_text(request):
+        return web.Response(text=db_metrics.prometheus(), content_type="text/plain")
+
+    async def metrics_json(request):
+        return web.Response(text=json.dumps(db_metrics.snapshot()), content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_text)
+    app.router.add_get("/metrics.json", metrics_json)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Database metrics endpoint listening on http://{host}:{port}/metrics")
+    return runner
+
+
+async def stop_metrics_server(runner) -> None:
+    """Stop a server started by start_metrics_server."""
+    if runner:
+        await runner.cleanup()
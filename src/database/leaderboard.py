@@ -0,0 +1,145 @@
+"""
+In-memory XP leaderboards for MalaBoT.
+Each guild's board is seeded once from the users table and kept current by every XP write.
+"""
+
+import asyncio
+from typing import Optional
+
+from sortedcontainers import SortedList
+
+
+class GuildLeaderboard:
+    """Order-statistics view of one guild's XP: rank, top-K and pages in O(log n)."""
+
+    def __init__(self):
+        # Sorted by (-xp, user_id) so index 0 is the highest XP
+        self._entries = SortedList()
+        # user_id -> (xp, level)
+        self._users: dict[int, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, user_id: int, xp: int, level: int) -> None:
+        """Set a user's XP and level. Users with no XP are left off the board."""
+        self.remove(user_id)
+        if xp > 0:
+            self._users[user_id] = (xp, level)
+            self._entries.add((-xp, user_id))
+
+    def remove(self, user_id: int) -> None:
+        """Drop a user from the board."""
+        current = self._users.pop(user_id, None)
+        if current:
+            self._entries.remove((-current[0], user_id))
+
+    def rank(self, user_id: int) -> int:
+        """Get a user's rank (1 + number of users with more XP)."""
+        xp = self._users.get(user_id, (0, 0))[0]
+        return self._entries.bisect_left((-xp, -1)) + 1
+
+    def top(self, limit: int = 10, offset: int = 0) -> list[tuple[int, int, int]]:
+        """Get (user_id, xp, level) rows ordered by XP, highest first."""
+        return [
+            (user_id, -neg_xp, self._users[user_id][1])
+            for neg_xp, user_id in self._entries.islice(offset, offset + limit)
+        ]
+
+    def page(self, page: int, per_page: int = 10) -> list[tuple[int, int, int]]:
+        """Get one page (1-based) of the leaderboard."""
+        return self.top(per_page, (max(page, 1) - 1) * per_page)
+
+
+class LeaderboardIndex:
+    """Per-guild leaderboards, loaded lazily from Supabase on first use."""
+
+    def __init__(self, db_manager, page_size: int = 1000):
+        self.db = db_manager
+        self.page_size = page_size
+        self._guilds: dict[int, GuildLeaderboard] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        # Writes that arrive while a guild is still being seeded
+        self._pending: dict[int, dict[int, Optional[tuple[int, int]]]] = {}
+
+    async def get(self, guild_id: int) -> GuildLeaderboard:
+        """Get a guild's leaderboard, seeding it from the users table if needed."""
+        board = self._guilds.get(guild_id)
+        if board is not None:
+            return board
+
+        lock = self._locks.setdefault(guild_id, asyncio.Lock())
+        async with lock:
+            board = self._guilds.get(guild_id)
+            if board is None:
+                board = await self._load(guild_id)
+                self._guilds[guild_id] = board
+            return board
+
+    def record(self, user_id: int, guild_id: int, xp: int, level: int) -> None:
+        """Apply an XP write to a guild's board (no-op until the guild is loaded)."""
+        if guild_id in self._guilds:
+            self._guilds[guild_id].update(user_id, xp, level)
+        elif guild_id in self._pending:
+            self._pending[guild_id][user_id] = (xp, level)
+
+    def forget(self, user_id: int, guild_id: int) -> None:
+        """Remove a user whose row was deleted."""
+        if guild_id in self._guilds:
+            self._guilds[guild_id].remove(user_id)
+        elif guild_id in self._pending:
+            self._pending[guild_id][user_id] = None
+
+    def reset_guild(self, guild_id: int) -> None:
+        """Empty a guild's board after all its XP was reset."""
+        if guild_id in self._guilds or guild_id in self._pending:
+            self._guilds[guild_id] = GuildLeaderboard()
+            self._pending.pop(guild_id, None)
+
+    def invalidate(self, guild_id: Optional[int] = None) -> None:
+        """Drop one guild's board (or all) so it is re-seeded on next use."""
+        if guild_id is None:
+            self._guilds.clear()
+        else:
+            self._guilds.pop(guild_id, None)
+
+    def get_stats(self) -> dict:
+        """Get the number of loaded guilds and ranked users."""
+        return {
+            "guilds": len(self._guilds),
+            "users": sum(len(board) for board in self._guilds.values()),
+        }
+
+    async def _load(self, guild_id: int) -> GuildLeaderboard:
+        """Seed a board by paging through the guild's users with XP."""
+        self._pending[guild_id] = {}
+        try:
+            board = GuildLeaderboard()
+            rows = self.db.iter_rows(
+                'users',
+                'user_id, xp, level',
+                key='user_id',
+                filters={'guild_id': guild_id},
+                where=lambda q: q.gt('xp', 0),
+                page_size=self.page_size,
+            )
+            async for row in rows:
+                board.update(row['user_id'], row['xp'], row['level'])
+
+            # Buffered XP hasn't reached the table yet
+            if self.db.xp_buffer:
+                for user_id, (xp, level) in self.db.xp_buffer.guild_entries(guild_id).items():
+                    board.update(user_id, xp, level)
+
+            pending = self._pending.get(guild_id)
+            if pending is None:
+                # reset_guild ran while loading
+                return self._guilds[guild_id]
+            for user_id, values in pending.items():
+                if values is None:
+                    board.remove(user_id)
+                else:
+                    board.update(user_id, *values)
+            return board
+        finally:
+            self._pending.pop(guild_id, None)
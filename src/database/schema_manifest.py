@@ -0,0 +1,394 @@
+"""
+Schema manifest for MalaBoT.
+Describes every table the bot uses and the indexes its hot query paths rely on,
+and checks a live database catalog against it, producing the DDL to fix any drift.
+
+The catalog is read through the Postgres function below, which must be created
+once in the Supabase SQL editor. python -m src.utils.migration_check --dsn ...
+reads it from a Postgres connection directly instead (e.g. a local instance in CI).
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+SCHEMA_CATALOG_FUNCTION = "schema_catalog"
+
+CATALOG_QUERY = """
+    select 'column'::text, c.table_name::text, c.column_name::text, c.data_type::text
+    from information_schema.columns c
+    where c.table_schema = 'public'
+    union all
+    select 'index'::text, i.tablename::text, i.indexname::text, i.indexdef::text
+    from pg_indexes i
+    where i.schemaname = 'public'
+"""
+
+# Runs with the caller's rights and only the service role may call it: PostgREST exposes
+# public functions as RPCs, and the anon key ships to clients
+SCHEMA_CATALOG_SQL = f"""
+create or replace function schema_catalog()
+returns table (kind text, table_name text, name text, detail text)
+language sql
+stable
+as $${CATALOG_QUERY}$$;
+
+revoke execute on function schema_catalog() from public, anon, authenticated;
+grant execute on function schema_catalog() to service_role;
+"""
+
+
+class Column(NamedTuple):
+    name: str
+    type: str
+    # Postgres "generated always as (...) stored" expression; never written by the bot
+    generated: Optional[str] = None
+
+
+class Index(NamedTuple):
+    name: str
+    columns: str
+    unique: bool = False
+
+
+class Table(NamedTuple):
+    columns: tuple[Column, ...]
+    indexes: tuple[Index, ...] = ()
+
+
+def _id() -> Column:
+    return Column("id", "bigint generated by default as identity primary key")
+
+
+MANIFEST: dict[str, Table] = {
+    "users": Table(
+        columns=(
+            _id(),
+            Column("user_id", "bigint not null"),
+            Column("guild_id", "bigint"),
+            Column("username", "text"),
+            Column("discriminator", "text"),
+            Column("xp", "integer not null default 0"),
+            Column("level", "integer not null default 0"),
+            Column("total_messages", "integer default 0"),
+            Column("daily_streak", "integer default 0"),
+            # Highest level announced in the XP channel, so restarts don't repeat announcements
+            Column("last_announced_level", "integer not null default 0"),
+            Column("created_at", "timestamptz default now()"),
+        ),
+        indexes=(
+            # Conflict target of the XP upserts and increment_user_xp
+            Index("users_user_guild_key", "user_id, guild_id", unique=True),
+            # Guild-scoped keyset scans (level recalculation, leaderboard loads)
+            Index("users_guild_user_idx", "guild_id, user_id"),
+            # Rank counts and leaderboard pages
+            Index("users_guild_xp_idx", "guild_id, xp desc"),
+        ),
+    ),
+    "settings": Table(
+        columns=(
+            _id(),
+            Column("guild_id", "bigint"),
+            Column("setting_key", "text not null"),
+            Column("value", "text"),
+            Column("updated_at", "timestamptz not null default now()"),
+        ),
+        indexes=(
+            Index("settings_guild_key_key", "guild_id, setting_key", unique=True),
+            Index("settings_updated_at_idx", "updated_at"),
+        ),
+    ),
+    "birthdays": Table(
+        columns=(
+            _id(),
+            Column("user_id", "bigint not null"),
+            Column("guild_id", "bigint"),
+            Column("birthday", "text"),
+            Column("birthday_md", "text", generated="right(birthday, 5)"),
+            Column("timezone", "text default 'UTC'"),
+            Column("announced_date", "text"),
+            Column("announced_year", "integer"),
+            Column("created_at", "timestamptz default now()"),
+            Column("updated_at", "timestamptz not null default now()"),
+        ),
+        indexes=(
+            Index("birthdays_user_guild_key", "user_id, guild_id", unique=True),
+            # Today's birthdays: guild_id = ? and birthday_md = 'MM-DD'
+            Index("birthdays_guild_md_idx", "guild_id, birthday_md"),
+            Index("birthdays_updated_at_idx", "updated_at"),
+        ),
+    ),
+    "daily_checkins": Table(
+        columns=(
+            _id(),
+            Column("user_id", "bigint not null"),
+            Column("guild_id", "bigint"),
+            Column("last_checkin", "text"),
+            Column("checkin_streak", "integer default 0"),
+        ),
+        indexes=(Index("daily_checkins_user_guild_key", "user_id, guild_id", unique=True),),
+    ),
+    "level_roles": Table(
+        columns=(
+            _id(),
+            Column("guild_id", "bigint"),
+            Column("level", "integer not null"),
+            Column("role_id", "bigint not null"),
+            Column("updated_at", "timestamptz not null default now()"),
+        ),
+        indexes=(
+            Index("level_roles_guild_idx", "guild_id, level"),
+            Index("level_roles_updated_at_idx", "updated_at"),
+        ),
+    ),
+    "roast_xp": Table(
+        columns=(
+            _id(),
+            Column("action", "text unique"),
+            Column("base_xp", "integer"),
+        ),
+    ),
+    "audit_log": Table(
+        columns=(
+            _id(),
+            Column("timestamp", "timestamptz default now()"),
+            Column("category", "text"),
+            Column("action", "text"),
+            Column("user_id", "text"),
+            Column("target_id", "text"),
+            Column("channel_id", "text"),
+            Column("details", "text"),
+            Column("guild_id", "text"),
+        ),
+        indexes=(
+            Index("audit_log_guild_time_idx", "guild_id, timestamp"),
+            # Daily digest across all guilds
+            Index("audit_log_timestamp_idx", "timestamp"),
+        ),
+    ),
+    "mod_logs": Table(
+        columns=(
+            _id(),
+            Column("moderator_id", "bigint"),
+            Column("user_id", "bigint"),
+            Column("action", "text"),
+            Column("reason", "text"),
+            Column("guild_id", "text"),
+            Column("channel_id", "bigint"),
+            Column("message_count", "integer"),
+            Column("created_at", "timestamptz default now()"),
+        ),
+        indexes=(Index("mod_logs_guild_time_idx", "guild_id, created_at"),),
+    ),
+    "health_logs": Table(
+        columns=(
+            _id(),
+            Column("timestamp", "timestamptz default now()"),
+            Column("component", "text"),
+            Column("status", "text"),
+            Column("value", "double precision"),
+            Column("details", "text"),
+        ),
+    ),
+    "system_flags": Table(
+        columns=(
+            Column("flag_name", "text primary key"),
+            Column("flag_value", "text"),
+            Column("description", "text"),
+            Column("updated_at", "timestamptz default now()"),
+        ),
+        indexes=(Index("system_flags_pkey", "flag_name", unique=True),),
+    ),
+    "verifications": Table(
+        columns=(
+            _id(),
+            Column("user_id", "bigint"),
+            Column("guild_id", "bigint"),
+            Column("activision_id", "text"),
+            Column("platform", "text"),
+            Column("screenshot_url", "text"),
+            Column("status", "text default 'pending'"),
+            Column("reviewed_by", "bigint"),
+            Column("notes", "text"),
+            Column("submitted_at", "timestamptz default now()"),
+            Column("reviewed_at", "timestamptz"),
+        ),
+        indexes=(Index("verifications_guild_user_idx", "guild_id, user_id"),),
+    ),
+    "appeals": Table(
+        columns=(
+            _id(),
+            Column("user_id", "text"),
+            Column("guild_id", "text"),
+            Column("appeal_text", "text"),
+            Column("status", "text default 'pending'"),
+            Column("submitted_at", "timestamptz default now()"),
+            Column("reviewed_by", "bigint"),
+            Column("reviewed_at", "timestamptz"),
+            Column("review_notes", "text"),
+        ),
+        indexes=(Index("appeals_guild_user_idx", "guild_id, user_id"),),
+    ),
+}
+
+
+def generated_columns(table: str) -> set[str]:
+    """Columns the database computes itself (strip them from rows before inserting)."""
+    spec = MANIFEST.get(table)
+    return {c.name for c in spec.columns if c.generated} if spec else set()
+
+
+def _normalize(columns: str) -> str:
+    """Canonical form of an index column list: lower case, no quotes, single spaces."""
+    columns = columns.replace('"', "").lower()
+    columns = re.sub(r"\s+", " ", columns)
+    columns = re.sub(r"\s*,\s*", ", ", columns).strip()
+    # "asc" is the default and Postgres omits it from indexdef
+    return re.sub(r" asc\b", "", columns)
+
+
+_INDEXDEF = re.compile(r"create (unique )?index .*? on \S+(?: using \w+)? \((.*)\)", re.IGNORECASE)
+
+
+def _parse_indexdef(indexdef: str) -> Optional[tuple[bool, str]]:
+    """Get (unique, normalized columns) from a pg_indexes.indexdef string."""
+    match = _INDEXDEF.match(indexdef.strip())
+    if not match:
+        return None
+    # A partial index (WHERE ...) sits outside the column list; ignore those
+    columns = match.group(2)
+    if ") where " in columns.lower():
+        return None
+    return bool(match.group(1)), _normalize(columns)
+
+
+def _column_ddl(column: Column) -> str:
+    if column.generated:
+        return f"{column.name} {column.type} generated always as ({column.generated}) stored"
+    return f"{column.name} {column.type}"
+
+
+def index_ddl(table: str, index: Index) -> str:
+    unique = "unique " if index.unique else ""
+    return f"create {unique}index if not exists {index.name} on {table} ({index.columns});"
+
+
+def table_ddl(table: str) -> list[str]:
+    spec = MANIFEST[table]
+    columns = ",\n    ".join(_column_ddl(c) for c in spec.columns)
+    return [f"create table if not exists {table} (\n    {columns}\n);"] + [
+        index_ddl(table, index) for index in spec.indexes
+    ]
+
+
+class SchemaReport:
+    """Differences between the manifest and a database catalog."""
+
+    def __init__(self):
+        self.missing_tables: list[str] = []
+        self.missing_columns: list[tuple[str, Column]] = []
+        self.missing_indexes: list[tuple[str, Index]] = []
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing_tables or self.missing_columns or self.missing_indexes)
+
+    def problems(self) -> list[str]:
+        return (
+            [f"missing table {t}" for t in self.missing_tables]
+            + [f"missing column {t}.{c.name}" for t, c in self.missing_columns]
+            + [f"missing index {t} ({i.columns})" for t, i in self.missing_indexes]
+        )
+
+    def ddl(self) -> str:
+        """Postgres statements that bring the database in line with the manifest."""
+        statements = []
+        for table in self.missing_tables:
+            statements.extend(table_ddl(table))
+        for table, column in self.missing_columns:
+            statements.append(f"alter table {table} add column if not exists {_column_ddl(column)};")
+        for table, index in self.missing_indexes:
+            statements.append(index_ddl(table, index))
+        return "\n".join(statements)
+
+
+def check_catalog(rows: list[dict]) -> SchemaReport:
+    """
+    Compare schema_catalog() rows against the manifest.
+
+    An index requirement is met by any index on the same table with the same
+    column list (in order), whatever it is named; unique ones must be unique.
+    """
+    columns: dict[str, set[str]] = {}
+    indexes: dict[str, list[tuple[bool, str]]] = {}
+    for row in rows:
+        table = row["table_name"]
+        if row["kind"] == "column":
+            columns.setdefault(table, set()).add(row["name"])
+        elif row["kind"] == "index":
+            parsed = _parse_indexdef(row["detail"])
+            if parsed:
+                indexes.setdefault(table, []).append(parsed)
+
+    report = SchemaReport()
+    for table, spec in MANIFEST.items():
+        if table not in columns:
+            report.missing_tables.append(table)
+            continue
+        for column in spec.columns:
+            if column.name not in columns[table]:
+                report.missing_columns.append((table, column))
+        for index in spec.indexes:
+            wanted = _normalize(index.columns)
+            if not any(
+                cols == wanted and (unique or not index.unique)
+                for unique, cols in indexes.get(table, [])
+            ):
+                report.missing_indexes.append((table, index))
+    return report
+
+
+def fetch_catalog_dsn(dsn: str) -> list[dict]:
+    """Read the catalog straight from Postgres (needs psycopg2, as the dashboard does)."""
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(CATALOG_QUERY)
+            return [
+                {"kind": kind, "table_name": table, "name": name, "detail": detail}
+                for kind, table, name, detail in cur.fetchall()
+            ]
+    finally:
+        conn.close()
+
+
+def catalog_sqlite(conn) -> list[dict]:
+    """SQLite stand-in for schema_catalog(), with index definitions in pg_indexes form."""
+    rows = []
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    for table in tables:
+        for column in conn.execute(f'PRAGMA table_xinfo("{table}")'):
+            rows.append({"kind": "column", "table_name": table, "name": column[1], "detail": column[2]})
+        for _, name, unique, *_ in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+            keys = [
+                f"{col}{' DESC' if desc else ''}"
+                for _, _, col, desc, _, key in conn.execute(f'PRAGMA index_xinfo("{name}")')
+                if key and col is not None
+            ]
+            rows.append({
+                "kind": "index",
+                "table_name": table,
+                "name": name,
+                "detail": f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(keys)})",
+            })
+        # An INTEGER/TEXT PRIMARY KEY has no index_list entry but is unique
+        pk = [c[1] for c in conn.execute(f'PRAGMA table_info("{table}")') if c[5]]
+        if pk:
+            rows.append({
+                "kind": "index",
+                "table_name": table,
+                "name": f"{table}_pkey",
+                "detail": f"CREATE UNIQUE INDEX {table}_pkey ON {table} ({', '.join(pk)})",
+            })
+    return rows
@@ -0,0 +1,93 @@
+﻿"""
+In-process settings cache for MalaBoT.
+Keeps per-guild setting values in memory so hot reads skip the Supabase round trip.
+"""
+
+import time
+from typing import Optional
+
+
+class SettingsCache:
+    """Per-guild TTL cache for settings, including negative entries for missing keys."""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        # guild key -> {setting_key: (value, expires_at)}
+        self._guilds: dict[Optional[str], dict[str, tuple[Optional[str], float]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    @staticmethod
+    def guild_key(guild_id: Optional[int]) -> Optional[str]:
+        """Normalize a guild ID the same way the settings table stores it."""
+        return str(guild_id) if guild_id else None
+
+    def lookup(self, key: str, guild_id: Optional[int]) -> tuple[bool, Optional[str]]:
+        """
+        Look up a cached setting.
+
+        Returns:
+            (found, value) - found is False on a miss or an expired entry.
+            A found entry with value None is a cached "setting does not exist".
+        """
+        entries = self._guilds.get(self.guild_key(guild_id))
+        if entries is not None:
+            entry = entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if time.monotonic() < expires_at:
+                    self.hits += 1
+                    return True, value
+
+        self.misses += 1
+        return False, None
+
+    def lookup_stale(self, key: str, guild_id: Optional[int]) -> tuple[bool, Optional[str]]:
+        """
+        Look up a setting ignoring expiry, for serving reads while the database is down.
+
+        Expired entries are kept until replaced or invalidated for this reason.
+        """
+        entry = self._guilds.get(self.guild_key(guild_id), {}).get(key)
+        if entry is None:
+            return False, None
+        self.stale_hits += 1
+        return True, entry[0]
+
+    def lookup_stale_all(self, keys: list[str], guild_id: Optional[int]) -> Optional[dict[str, Optional[str]]]:
+        """Like lookup_stale for several keys; None (and no stale hits counted) unless all are cached."""
+        entries = self._guilds.get(self.guild_key(guild_id), {})
+        if not all(key in entries for key in keys):
+            return None
+        self.stale_hits += len(keys)
+        return {key: entries[key][0] for key in keys}
+
+    def store(self, key: str, value: Optional[str], guild_id: Optional[int]) -> None:
+        """Cache a setting value (None caches the key as missing)."""
+        entries = self._guilds.setdefault(self.guild_key(guild_id), {})
+        entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, guild_id: Optional[int] = None, key: Optional[str] = None) -> None:
+        """Drop one key, one guild, or (with no guild) the whole cache."""
+        if guild_id is None and key is None:
+            self._guilds.clear()
+            return
+
+        guild = self.guild_key(guild_id)
+        if key is None:
+            self._guilds.pop(guild, None)
+        elif guild in self._guilds:
+            self._guilds[guild].pop(key, None)
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counters and cache size."""
+        total = self.hits + self.misses
+        return {
+            "guilds": len(self._guilds),
+            "entries": sum(len(entries) for entries in self._guilds.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "hit_rate": (self.hits / total * 100) if total else 0.0,
+        }
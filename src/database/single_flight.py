@@ -0,0 +1,45 @@
+"""
+Request coalescing for MalaBoT.
+Concurrent identical reads share one in-flight query instead of each hitting
+Supabase, e.g. when a raid fires dozens of on_member_join handlers at once.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; callers arriving meanwhile share its result."""
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+        # Stats
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await func() for this key, or join the call already in flight.
+
+        The shared call runs as its own task, so one caller being cancelled
+        doesn't cancel it for the others.
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> dict:
+        """Get call counts and the share of calls served by another caller's query."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "hit_rate": (self.coalesced / self.calls * 100) if self.calls else 0.0,
+        }
@@ -0,0 +1,575 @@
+"""
+SQLite backend for MalaBoT.
+Runs the full DatabaseManager on a local SQLite file (WAL mode) for small
+deployments and offline runs. Select it with DATABASE_BACKEND=sqlite.
+
+SQLiteClient answers the same table()/rpc() query-builder calls the code
+makes against the Supabase client, so every DatabaseManager method and every
+cog that queries db.supabase directly works unchanged.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Optional
+
+from src.config.settings import settings
+from src.database.audit_digest import AUDIT_COUNTS_FUNCTION, audit_counts_sqlite
+from src.database.instrumentation import instrument_methods
+from src.database.schema_manifest import SCHEMA_CATALOG_FUNCTION, catalog_sqlite
+from src.database.supabase_models import DatabaseManager
+from src.database.xp_increment import XP_INCREMENT_FUNCTION, increment_user_xp_sqlite
+from src.utils.level_engine import LevelCurve, get_curve
+
+_UTC_NOW = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    guild_id INTEGER,
+    username TEXT,
+    discriminator TEXT,
+    xp INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 0,
+    total_messages INTEGER DEFAULT 0,
+    daily_streak INTEGER DEFAULT 0,
+    last_announced_level INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT {_UTC_NOW},
+    UNIQUE (user_id, guild_id)
+);
+CREATE INDEX IF NOT EXISTS users_guild_xp_idx ON users (guild_id, xp DESC);
+CREATE INDEX IF NOT EXISTS users_guild_user_idx ON users (guild_id, user_id);
+
+CREATE TABLE IF NOT EXISTS settings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER,
+    setting_key TEXT NOT NULL,
+    value TEXT,
+    updated_at TEXT DEFAULT {_UTC_NOW},
+    UNIQUE (guild_id, setting_key)
+);
+CREATE INDEX IF NOT EXISTS settings_updated_at_idx ON settings (updated_at);
+
+CREATE TABLE IF NOT EXISTS birthdays (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    guild_id INTEGER,
+    birthday TEXT,
+    birthday_md TEXT GENERATED ALWAYS AS (substr(birthday, -5)) VIRTUAL,
+    timezone TEXT DEFAULT 'UTC',
+    announced_date TEXT,
+    announced_year INTEGER,
+    created_at TEXT DEFAULT {_UTC_NOW},
+    updated_at TEXT DEFAULT {_UTC_NOW},
+    UNIQUE (user_id, guild_id)
+);
+CREATE INDEX IF NOT EXISTS birthdays_guild_idx ON birthdays (guild_id, birthday);
+CREATE INDEX IF NOT EXISTS birthdays_updated_at_idx ON birthdays (updated_at);
+
+CREATE TABLE IF NOT EXISTS daily_checkins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    guild_id INTEGER,
+    last_checkin TEXT,
+    checkin_streak INTEGER DEFAULT 0,
+    UNIQUE (user_id, guild_id)
+);
+
+CREATE TABLE IF NOT EXISTS level_roles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER,
+    level INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    updated_at TEXT DEFAULT {_UTC_NOW}
+);
+CREATE INDEX IF NOT EXISTS level_roles_guild_idx ON level_roles (guild_id, level);
+CREATE INDEX IF NOT EXISTS level_roles_updated_at_idx ON level_roles (updated_at);
+
+CREATE TABLE IF NOT EXISTS roast_xp (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action TEXT UNIQUE,
+    base_xp INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS audit_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT DEFAULT {_UTC_NOW},
+    category TEXT,
+    action TEXT,
+    user_id INTEGER,
+    target_id INTEGER,
+    channel_id INTEGER,
+    details TEXT,
+    guild_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS audit_log_guild_time_idx ON audit_log (guild_id, timestamp);
+CREATE INDEX IF NOT EXISTS audit_log_timestamp_idx ON audit_log (timestamp);
+
+CREATE TABLE IF NOT EXISTS mod_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    moderator_id INTEGER,
+    user_id INTEGER,
+    action TEXT,
+    reason TEXT,
+    guild_id INTEGER,
+    channel_id INTEGER,
+    message_count INTEGER,
+    created_at TEXT DEFAULT {_UTC_NOW}
+);
+CREATE INDEX IF NOT EXISTS mod_logs_guild_time_idx ON mod_logs (guild_id, created_at);
+
+CREATE TABLE IF NOT EXISTS health_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT DEFAULT {_UTC_NOW},
+    component TEXT,
+    status TEXT,
+    value REAL,
+    details TEXT
+);
+
+CREATE TABLE IF NOT EXISTS system_flags (
+    flag_name TEXT PRIMARY KEY,
+    flag_value TEXT,
+    description TEXT,
+    updated_at TEXT DEFAULT {_UTC_NOW}
+);
+
+CREATE TABLE IF NOT EXISTS verifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    guild_id INTEGER,
+    activision_id TEXT,
+    platform TEXT,
+    screenshot_url TEXT,
+    status TEXT DEFAULT 'pending',
+    reviewed_by INTEGER,
+    notes TEXT,
+    submitted_at TEXT DEFAULT {_UTC_NOW},
+    reviewed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS verifications_guild_user_idx ON verifications (guild_id, user_id);
+
+CREATE TABLE IF NOT EXISTS appeals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    guild_id INTEGER,
+    appeal_text TEXT,
+    status TEXT DEFAULT 'pending',
+    submitted_at TEXT DEFAULT {_UTC_NOW},
+    reviewed_by INTEGER,
+    reviewed_at TEXT,
+    review_notes TEXT
+);
+CREATE INDEX IF NOT EXISTS appeals_guild_user_idx ON appeals (guild_id, user_id);
+
+-- Bump updated_at on every change so the table mirror can refresh incrementally
+CREATE TRIGGER IF NOT EXISTS settings_touch AFTER UPDATE ON settings
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE settings SET updated_at = {_UTC_NOW} WHERE id = NEW.id; END;
+CREATE TRIGGER IF NOT EXISTS level_roles_touch AFTER UPDATE ON level_roles
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE level_roles SET updated_at = {_UTC_NOW} WHERE id = NEW.id; END;
+CREATE TRIGGER IF NOT EXISTS birthdays_touch AFTER UPDATE ON birthdays
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE birthdays SET updated_at = {_UTC_NOW} WHERE id = NEW.id; END;
+"""
+
+# Columns added after a table's first release: (table, column, definition).
+# CREATE TABLE IF NOT EXISTS doesn't touch existing files, so these are added on open.
+SCHEMA_UPGRADES = [
+    ("birthdays", "birthday_md", "TEXT GENERATED ALWAYS AS (substr(birthday, -5)) VIRTUAL"),
+    ("users", "last_announced_level", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+# Indexes on upgraded columns, created once the columns exist
+UPGRADE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS birthdays_guild_md_idx ON birthdays (guild_id, birthday_md);
+"""
+
+# Conflict target when upsert() is called without on_conflict (PostgREST uses the primary key)
+DEFAULT_CONFLICT_KEYS = {
+    "users": "user_id,guild_id",
+    "settings": "guild_id,setting_key",
+    "birthdays": "user_id,guild_id",
+    "daily_checkins": "user_id,guild_id",
+    "system_flags": "flag_name",
+    "roast_xp": "action",
+}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _ident(name: str) -> str:
+    """Quote a table/column name after checking it is a plain identifier."""
+    name = name.strip()
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return f'"{name}"'
+
+
+def _adapt(value: Any) -> Any:
+    """Convert a Python value to something sqlite3 can bind."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+class SQLiteRPCError(Exception):
+    """Raised for unknown RPC functions, with the same code PostgREST uses."""
+
+    def __init__(self, message: str, code: str = "PGRST202"):
+        super().__init__(message)
+        self.code = code
+
+
+class SQLiteResponse:
+    """Mirror of the postgrest APIResponse fields the code reads."""
+
+    def __init__(self, data: list[dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class SQLiteQuery:
+    """Chainable query builder with the subset of the postgrest API MalaBoT uses."""
+
+    def __init__(self, client: "SQLiteClient", table: str):
+        self.client = client
+        self.table = _ident(table)
+        self.table_name = table
+        self.op = "select"
+        self.columns = "*"
+        self.count: Optional[str] = None
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.filters: list[tuple[str, list]] = []
+        self.order_by: list[str] = []
+        self.limit_value: Optional[int] = None
+        self.offset_value: int = 0
+
+    # Operations
+
+    def select(self, columns: str = "*", count: Optional[str] = None, **_) -> "SQLiteQuery":
+        self.op, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, rows: Any, **_) -> "SQLiteQuery":
+        self.op, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows: Any, on_conflict: Optional[str] = None, **_) -> "SQLiteQuery":
+        self.op, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values: dict, **_) -> "SQLiteQuery":
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self, count: Optional[str] = None, **_) -> "SQLiteQuery":
+        self.op, self.count = "delete", count
+        return self
+
+    # Filters
+
+    def _filter(self, column: str, op: str, value: Any) -> "SQLiteQuery":
+        self.filters.append((f"{_ident(column)} {op} ?", [_adapt(value)]))
+        return self
+
+    def eq(self, column: str, value: Any) -> "SQLiteQuery":
+        if value is None:
+            self.filters.append((f"{_ident(column)} IS NULL", []))
+            return self
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "!=", value)
+
+    def gt(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "<=", value)
+
+    def like(self, column: str, pattern: str) -> "SQLiteQuery":
+        return self._filter(column, "LIKE", pattern)
+
+    def in_(self, column: str, values: list) -> "SQLiteQuery":
+        values = list(values)
+        if not values:
+            self.filters.append(("0", []))
+        else:
+            placeholders = ", ".join("?" for _ in values)
+            self.filters.append((f"{_ident(column)} IN ({placeholders})", [_adapt(v) for v in values]))
+        return self
+
+    def is_(self, column: str, value: Any) -> "SQLiteQuery":
+        if value is None or value == "null":
+            self.filters.append((f"{_ident(column)} IS NULL", []))
+            return self
+        return self._filter(column, "IS", value)
+
+    # Modifiers
+
+    def order(self, column: str, desc: bool = False, **_) -> "SQLiteQuery":
+        self.order_by.append(f"{_ident(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, count: int) -> "SQLiteQuery":
+        self.limit_value = count
+        return self
+
+    def range(self, start: int, end: int) -> "SQLiteQuery":
+        self.offset_value = start
+        self.limit_value = end - start + 1
+        return self
+
+    def execute(self) -> SQLiteResponse:
+        return self.client.execute_query(self)
+
+    # SQL generation
+
+    def where_sql(self) -> tuple[str, list]:
+        if not self.filters:
+            return "", []
+        clauses = " AND ".join(clause for clause, _ in self.filters)
+        params = [p for _, values in self.filters for p in values]
+        return f" WHERE {clauses}", params
+
+    def select_columns(self) -> str:
+        columns = [c.strip() for c in self.columns.split(",") if c.strip()]
+        if columns == ["*"]:
+            return "*"
+        # PostgREST treats a bare "count" column as an aggregate
+        return ", ".join("count(*) AS count" if c == "count" else _ident(c) for c in columns)
+
+
+class SQLiteRPC:
+    """Deferred rpc() call, executed like a query."""
+
+    def __init__(self, client: "SQLiteClient", name: str, params: dict):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> SQLiteResponse:
+        return self.client.execute_rpc(self.name, self.params)
+
+
+class SQLiteClient:
+    """SQLite stand-in for the Supabase client: table() and rpc() builders over one connection."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Queries arrive from the executor's worker threads; one connection guarded by a lock
+        self.conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, cached_statements=512
+        )
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA busy_timeout=5000")
+            self.conn.executescript(SCHEMA_SQL)
+            self._upgrade_schema()
+
+    def _upgrade_schema(self) -> None:
+        """Add SCHEMA_UPGRADES columns missing from a database file created by an older version."""
+        for table, column, definition in SCHEMA_UPGRADES:
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_xinfo({table})")}
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        self.conn.executescript(UPGRADE_INDEX_SQL)
+
+    def table(self, name: str) -> SQLiteQuery:
+        return SQLiteQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[dict] = None) -> SQLiteRPC:
+        return SQLiteRPC(self, name, params or {})
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    def execute_sql(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Run raw SQL and return all rows as tuples (for legacy raw-SQL call sites)."""
+        with self.lock:
+            cursor = self.conn.execute(sql, tuple(_adapt(p) for p in params))
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def execute_query(self, query: SQLiteQuery) -> SQLiteResponse:
+        with self.lock:
+            if query.op == "select":
+                return self._select(query)
+            if query.op in ("insert", "upsert"):
+                return self._insert(query)
+            if query.op == "update":
+                return self._update(query)
+            return self._delete(query)
+
+    def execute_rpc(self, name: str, params: dict) -> SQLiteResponse:
+        if name == AUDIT_COUNTS_FUNCTION:
+            with self.lock:
+                return SQLiteResponse(audit_counts_sqlite(self.conn, params["p_since"], params.get("p_guild_id")))
+        if name == SCHEMA_CATALOG_FUNCTION:
+            with self.lock:
+                return SQLiteResponse(catalog_sqlite(self.conn))
+        if name != XP_INCREMENT_FUNCTION:
+            raise SQLiteRPCError(f"Could not find the function {name}")
+
+        levels = params.get("p_levels") or []
+        thresholds = params.get("p_thresholds") or []
+        progression = params.get("p_progression", "custom")
+        curve = LevelCurve(levels, thresholds) if levels else get_curve(progression)
+        with self.lock:
+            new_xp, new_level, leveled_up = increment_user_xp_sqlite(
+                self.conn,
+                params["p_user_id"],
+                params["p_guild_id"],
+                params["p_xp_change"],
+                progression,
+                curve=curve,
+            )
+        return SQLiteResponse([{"new_xp": new_xp, "new_level": new_level, "leveled_up": leveled_up}])
+
+    def _select(self, query: SQLiteQuery) -> SQLiteResponse:
+        where, params = query.where_sql()
+        sql = f"SELECT {query.select_columns()} FROM {query.table}{where}"
+        if query.order_by:
+            sql += " ORDER BY " + ", ".join(query.order_by)
+        if query.limit_value is not None or query.offset_value:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [query.limit_value if query.limit_value is not None else -1, query.offset_value]
+
+        rows = [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+
+        count = None
+        if query.count:
+            count_where, count_params = query.where_sql()
+            count = self.conn.execute(f"SELECT count(*) FROM {query.table}{count_where}", count_params).fetchone()[0]
+        return SQLiteResponse(rows, count)
+
+    def _insert(self, query: SQLiteQuery) -> SQLiteResponse:
+        rows = query.payload if isinstance(query.payload, list) else [query.payload]
+        if not rows:
+            return SQLiteResponse([])
+
+        conflict_keys = None
+        if query.op == "upsert":
+            conflict_keys = [k.strip() for k in (query.on_conflict or DEFAULT_CONFLICT_KEYS[query.table_name]).split(",")]
+
+        inserted = []
+        self.conn.execute("BEGIN")
+        try:
+            for row in rows:
+                columns = list(row.keys())
+                sql = (
+                    f"INSERT INTO {query.table} ({', '.join(_ident(c) for c in columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})"
+                )
+                if conflict_keys:
+                    updates = [c for c in columns if c not in conflict_keys]
+                    target = ", ".join(_ident(k) for k in conflict_keys)
+                    if updates:
+                        sql += f" ON CONFLICT ({target}) DO UPDATE SET " + ", ".join(
+                            f"{_ident(c)} = excluded.{_ident(c)}" for c in updates
+                        )
+                    else:
+                        sql += f" ON CONFLICT ({target}) DO NOTHING"
+                sql += " RETURNING *"
+                inserted.extend(dict(r) for r in self.conn.execute(sql, [_adapt(row[c]) for c in columns]).fetchall())
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return SQLiteResponse(inserted)
+
+    def _update(self, query: SQLiteQuery) -> SQLiteResponse:
+        columns = list(query.payload.keys())
+        where, params = query.where_sql()
+        sql = (
+            f"UPDATE {query.table} SET {', '.join(f'{_ident(c)} = ?' for c in columns)}"
+            f"{where} RETURNING *"
+        )
+        values = [_adapt(query.payload[c]) for c in columns] + params
+        return SQLiteResponse([dict(r) for r in self.conn.execute(sql, values).fetchall()])
+
+    def _delete(self, query: SQLiteQuery) -> SQLiteResponse:
+        where, params = query.where_sql()
+        sql = f"DELETE FROM {query.table}{where} RETURNING *"
+        rows = [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+        return SQLiteResponse(rows, len(rows) if query.count else None)
+
+
+class SQLiteCursor:
+    """Result of SQLiteConnection.execute, with aiosqlite-style fetch methods."""
+
+    def __init__(self, rows: list[tuple]):
+        self._rows = rows
+
+    async def fetchone(self) -> Optional[tuple]:
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self) -> list[tuple]:
+        return self._rows
+
+
+class SQLiteConnection:
+    """aiosqlite-style connection for the raw-SQL call sites (e.g. the appeal cog)."""
+
+    def __init__(self, client: SQLiteClient, executor):
+        self.client = client
+        self.executor = executor
+
+    async def execute(self, sql: str, params: tuple = ()) -> SQLiteCursor:
+        return SQLiteCursor(await self.executor.call(self.client.execute_sql, sql, params))
+
+    async def fetchone(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        return await (await self.execute(sql, params)).fetchone()
+
+    async def commit(self) -> None:
+        """Statements autocommit; kept for API compatibility."""
+
+
+@instrument_methods()
+class SQLiteDatabaseManager(DatabaseManager):
+    """DatabaseManager backed by a local SQLite file instead of Supabase."""
+
+    def __init__(self, db_path: str = None):
+        path = db_path or sqlite_path_from_url(settings.DATABASE_URL)
+        # Stored as .supabase because cogs build queries through that attribute
+        super().__init__(client=SQLiteClient(path))
+
+    async def get_connection(self):
+        """Get a raw-SQL connection for legacy call sites."""
+        return SQLiteConnection(self.supabase, self.executor)
+
+    async def close(self) -> None:
+        """Drain background writers, then close the SQLite file."""
+        await super().close()
+        self.supabase.close()
+
+
+def sqlite_path_from_url(url: str) -> str:
+    """Turn sqlite:///data/bot.db into data/bot.db."""
+    return url.split("sqlite:///", 1)[1] if url.startswith("sqlite:///") else url
+
+
+def create_database_manager() -> DatabaseManager:
+    """Create the DatabaseManager for the configured DATABASE_BACKEND."""
+    if settings.DATABASE_BACKEND == "sqlite":
+        return SQLiteDatabaseManager()
+    return DatabaseManager()
@@ -3,23 +3,78 @@ Supabase database models for MalaBoT.
 Drop-in replacement for SQLite models.
 """
 
-from supabase import create_client, Client
-from typing import Optional, Any
-import os
+import time
+
+from supabase import Client
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
+
+from src.config.settings import settings
+from src.database.audit_digest import AUDIT_COUNTS_FUNCTION, count_rows, summarize_counts
+from src.database.audit_pipeline import AuditLogPipeline
+from src.database.circuit_breaker import CircuitBreaker, is_transient
+from src.database.departure_cleanup import DepartureCleanup
+from src.database.executor import QueryExecutor
+from src.database.health_ring import HealthRing
+from src.database.instrumentation import db_metrics, instrument_methods
+from src.database.schema_manifest import SCHEMA_CATALOG_FUNCTION, SchemaReport, check_catalog
+from src.database.leaderboard import LeaderboardIndex
+from src.database.settings_cache import SettingsCache
+from src.database.single_flight import SingleFlight
+from src.database.table_mirror import TableMirror
+from src.database.transport import get_supabase_client
+from src.database.xp_buffer import XPWriteBuffer
+from src.database.xp_increment import XP_INCREMENT_FUNCTION, increment_params
+from src.utils.level_engine import LevelCurve, get_curve
 
 load_dotenv()
 
 
+@instrument_methods(exclude=("run_query",))
 class DatabaseManager:
     """Manages all database operations for MalaBoT using Supabase."""
 
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, client: Any = None):
         # db_path is ignored but kept for compatibility
-        self.supabase: Client = create_client(
-            os.getenv('SUPABASE_URL'),
-            os.getenv('SUPABASE_KEY')
+        # client lets another backend (see sqlite_backend) supply a query-builder compatible client;
+        # otherwise every DatabaseManager shares one Supabase client and its pooled connections
+        self.supabase: Client = client if client is not None else get_supabase_client()
+        # supabase-py is synchronous, so every query runs on a bounded thread pool
+        self.executor = QueryExecutor(
+            max_workers=settings.DB_MAX_WORKERS,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.DB_BREAKER_THRESHOLD,
+                reset_timeout=settings.DB_BREAKER_RESET_TIMEOUT,
+            ),
+            retry_attempts=settings.DB_RETRY_ATTEMPTS,
+            retry_base_delay=settings.DB_RETRY_BASE_DELAY,
+            retry_max_delay=settings.DB_RETRY_MAX_DELAY,
+        )
+        self.settings_cache = SettingsCache(ttl=settings.SETTINGS_CACHE_TTL)
+        # Concurrent identical reads share one in-flight query
+        self.single_flight = SingleFlight()
+        # Flipped off if the increment_user_xp Postgres function isn't installed
+        self.atomic_xp_enabled = True
+        # Flipped off if the audit_log_counts Postgres function isn't installed
+        self.audit_counts_enabled = True
+        # Flipped off if birthdays has no birthday_md column yet (see schema_manifest)
+        self.birthday_md_enabled = True
+        # Flipped off if users has no last_announced_level column yet (see schema_manifest)
+        self.announced_level_enabled = True
+        # Write-behind XP buffer, only started by the bot process (see start_xp_buffer)
+        self.xp_buffer: Optional[XPWriteBuffer] = None
+        # Batched audit/mod-log inserts, only started by the bot process (see start_audit_pipeline)
+        self.audit_pipeline: Optional[AuditLogPipeline] = None
+        # Batched deletes for members who left, only started by the bot process (see start_departure_cleanup)
+        self.departure_cleanup: Optional[DepartureCleanup] = None
+        # In-memory copy of settings/level_roles/birthdays, only started by the bot process (see start_table_mirror)
+        self.table_mirror: Optional[TableMirror] = None
+        # Recent health samples; only rollups and status changes reach health_logs
+        self.health_ring = HealthRing(rollup_interval=settings.HEALTH_ROLLUP_INTERVAL)
+        # In-memory leaderboards, kept current by the XP write methods below
+        self.leaderboards: Optional[LeaderboardIndex] = (
+            LeaderboardIndex(self) if settings.LEADERBOARD_CACHE_ENABLED else None
         )
         # Note: guild_id removed to ensure per-guild operations only
 
@@ -27,149 +82,451 @@ class DatabaseManager:
         """Compatibility method - returns self since Supabase doesn't need connections."""
         return self
 
+    async def run_query(self, query: Any) -> Any:
+        """Execute a query builder off the event loop and return the response."""
+        if not db_metrics.enabled:
+            return await self.executor.run(query)
+
+        started = time.perf_counter()
+        result = None
+        error = False
+        try:
+            result = await self.executor.run(query)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            db_metrics.record_query(query, (time.perf_counter() - started) * 1000, result, error)
+
+    async def iter_rows(
+        self,
+        table: str,
+        columns: str = '*',
+        key: str = 'id',
+        filters: Optional[dict] = None,
+        where: Optional[Callable[[Any], Any]] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Stream every matching row of a table, one page at a time.
+
+        Pages are fetched with keyset pagination (key > last key seen, ordered by key),
+        so each page is an index range scan and memory stays at one page.
+
+        Args:
+            table: Table to read
+            columns: Columns to select (key is added if missing)
+            key: Unique, sortable column to page on
+            filters: Equality filters, {column: value}
+            where: Extra builder conditions, e.g. lambda q: q.gt('xp', 0)
+            page_size: Rows per request (defaults to DB_PAGE_SIZE)
+        """
+        page_size = page_size or settings.DB_PAGE_SIZE
+        if columns != '*' and key not in [c.strip() for c in columns.split(',')]:
+            columns = f"{columns}, {key}"
+
+        last = None
+        while True:
+            query = self.supabase.table(table).select(columns)
+            for column, value in (filters or {}).items():
+                query = query.eq(column, value)
+            if where:
+                query = where(query)
+            if last is not None:
+                query = query.gt(key, last)
+            result = await self.run_query(query.order(key).limit(page_size))
+
+            for row in result.data:
+                yield row
+            if len(result.data) < page_size:
+                return
+            last = result.data[-1][key]
+
+    async def _shared_read(self, key: tuple, build: Callable[[], Any]) -> list[dict]:
+        """
+        Run a read query, joining an identical one already in flight.
+
+        Returns copies of the rows, so callers can modify them without affecting each other.
+        """
+        result = await self.single_flight.do(key, lambda: self.run_query(build()))
+        return [dict(row) for row in result.data]
+
+    def get_executor_stats(self) -> dict:
+        """Get queue depth and wait-time stats for the query executor."""
+        return self.executor.get_stats()
+
+    async def ping(self) -> None:
+        """Run the cheapest possible query; raises if the database can't be reached."""
+        await self.run_query(self.supabase.table('system_flags').select('flag_name').limit(1))
+
+    def get_database_state(self) -> dict:
+        """Get the circuit breaker state ("closed" is healthy) for health checks and the watchdog."""
+        return self.executor.breaker.get_stats()
+
+    async def verify_schema(self) -> Optional[SchemaReport]:
+        """
+        Compare the live schema with the manifest.
+
+        None if schema_catalog() isn't installed or this key may not call it (service role only).
+        """
+        try:
+            result = await self.run_query(self.supabase.rpc(SCHEMA_CATALOG_FUNCTION, {}))
+        except Exception as e:
+            # PGRST202 = function not found, 42501 = permission denied
+            if getattr(e, 'code', None) not in ('PGRST202', '42501'):
+                raise
+            return None
+        return check_catalog(result.data)
+
     async def initialize(self) -> None:
         """Initialize database - tables already exist in Supabase."""
         await self._initialize_roast_xp()
 
+    async def start_xp_buffer(self) -> None:
+        """Start batching XP writes, replaying any journal left by a crash."""
+        if self.xp_buffer or not settings.XP_BUFFER_ENABLED:
+            return
+        buffer = XPWriteBuffer(
+            self,
+            flush_interval=settings.XP_FLUSH_INTERVAL,
+            max_pending=settings.XP_FLUSH_MAX_PENDING,
+            journal_path=settings.XP_JOURNAL_PATH,
+        )
+        await buffer.start()
+        self.xp_buffer = buffer
+
+    async def start_audit_pipeline(self) -> None:
+        """Queue audit and moderation log rows and insert them in background batches."""
+        if self.audit_pipeline or not settings.AUDIT_PIPELINE_ENABLED:
+            return
+        pipeline = AuditLogPipeline(
+            self,
+            max_queue=settings.AUDIT_QUEUE_SIZE,
+            batch_size=settings.AUDIT_BATCH_SIZE,
+            flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+            overflow_policy=settings.AUDIT_OVERFLOW_POLICY,
+        )
+        await pipeline.start()
+        self.audit_pipeline = pipeline
+
+    async def start_departure_cleanup(self) -> None:
+        """Collect departed members and delete their rows in background batches."""
+        if self.departure_cleanup or not settings.DEPARTURE_CLEANUP_ENABLED:
+            return
+        cleanup = DepartureCleanup(
+            self,
+            batch_size=settings.DEPARTURE_BATCH_SIZE,
+            flush_interval=settings.DEPARTURE_FLUSH_INTERVAL,
+        )
+        await cleanup.start()
+        self.departure_cleanup = cleanup
+
+    async def start_table_mirror(self) -> None:
+        """Load settings, level roles and birthdays into memory and keep them refreshed."""
+        if self.table_mirror or not settings.TABLE_MIRROR_ENABLED:
+            return
+        mirror = TableMirror(
+            self,
+            refresh_interval=settings.TABLE_MIRROR_REFRESH_INTERVAL,
+            resync_interval=settings.TABLE_MIRROR_RESYNC_INTERVAL,
+        )
+        try:
+            await mirror.start()
+        except Exception as e:
+            # Reads keep going straight to the database
+            print(f"ERROR: Failed to load table mirror: {e}")
+            return
+        self.table_mirror = mirror
+
+    async def _insert_log(self, table: str, row: dict) -> None:
+        """Insert a log row, through the audit pipeline when it is running."""
+        if self.audit_pipeline:
+            await self.audit_pipeline.submit(table, row)
+        else:
+            await self.run_query(self.supabase.table(table).insert(row))
+
+    def forget_user_xp(self, user_id: int, guild_id: int) -> None:
+        """Drop buffered and leaderboard XP for a user whose row is being deleted."""
+        if self.xp_buffer:
+            self.xp_buffer.discard(user_id, guild_id)
+        if self.leaderboards:
+            self.leaderboards.forget(user_id, guild_id)
+
+    async def cleanup_departed_member(self, user_id: int, guild_id: int) -> None:
+        """
+        Remove a member's XP, birthday and verification and cancel their pending appeals.
+
+        With the cleanup queue running this happens in the next batch, so a member
+        who rejoins first (see cancel_departure_cleanup) keeps everything.
+        """
+        if self.departure_cleanup:
+            self.departure_cleanup.submit(user_id, guild_id)
+        else:
+            await self.delete_departed_members(guild_id, [user_id])
+
+    def cancel_departure_cleanup(self, user_id: int, guild_id: int) -> None:
+        """Keep the data of a member who rejoined before their cleanup batch ran."""
+        if self.departure_cleanup:
+            self.departure_cleanup.cancel(user_id, guild_id)
+
+    async def delete_departed_members(self, guild_id: int, user_ids: list[int]) -> None:
+        """Delete the rows of many departed members with one query per table."""
+        for user_id in user_ids:
+            self.forget_user_xp(user_id, guild_id)
+            if self.table_mirror:
+                self.table_mirror.delete('birthdays', {'guild_id': guild_id, 'user_id': user_id})
+        if self.xp_buffer:
+            # Waits out a flush already writing their old XP, so it can't land after the delete
+            await self.xp_buffer.flush()
+
+        for table in ('users', 'birthdays', 'verifications'):
+            await self.run_query(self.supabase.table(table).delete().eq('guild_id', guild_id).in_('user_id', user_ids))
+        await self.run_query(self.supabase.table('appeals').update({
+            'status': 'cancelled'
+        }).eq('guild_id', str(guild_id)).in_('user_id', [str(u) for u in user_ids]).eq('status', 'pending'))
+
+        await self.log_event(
+            category="MEMBER",
+            action="LEAVE_CLEANUP",
+            details=f"Removed data for {len(user_ids)} departed members: {', '.join(str(u) for u in user_ids)}",
+            guild_id=guild_id,
+        )
+
     async def _initialize_roast_xp(self) -> None:
         """Initialize roast XP table with default values."""
         try:
-            result = self.supabase.table('roast_xp').select('*').execute()
+            result = await self.run_query(self.supabase.table('roast_xp').select('*'))
             if len(result.data) == 0:
-                self.supabase.table('roast_xp').insert([
+                await self.run_query(self.supabase.table('roast_xp').insert([
                     {'action': 'roast_success', 'base_xp': 15},
                     {'action': 'roast_fail', 'base_xp': 5},
                     {'action': 'defend_success', 'base_xp': 10},
                     {'action': 'defend_fail', 'base_xp': 3},
                     {'action': 'compliment', 'base_xp': 8}
-                ]).execute()
+                ]))
         except Exception:
             pass  # Already exists
 
     # === XP METHODS ===
 
     async def get_user_xp(self, user_id: int, guild_id: int) -> int:
-        """Get user's current XP."""
-        result = self.supabase.table('users').select('xp').eq('user_id', user_id).eq('guild_id', guild_id).execute()
-        
-        if not result.data:
-            # Create user if doesn't exist
-            self.supabase.table('users').insert({
-                'user_id': user_id,
-                'guild_id': str(guild_id) if guild_id else None,
-                'username': 'Unknown',
-                'discriminator': '0',
-                'xp': 0,
-                'level': 0
-            }).execute()
-            return 0
-        
-        return result.data[0]['xp']
+        """Get user's current XP (0 if they have no row; lookups never create one)."""
+        if self.xp_buffer:
+            buffered = self.xp_buffer.peek(user_id, guild_id)
+            if buffered:
+                return buffered[0]
+
+        rows = await self._shared_read(
+            ('user_xp', user_id, str(guild_id)),
+            lambda: self.supabase.table('users').select('xp').eq('user_id', user_id).eq('guild_id', guild_id),
+        )
+
+        return rows[0]['xp'] if rows else 0
 
     async def set_user_xp(self, user_id: int, amount: int, guild_id: int) -> tuple[int, int]:
         """Set user's XP to a specific amount and calculate level."""
-        from src.config.constants import XP_TABLE
-
-        # Calculate level
-        level = 1
-        for lvl, req_xp in enumerate(XP_TABLE):
-            if amount >= req_xp:
-                level = lvl + 1
-            else:
-                break
+        curve = await self.get_level_curve(guild_id)
+        level = curve.level(amount)
 
         # Upsert user
-        self.supabase.table('users').upsert({
+        if self.xp_buffer:
+            self.xp_buffer.discard(user_id, guild_id)
+            # Waits out a flush already writing their old XP, so it can't land after this write
+            await self.xp_buffer.flush()
+        await self.run_query(self.supabase.table('users').upsert({
             'user_id': user_id,
             'guild_id': str(guild_id) if guild_id else None,
             'username': 'Unknown',
             'discriminator': '0',
             'xp': amount,
             'level': level
-        }).execute()
+        }))
+        if self.leaderboards:
+            self.leaderboards.record(user_id, guild_id, amount, level)
 
         return amount, level
 
     async def update_user_xp(self, user_id: int, xp_change: int, guild_id: int = None) -> tuple[int, int, bool]:
         """Update user's XP and recalculate level. Returns (new_xp, new_level, leveled_up)."""
+        new_xp, new_level, leveled_up = await self._write_user_xp(user_id, xp_change, guild_id)
+        if self.leaderboards:
+            self.leaderboards.record(user_id, guild_id, new_xp, new_level)
+        return new_xp, new_level, leveled_up
+
+    async def _write_user_xp(self, user_id: int, xp_change: int, guild_id: int) -> tuple[int, int, bool]:
+        """Apply an XP change through the buffer, the atomic RPC or read-modify-write."""
         # guild_id required parameter
-        
-        # Get current XP and level
-        result = self.supabase.table('users').select('xp, level').eq('user_id', user_id).eq('guild_id', guild_id).execute()
-        
-        if not result.data:
-            # Create user
-            self.supabase.table('users').insert({
-                'user_id': user_id,
-                'guild_id': str(guild_id) if guild_id else None,
-                'username': 'Unknown',
-                'discriminator': '0',
-                'xp': 0,
-                'level': 0
-            }).execute()
-            current_xp = 0
-            old_level = 0
-        else:
+        if self.xp_buffer:
+            return await self.xp_buffer.add(user_id, xp_change, guild_id)
+
+        if self.atomic_xp_enabled:
+            try:
+                return await self.increment_user_xp(user_id, xp_change, guild_id)
+            except Exception as e:
+                # PGRST202 = function not found; anything else is a real failure
+                if getattr(e, 'code', None) != 'PGRST202':
+                    raise
+                print(f"WARNING: {XP_INCREMENT_FUNCTION} function missing, using read-modify-write XP updates")
+                self.atomic_xp_enabled = False
+
+        # Get current XP and level; a missing row is a user with no XP yet
+        result = await self.run_query(self.supabase.table('users').select('xp, level').eq('user_id', user_id).eq('guild_id', guild_id))
+        if result.data:
             current_xp = result.data[0]['xp']
             old_level = result.data[0]['level']
+        else:
+            current_xp = 0
+            old_level = 0
 
         # Calculate new XP
         new_xp = max(0, current_xp + xp_change)
 
         # Get progression type
-        progression_type = await self.get_setting("xp_progression_type", guild_id) or "custom"
-        new_level = await self._calculate_level_from_xp(new_xp, progression_type)
+        curve = await self.get_level_curve(guild_id)
+        new_level = curve.level(new_xp)
 
         leveled_up = new_level > old_level
 
-        # Update
-        self.supabase.table('users').update({
+        if not result.data and new_xp == 0:
+            # Nothing to store; the row is created by the first write that leaves XP behind
+            return new_xp, new_level, leveled_up
+
+        # Upsert, so the first real XP write creates the row
+        await self.run_query(self.supabase.table('users').upsert({
+            'user_id': user_id,
+            'guild_id': str(guild_id) if guild_id else None,
+            'username': 'Unknown',
+            'discriminator': '0',
             'xp': new_xp,
             'level': new_level
-        }).eq('user_id', user_id).eq('guild_id', guild_id).execute()
+        }, on_conflict='user_id,guild_id'))
 
         return new_xp, new_level, leveled_up
 
+    async def increment_user_xp(self, user_id: int, xp_change: int, guild_id: int) -> tuple[int, int, bool]:
+        """Atomically add XP and recalculate level in one round trip. Returns (new_xp, new_level, leveled_up)."""
+        progression_type = await self.get_setting("xp_progression_type", guild_id) or "custom"
+        curve = await self.get_level_curve(guild_id)
+        result = await self.run_query(self.supabase.rpc(
+            XP_INCREMENT_FUNCTION, increment_params(user_id, guild_id, xp_change, progression_type, curve)
+        ))
+        row = result.data[0]
+        return row['new_xp'], row['new_level'], row['leveled_up']
+
     async def _calculate_level_from_xp(self, xp: int, progression_type: str) -> int:
         """Calculate level from XP based on progression type."""
-        if progression_type == "basic":
-            if xp < 50:
-                return 0
-            return ((xp - 50) // 100) + 1
-
-        elif progression_type == "gradual":
-            if xp < 50:
-                return 0
-
-            level = 1
-            total_xp_needed = 50
-
-            while level < 1000:
-                xp_for_next_level = (level + 1) * 100
-                total_xp_needed += xp_for_next_level
-
-                if xp < total_xp_needed:
-                    return level
-                level += 1
-
-            return 1000
-
-        elif progression_type == "custom":
-            from src.config.constants import XP_TABLE
-
-            if xp < 50:
-                return 0
-
-            level = 0
-            for lvl in sorted(XP_TABLE.keys()):
-                if xp >= XP_TABLE[lvl]:
-                    level = lvl
-                else:
-                    break
-            return level
-
-        else:
-            return await self._calculate_level_from_xp(xp, "custom")
+        return get_curve(progression_type).level(xp)
+
+    async def get_level_curve(self, guild_id: int) -> LevelCurve:
+        """Get the guild's level curve (progression type plus optional custom table)."""
+        config = await self.get_settings(guild_id, ["xp_progression_type", "xp_custom_curve"])
+        return get_curve(config.get("xp_progression_type") or "custom", config.get("xp_custom_curve"))
+
+    async def recalculate_levels(self, guild_id: int) -> int:
+        """Recompute every user's level in a guild (e.g. after the curve changed). Returns rows updated."""
+        if self.xp_buffer:
+            await self.xp_buffer.flush()
+
+        curve = await self.get_level_curve(guild_id)
+        updated = 0
+        page = []
+        async for row in self.iter_rows('users', 'user_id, xp, level', key='user_id', filters={'guild_id': guild_id}):
+            page.append(row)
+            if len(page) >= settings.DB_PAGE_SIZE:
+                updated += await self._write_levels(guild_id, curve, page)
+                page = []
+        if page:
+            updated += await self._write_levels(guild_id, curve, page)
+
+        if self.xp_buffer:
+            self.xp_buffer.relevel(guild_id, curve)
+        if self.leaderboards:
+            self.leaderboards.invalidate(guild_id)
+        return updated
+
+    async def _write_levels(self, guild_id: int, curve: LevelCurve, rows: list[dict]) -> int:
+        """Upsert the rows whose stored level no longer matches the curve. Returns rows written."""
+        levels = curve.levels_for([r['xp'] for r in rows])
+        updates = [
+            {
+                'user_id': r['user_id'],
+                'guild_id': str(guild_id),
+                'username': 'Unknown',
+                'discriminator': '0',
+                'xp': r['xp'],
+                'level': level,
+            }
+            for r, level in zip(rows, levels)
+            if level != r['level']
+        ]
+        if updates:
+            await self.run_query(self.supabase.table('users').upsert(updates, on_conflict='user_id,guild_id'))
+        return len(updates)
+
+    async def grant_xp_bulk(
+        self,
+        guild_id: int,
+        user_ids: list[int],
+        xp_change: int,
+        progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    ) -> list[tuple[int, int]]:
+        """
+        Add the same XP to many users: one multi-row upsert per DB_PAGE_SIZE users.
+
+        Current XP is read DB_IN_LIST_SIZE users at a time, since the IDs travel in the URL.
+
+        progress(done, total) is awaited after each page. Returns (user_id, new_level)
+        for every user who leveled up.
+        """
+        curve = await self.get_level_curve(guild_id)
+        leveled_up = []
+        total = len(user_ids)
+        for start in range(0, total, settings.DB_PAGE_SIZE):
+            chunk = user_ids[start:start + settings.DB_PAGE_SIZE]
+
+            # Users tracked by the XP buffer are granted there; its state is newer than their rows
+            results = self.xp_buffer.grant(guild_id, chunk, xp_change, curve) if self.xp_buffer else {}
+            pending = [u for u in chunk if u not in results]
+
+            if pending:
+                current = {}
+                for i in range(0, len(pending), settings.DB_IN_LIST_SIZE):
+                    result = await self.run_query(
+                        self.supabase.table('users').select('user_id, xp, level')
+                        .eq('guild_id', guild_id).in_('user_id', pending[i:i + settings.DB_IN_LIST_SIZE])
+                    )
+                    current.update({r['user_id']: (r['xp'], r['level']) for r in result.data})
+                old = [current.get(u, (0, 0)) for u in pending]
+                new_xps = [max(0, xp + xp_change) for xp, _ in old]
+                new_levels = curve.levels_for(new_xps)
+                rows = [
+                    {
+                        'user_id': user_id,
+                        'guild_id': str(guild_id),
+                        'username': 'Unknown',
+                        'discriminator': '0',
+                        'xp': xp,
+                        'level': level,
+                    }
+                    for user_id, xp, level in zip(pending, new_xps, new_levels)
+                    # Same rule as single writes: no row for a user left at 0 XP
+                    if xp > 0 or user_id in current
+                ]
+                if rows:
+                    await self.run_query(self.supabase.table('users').upsert(rows, on_conflict='user_id,guild_id'))
+                for user_id, (_, old_level), xp, level in zip(pending, old, new_xps, new_levels):
+                    results[user_id] = (xp, level, level > old_level)
+
+            for user_id, (xp, level, up) in results.items():
+                if self.leaderboards:
+                    self.leaderboards.record(user_id, guild_id, xp, level)
+                if up:
+                    leveled_up.append((user_id, level))
+
+            if progress:
+                await progress(min(start + len(chunk), total), total)
+        return leveled_up
 
     async def remove_user_xp(self, user_id: int, amount: int, guild_id: int) -> tuple[int, int]:
         """Remove XP from user."""
@@ -177,31 +534,50 @@ class DatabaseManager:
 
     async def get_user_level(self, user_id: int, guild_id: int) -> int:
         """Get user's current level."""
-        result = self.supabase.table('users').select('level').eq('user_id', user_id).eq('guild_id', guild_id).execute()
-        return result.data[0]['level'] if result.data else 1
+        if self.xp_buffer:
+            buffered = self.xp_buffer.peek(user_id, guild_id)
+            if buffered:
+                return buffered[1]
+
+        rows = await self._shared_read(
+            ('user_level', user_id, str(guild_id)),
+            lambda: self.supabase.table('users').select('level').eq('user_id', user_id).eq('guild_id', guild_id),
+        )
+        return rows[0]['level'] if rows else 1
 
     async def get_user_rank(self, user_id: int, guild_id: int) -> int:
-        """Get user's rank in the guild."""
-        result = self.supabase.table('users').select('user_id').eq('guild_id', guild_id).gt('xp', 0).order('xp', desc=True).execute()
-        
-        for rank, user in enumerate(result.data, 1):
-            if user['user_id'] == user_id:
-                return rank
-        
-        return len(result.data) + 1
+        """Get user's rank in the guild (1 + number of users with more XP)."""
+        if self.leaderboards:
+            board = await self.leaderboards.get(guild_id)
+            return board.rank(user_id)
+
+        buffered = self.xp_buffer.peek(user_id, guild_id) if self.xp_buffer else None
+        if buffered:
+            user_xp = buffered[0]
+        else:
+            result = await self.run_query(self.supabase.table('users').select('xp').eq('user_id', user_id).eq('guild_id', guild_id))
+            user_xp = result.data[0]['xp'] if result.data else 0
+
+        # Count query served by the (guild_id, xp) index - at most one row comes back
+        result = await self.run_query(self.supabase.table('users').select('user_id', count='exact').eq('guild_id', guild_id).gt('xp', max(user_xp, 0)).limit(1))
+        return (result.count or 0) + 1
 
     # === LEADERBOARD METHODS ===
 
-    async def get_leaderboard(self, guild_id: int, limit: int = 10) -> list:
+    async def get_leaderboard(self, guild_id: int, limit: int = 10, offset: int = 0) -> list:
         """Get XP leaderboard for a guild."""
-        result = self.supabase.table('users').select('user_id, xp, level').eq('guild_id', guild_id).gt('xp', 0).order('xp', desc=True).limit(limit).execute()
+        if self.leaderboards:
+            board = await self.leaderboards.get(guild_id)
+            return board.top(limit, offset)
+
+        result = await self.run_query(self.supabase.table('users').select('user_id, xp, level').eq('guild_id', guild_id).gt('xp', 0).order('xp', desc=True).range(offset, offset + limit - 1))
         return [(r['user_id'], r['xp'], r['level']) for r in result.data]
 
     # === DAILY CHECKIN METHODS ===
 
     async def get_daily_checkin(self, user_id: int, guild_id: int) -> Optional[tuple]:
         """Get user daily checkin data."""
-        result = self.supabase.table('daily_checkins').select('*').eq('user_id', user_id).eq('guild_id', guild_id).execute()
+        result = await self.run_query(self.supabase.table('daily_checkins').select('*').eq('user_id', user_id).eq('guild_id', guild_id))
         if result.data:
             r = result.data[0]
             return (r.get('last_checkin'), r.get('checkin_streak', 0))
@@ -209,43 +585,134 @@ class DatabaseManager:
 
     async def update_daily_checkin(self, user_id: int, last_checkin: str, streak: int, guild_id: int) -> None:
         """Update user daily checkin."""
-        self.supabase.table('daily_checkins').upsert({
+        await self.run_query(self.supabase.table('daily_checkins').upsert({
             'user_id': user_id,
             'guild_id': str(guild_id) if guild_id else None,
             'last_checkin': last_checkin,
             'checkin_streak': streak
-        }, on_conflict='user_id,guild_id').execute()
+        }, on_conflict='user_id,guild_id'))
 
 
     async def reset_all_xp(self, guild_id: int) -> None:
         """Reset all XP for a guild."""
-        self.supabase.table('users').update({'xp': 0, 'level': 0}).eq('guild_id', guild_id).execute()
+        if self.xp_buffer:
+            self.xp_buffer.discard_guild(guild_id)
+            # Waits out a flush already writing old XP, so it can't land after the reset
+            await self.xp_buffer.flush()
+        if self.leaderboards:
+            self.leaderboards.reset_guild(guild_id)
+        await self.run_query(self.supabase.table('users').update({'xp': 0, 'level': 0}).eq('guild_id', guild_id))
+        if self.announced_level_enabled:
+            # Levels earned again after a reset are announced again
+            try:
+                await self.run_query(self.supabase.table('users').update({'last_announced_level': 0}).eq('guild_id', guild_id))
+            except Exception as e:
+                if not self._missing_announced_level(e):
+                    raise
+
+    async def claim_level_announcement(self, user_id: int, guild_id: int, level: int) -> bool:
+        """
+        Record that a level-up is being announced. False if this or a higher level already was.
+
+        The conditional update makes the claim atomic, so restarts and
+        concurrent handlers announce each level once.
+        """
+        if not self.announced_level_enabled:
+            return True
+        try:
+            result = await self.run_query(
+                self.supabase.table('users').update({'last_announced_level': level})
+                .eq('user_id', user_id).eq('guild_id', guild_id).lt('last_announced_level', level)
+            )
+        except Exception as e:
+            if not self._missing_announced_level(e):
+                raise
+            return True
+        if result.data:
+            return True
+
+        # Nothing updated: already announced, or the row isn't written yet (XP still buffered)
+        result = await self.run_query(
+            self.supabase.table('users').select('last_announced_level').eq('user_id', user_id).eq('guild_id', guild_id)
+        )
+        return not result.data
+
+    def _missing_announced_level(self, error: Exception) -> bool:
+        """True (and stop persisting announcements) if users.last_announced_level doesn't exist."""
+        # 42703 = undefined column (SQLite: "no such column")
+        if getattr(error, 'code', None) != '42703' and 'no such column' not in str(error):
+            return False
+        print("WARNING: users.last_announced_level missing, level-up announcements deduplicated in memory only")
+        self.announced_level_enabled = False
+        return True
+
+    async def prune_placeholder_users(self) -> int:
+        """
+        Delete users rows holding nothing but defaults in one bulk delete.
+
+        A row is only removed when its XP, level, message count, daily streak and
+        last announced level are all 0. Lookups treat a missing row as exactly
+        that, so these rows (left by the old create-on-read lookups, etc.) carry
+        no data. Rows with NULL counters are left alone. Returns the number of rows removed.
+        """
+        if self.xp_buffer:
+            # Buffered XP may be about to lift some of these rows above zero
+            await self.xp_buffer.flush()
+
+        def build():
+            query = (
+                self.supabase.table('users').delete(count='exact', returning='minimal')
+                .eq('xp', 0).eq('level', 0).eq('total_messages', 0).eq('daily_streak', 0)
+            )
+            return query.eq('last_announced_level', 0) if self.announced_level_enabled else query
+
+        try:
+            result = await self.run_query(build())
+        except Exception as e:
+            if not self.announced_level_enabled or not self._missing_announced_level(e):
+                raise
+            result = await self.run_query(build())
+        return result.count or 0
 
     async def get_user_count(self, guild_id: int) -> int:
         """Get count of users with XP."""
-        result = self.supabase.table('users').select('user_id', count='exact').eq('guild_id', guild_id).gt('xp', 0).execute()
+        result = await self.run_query(self.supabase.table('users').select('user_id', count='exact').eq('guild_id', guild_id).gt('xp', 0))
         return result.count if hasattr(result, 'count') else len(result.data)
 
     async def get_checkin_count(self, guild_id: int) -> int:
         """Get count of daily checkins."""
-        result = self.supabase.table('daily_checkins').select('user_id', count='exact').eq('guild_id', guild_id).execute()
+        result = await self.run_query(self.supabase.table('daily_checkins').select('user_id', count='exact').eq('guild_id', guild_id))
         return result.count if hasattr(result, 'count') else len(result.data)
 
     async def reset_all_checkins(self, guild_id: int) -> None:
         """Reset all daily checkins."""
-        self.supabase.table('daily_checkins').delete().eq('guild_id', guild_id).execute()
+        await self.run_query(self.supabase.table('daily_checkins').delete().eq('guild_id', guild_id))
 
     async def get_level_roles(self, guild_id: int) -> list:
         """Get level roles for a guild."""
-        result = self.supabase.table('level_roles').select('*').eq('guild_id', guild_id).order('level').execute()
-        return [(r['level'], r['role_id']) for r in result.data]
+        if self.table_mirror:
+            rows = sorted(self.table_mirror.rows('level_roles', guild_id), key=lambda r: r['level'])
+            return [(r['level'], r['role_id']) for r in rows]
+        rows = await self._shared_read(
+            ('level_roles', str(guild_id)),
+            lambda: self.supabase.table('level_roles').select('*').eq('guild_id', guild_id).order('level'),
+        )
+        return [(r['level'], r['role_id']) for r in rows]
 
     # === USER METHODS ===
 
     async def get_user(self, user_id: int, guild_id: int) -> Optional[dict]:
         """Get user data."""
-        result = self.supabase.table('users').select('*').eq('user_id', user_id).eq('guild_id', guild_id).execute()
-        return result.data[0] if result.data else None
+        rows = await self._shared_read(
+            ('user', user_id, str(guild_id)),
+            lambda: self.supabase.table('users').select('*').eq('user_id', user_id).eq('guild_id', guild_id),
+        )
+        user = rows[0] if rows else None
+        if user and self.xp_buffer:
+            buffered = self.xp_buffer.peek(user_id, guild_id)
+            if buffered:
+                user['xp'], user['level'] = buffered
+        return user
 
     # === BIRTHDAY METHODS ===
 
@@ -257,22 +724,26 @@ class DatabaseManager:
             birthday = f"2000-{month.zfill(2)}-{day.zfill(2)}"
 
         # Check if birthday exists
-        result = self.supabase.table('birthdays').select('id').eq('user_id', user_id).eq('guild_id', guild_id).execute()
+        result = await self.run_query(self.supabase.table('birthdays').select('id').eq('user_id', user_id).eq('guild_id', guild_id))
     
         if result.data:
             # Update existing
-            self.supabase.table("birthdays").update({
+            written = await self.run_query(self.supabase.table("birthdays").update({
                 "birthday": birthday,
                 "timezone": timezone
-            }).eq("user_id", user_id).eq("guild_id", guild_id).execute()
+            }).eq("user_id", user_id).eq("guild_id", guild_id))
         else:
             # Insert new
-            self.supabase.table("birthdays").insert({
+            written = await self.run_query(self.supabase.table("birthdays").insert({
                 "user_id": user_id,
                 "guild_id": guild_id,
                 "birthday": birthday,
                 "timezone": timezone
-            }).execute()
+            }))
+
+        if self.table_mirror:
+            for row in written.data:
+                self.table_mirror.upsert('birthdays', row)
 
 
     async def set_user_birthday(self, user_id: int, birthday: str, guild_id: int) -> bool:
@@ -290,9 +761,14 @@ class DatabaseManager:
 
     async def get_birthday(self, user_id: int, guild_id: int) -> Optional[tuple]:
         """Get user birthday."""
-        result = self.supabase.table('birthdays').select('*').eq('user_id', user_id).eq('guild_id', guild_id).execute()
-        if result.data:
-            row = result.data[0]
+        if self.table_mirror:
+            row = self.table_mirror.find('birthdays', {'guild_id': guild_id, 'user_id': user_id})
+            rows = [row] if row else []
+        else:
+            result = await self.run_query(self.supabase.table('birthdays').select('*').eq('user_id', user_id).eq('guild_id', guild_id))
+            rows = result.data
+        if rows:
+            row = rows[0]
             # Return as tuple for compatibility (id, user_id, birthday, timezone, announced_year, created_at)
             return (row['id'], row['user_id'], row['birthday'], row.get('timezone', 'UTC'), row.get('announced_year'), row.get('created_at'))
         return None
@@ -303,49 +779,75 @@ class DatabaseManager:
 
     async def get_all_birthdays(self, guild_id: int) -> list:
         """Get all birthdays."""
-        result = self.supabase.table('birthdays').select('*').eq('guild_id', guild_id).order('birthday').execute()
-        return [(r['id'], r['user_id'], r['birthday'], r.get('timezone', 'UTC'), r.get('announced_year'), r.get('created_at')) for r in result.data]
+        if self.table_mirror:
+            rows = self.table_mirror.rows('birthdays', guild_id)
+        else:
+            # Paged so guilds with more birthdays than one API page aren't cut off
+            rows = [r async for r in self.iter_rows('birthdays', filters={'guild_id': guild_id})]
+        rows.sort(key=lambda r: r['birthday'] or '')
+        return [(r['id'], r['user_id'], r['birthday'], r.get('timezone', 'UTC'), r.get('announced_year'), r.get('created_at')) for r in rows]
 
     async def get_today_birthdays(self, guild_id: int, today: Optional[str] = None) -> list:
         """Get today's birthdays in MM-DD format."""
         # Supabase stores as 2000-MM-DD, we need to match MM-DD
-        if today:
-            # today is in MM-DD format
-            result = self.supabase.table('birthdays').select('user_id').eq('guild_id', guild_id).like('birthday', f'%{today}').execute()
+        # today is in MM-DD format; default to the current date
+        current_mmdd = today or datetime.now().strftime('%m-%d')
+        if self.table_mirror:
+            rows = [r for r in self.table_mirror.rows('birthdays', guild_id) if (r['birthday'] or '').endswith(current_mmdd)]
         else:
-            # Get current MM-DD
-            current_mmdd = (current_date or datetime.now()).strftime('%m-%d')
-            result = self.supabase.table('birthdays').select('user_id').eq('guild_id', guild_id).like('birthday', f'%{current_mmdd}').execute()
-        
-        return [(r['user_id'],) for r in result.data]
+            rows = await self._birthdays_on(guild_id, current_mmdd, 'user_id')
+
+        return [(r['user_id'],) for r in rows]
+
+    async def _birthdays_on(self, guild_id: int, mmdd: str, columns: str) -> list[dict]:
+        """Select a guild's birthdays falling on MM-DD, through the (guild_id, birthday_md) index when it exists."""
+        if self.birthday_md_enabled:
+            try:
+                result = await self.run_query(self.supabase.table('birthdays').select(columns).eq('guild_id', guild_id).eq('birthday_md', mmdd))
+                return result.data
+            except Exception as e:
+                # 42703 = undefined column (SQLite: "no such column"); anything else is a real failure
+                if getattr(e, 'code', None) != '42703' and 'no such column' not in str(e):
+                    raise
+                print("WARNING: birthdays.birthday_md missing, matching birthdays with LIKE (see schema_manifest)")
+                self.birthday_md_enabled = False
+
+        result = await self.run_query(self.supabase.table('birthdays').select(columns).eq('guild_id', guild_id).like('birthday', f'%{mmdd}'))
+        return result.data
 
     async def get_unannounced_birthdays(self, guild_id: int, current_date: datetime) -> list:
         """Get birthdays that haven't been announced today."""
         current_mmdd = current_date.strftime('%m-%d')
         today_str = current_date.strftime('%Y-%m-%d')
-        result = self.supabase.table('birthdays').select('user_id, birthday, announced_date').eq('guild_id', guild_id).like('birthday', f'%{current_mmdd}').execute()
+        if self.table_mirror:
+            rows = [r for r in self.table_mirror.rows('birthdays', guild_id) if (r['birthday'] or '').endswith(current_mmdd)]
+        else:
+            rows = await self._birthdays_on(guild_id, current_mmdd, 'user_id, birthday, announced_date')
 
         # Filter for unannounced today
         unannounced = []
-        for r in result.data:
+        for r in rows:
             if r.get('announced_date') != today_str:
                 unannounced.append((r['user_id'], r['birthday']))
-                unannounced.append((r['user_id'], r['birthday']))
 
         return unannounced
 
     async def mark_birthday_announced(self, user_id: int, guild_id: int, announced_date: str) -> None:
         """Mark that a birthday has been announced for a specific date."""
-        self.supabase.table('birthdays').update({
+        await self.run_query(self.supabase.table('birthdays').update({
             'announced_date': announced_date
-        }).eq('user_id', user_id).eq('guild_id', guild_id).execute()
+        }).eq('user_id', user_id).eq('guild_id', guild_id))
+        if self.table_mirror:
+            self.table_mirror.update('birthdays', {'guild_id': guild_id, 'user_id': user_id}, {'announced_date': announced_date})
 
     # === LOGGING METHODS ===
 
     async def remove_user_birthday(self, user_id: int, guild_id: int) -> bool:
         """Remove user birthday."""
         try:
-            self.supabase.table('birthdays').delete().eq('user_id', user_id).eq('guild_id', guild_id).execute()
+            await self.run_query(self.supabase.table('birthdays').delete().eq('user_id', user_id).eq('guild_id', guild_id))
+            if self.table_mirror:
+                self.table_mirror.delete('birthdays', {'guild_id': guild_id, 'user_id': user_id})
             return True
         except Exception as e:
             print(f"Error removing birthday: {e}")
@@ -362,7 +864,9 @@ class DatabaseManager:
         guild_id: Optional[int] = None,
     ) -> None:
         """Log an event to the audit log."""
-        self.supabase.table('audit_log').insert({
+        await self._insert_log('audit_log', {
+            # Stamped now because a queued row may be inserted a few seconds later
+            'timestamp': datetime.now(timezone.utc).isoformat(),
             'category': category,
             'action': action,
             'user_id': str(user_id) if user_id is not None else None,
@@ -370,7 +874,7 @@ class DatabaseManager:
             'channel_id': str(channel_id) if channel_id is not None else None,
             'details': details,
             'guild_id': str(guild_id) if guild_id is not None else None
-        }).execute()
+        })
 
     async def log_moderation_action(
         self,
@@ -383,7 +887,8 @@ class DatabaseManager:
         message_count: Optional[int] = None,
     ) -> None:
         """Log moderation action."""
-        self.supabase.table('mod_logs').insert({
+        await self._insert_log('mod_logs', {
+            'created_at': datetime.now(timezone.utc).isoformat(),
             'moderator_id': moderator_id,
             'user_id': target_id,
             'action': action,
@@ -391,11 +896,11 @@ class DatabaseManager:
             'guild_id': str(guild_id) if guild_id else None,
             'channel_id': channel_id,
             'message_count': message_count
-        }).execute()
+        })
 
     async def get_recent_moderation_logs(self, guild_id: int, limit: int = 10) -> list[dict]:
         """Get recent moderation logs."""
-        result = self.supabase.table('mod_logs').select('*').eq('guild_id', guild_id).order('created_at', desc=True).limit(limit).execute()
+        result = await self.run_query(self.supabase.table('mod_logs').select('*').eq('guild_id', guild_id).order('created_at', desc=True).limit(limit))
         return result.data
 
     async def log_health_check(
@@ -405,13 +910,20 @@ class DatabaseManager:
         value: Optional[float] = None,
         details: Optional[str] = None,
     ) -> None:
-        """Log health check results."""
-        self.supabase.table('health_logs').insert({
-            'component': component,
-            'status': status,
-            'value': value,
-            'details': details
-        }).execute()
+        """Record a health check; persist it only if the component's status changed."""
+        if self.health_ring.record(component, status, value, details):
+            await self._insert_log('health_logs', {
+                'component': component,
+                'status': status,
+                'value': value,
+                'details': details
+            })
+        await self.flush_health_rollups()
+
+    async def flush_health_rollups(self, force: bool = False) -> None:
+        """Persist health rollups whose interval has ended (all open ones with force)."""
+        for rollup in self.health_ring.due_rollups(force=force):
+            await self._insert_log('health_logs', HealthRing.rollup_row(rollup))
 
     async def log_roast_user(self, user_id: int) -> None:
         """Log that user roasted the bot."""
@@ -425,61 +937,154 @@ class DatabaseManager:
     # === SETTINGS METHODS ===
 
     async def get_setting(self, key: str, guild_id: Optional[int] = None) -> Optional[str]:
-        """Get setting value."""
+        """Get setting value (served from the settings cache when fresh)."""
         # guild_id required parameter
-        result = self.supabase.table('settings').select('value').eq('setting_key', key).eq('guild_id', str(guild_id) if guild_id else None).execute()
-        return result.data[0]['value'] if result.data else None
+        if self.table_mirror:
+            row = self.table_mirror.find('settings', {'guild_id': guild_id, 'setting_key': key})
+            return row['value'] if row else None
+
+        found, value = self.settings_cache.lookup(key, guild_id)
+        if found:
+            return value
+
+        guild_key = str(guild_id) if guild_id else None
+        try:
+            rows = await self._shared_read(
+                ('setting', guild_key, key),
+                lambda: self.supabase.table('settings').select('value').eq('setting_key', key).eq('guild_id', guild_key),
+            )
+        except Exception as e:
+            # Serve the last known value while the database is unreachable
+            if is_transient(e):
+                found, value = self.settings_cache.lookup_stale(key, guild_id)
+                if found:
+                    return value
+            raise
+        value = rows[0]['value'] if rows else None
+        # Missing keys are cached too so repeated "not configured" checks stay local
+        self.settings_cache.store(key, value, guild_id)
+        return value
+
+    async def get_settings(self, guild_id: Optional[int], keys: list[str]) -> dict[str, Optional[str]]:
+        """Get several settings in one query. Returns {key: value}, None for unset keys."""
+        if self.table_mirror:
+            stored = self.table_mirror.settings(guild_id)
+            return {key: stored.get(key) for key in keys}
+
+        values = {}
+        missing = []
+        for key in keys:
+            found, value = self.settings_cache.lookup(key, guild_id)
+            if found:
+                values[key] = value
+            else:
+                missing.append(key)
+
+        if missing:
+            guild_key = str(guild_id) if guild_id else None
+            try:
+                rows = await self._shared_read(
+                    ('settings', guild_key, tuple(sorted(missing))),
+                    lambda: self.supabase.table('settings').select('setting_key, value').eq('guild_id', guild_key).in_('setting_key', missing),
+                )
+            except Exception as e:
+                # Serve the last known values while the database is unreachable
+                stale = self.settings_cache.lookup_stale_all(missing, guild_id) if is_transient(e) else None
+                if stale is None:
+                    raise
+                values.update(stale)
+                return values
+            fetched = {r['setting_key']: r['value'] for r in rows}
+            for key in missing:
+                values[key] = fetched.get(key)
+                self.settings_cache.store(key, values[key], guild_id)
+
+        return values
+
+    async def get_all_settings(self, guild_id: Optional[int]) -> dict[str, str]:
+        """Get a snapshot of every setting stored for a guild."""
+        if self.table_mirror:
+            return self.table_mirror.settings(guild_id)
+        result = await self.run_query(self.supabase.table('settings').select('setting_key, value').eq('guild_id', str(guild_id) if guild_id else None))
+        values = {r['setting_key']: r['value'] for r in result.data}
+        for key, value in values.items():
+            self.settings_cache.store(key, value, guild_id)
+        return values
 
     async def set_setting(self, key: str, value: str, guild_id: Optional[int] = None) -> None:
         """Set setting value."""
         # guild_id required parameter
-        self.supabase.table('settings').upsert({
+        await self.run_query(self.supabase.table('settings').upsert({
             'guild_id': str(guild_id) if guild_id else None,
             'setting_key': key,
             'value': value,
-            'updated_at': datetime.now().isoformat()
-        }, on_conflict='guild_id,setting_key').execute()
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }, on_conflict='guild_id,setting_key'))
+        # Write-through so the next read sees the new value without a round trip
+        self.settings_cache.store(key, value, guild_id)
+        if self.table_mirror:
+            self.table_mirror.upsert('settings', {
+                'guild_id': str(guild_id) if guild_id else None,
+                'setting_key': key,
+                'value': value,
+            })
+
+    def invalidate_settings(self, guild_id: Optional[int] = None, key: Optional[str] = None) -> None:
+        """Drop cached settings (one key, one guild, or everything) after out-of-band edits."""
+        self.settings_cache.invalidate(guild_id, key)
 
     # === SYSTEM FLAGS ===
 
     async def get_flag(self, flag_name: str) -> Any:
         """Get system flag value."""
-        result = self.supabase.table('system_flags').select('flag_value').eq('flag_name', flag_name).execute()
+        result = await self.run_query(self.supabase.table('system_flags').select('flag_value').eq('flag_name', flag_name))
         return result.data[0]['flag_value'] if result.data else None
 
     async def set_flag(self, flag_name: str, flag_value: Any, description: Optional[str] = None) -> None:
         """Set system flag."""
-        self.supabase.table('system_flags').upsert({
+        await self.run_query(self.supabase.table('system_flags').upsert({
             'flag_name': flag_name,
             'flag_value': str(flag_value),
             'description': description
-        }).execute()
+        }))
 
     async def clear_flag(self, flag_name: str) -> None:
         """Clear system flag."""
-        self.supabase.table('system_flags').delete().eq('flag_name', flag_name).execute()
+        await self.run_query(self.supabase.table('system_flags').delete().eq('flag_name', flag_name))
 
     # === AUDIT METHODS ===
 
     async def get_audit_logs(self, guild_id: int, limit: int = 100) -> list[dict]:
         """Get recent audit logs."""
-        result = self.supabase.table('audit_log').select('*').eq('guild_id', guild_id).order('timestamp', desc=True).limit(limit).execute()
+        result = await self.run_query(self.supabase.table('audit_log').select('*').eq('guild_id', guild_id).order('timestamp', desc=True).limit(limit))
         return result.data
 
-    async def get_daily_digest_stats(self, guild_id: int) -> dict:
-        """Get optimized daily digest statistics."""
-        # Get logs from last 24 hours
-        yesterday = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-        result = self.supabase.table('audit_log').select('category, action').eq('guild_id', guild_id).gte('timestamp', yesterday).execute()
-        
-        logs = result.data
-        return {
-            "total_logs": len(logs),
-            "critical_events": len([l for l in logs if l.get('category') == 'CRITICAL']),
-            "warnings": len([l for l in logs if l.get('category') == 'WARNING']),
-            "moderation_actions": len([l for l in logs if any(x in l.get('action', '') for x in ['BAN', 'KICK', 'MUTE'])]),
-            "user_events": len([l for l in logs if any(x in l.get('action', '') for x in ['JOIN', 'LEAVE'])]),
-        }
+    async def get_daily_digest_stats(self, guild_id: Optional[int] = None) -> dict:
+        """Get today's digest statistics for one guild (or every guild with None) from grouped counts."""
+        # Since local midnight, as a UTC timestamp so it compares correctly on every backend
+        since = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+        since = since.astimezone(timezone.utc).isoformat()
+        guild_key = str(guild_id) if guild_id else None
+
+        if self.audit_counts_enabled:
+            try:
+                result = await self.run_query(self.supabase.rpc(AUDIT_COUNTS_FUNCTION, {
+                    'p_since': since,
+                    'p_guild_id': guild_key,
+                }))
+                return summarize_counts(result.data)
+            except Exception as e:
+                # PGRST202 = function not found; anything else is a real failure
+                if getattr(e, 'code', None) != 'PGRST202':
+                    raise
+                print(f"WARNING: {AUDIT_COUNTS_FUNCTION} function missing, counting digest rows client-side")
+                self.audit_counts_enabled = False
+
+        query = self.supabase.table('audit_log').select('category, action').gte('timestamp', since)
+        if guild_key:
+            query = query.eq('guild_id', guild_key)
+        result = await self.run_query(query)
+        return summarize_counts(count_rows(result.data))
 
     # === ROAST METHODS ===
 
@@ -490,41 +1095,33 @@ class DatabaseManager:
     # === CLEANUP ===
 
     async def close(self) -> None:
-        """Close database connection (no-op for Supabase)."""
-        pass
+        """Close database connection and wait for in-flight queries to finish."""
+        if self.table_mirror:
+            await self.table_mirror.stop()
+            self.table_mirror = None
+        try:
+            await self.flush_health_rollups(force=True)
+        except Exception as e:
+            print(f"ERROR: Failed to write health rollups: {e}")
+        # Before the audit pipeline, which takes the cleanup batches' audit entries
+        if self.departure_cleanup:
+            await self.departure_cleanup.stop()
+            self.departure_cleanup = None
+        if self.audit_pipeline:
+            await self.audit_pipeline.stop()
+            self.audit_pipeline = None
+        if self.xp_buffer:
+            try:
+                await self.xp_buffer.stop()
+            except Exception as e:
+                # The journal is still on disk and is replayed on next start
+                print(f"ERROR: Failed to drain XP buffer: {e}")
+            self.xp_buffer = None
+        self.executor.shutdown(wait=True)
 
     async def add_xp(self, user_id: int, guild_id: int, xp_amount: int) -> tuple[int, int]:
         """Add XP to a user and return their new XP and level."""
-        # Get current XP
-        result = self.supabase.table('users').select('xp').eq('user_id', user_id).eq('guild_id', guild_id).execute()
-        
-        if not result.data:
-            # Create user
-            self.supabase.table('users').insert({
-                'user_id': user_id,
-                'guild_id': str(guild_id) if guild_id else None,
-                'username': 'Unknown',
-                'discriminator': '0',
-                'xp': xp_amount,
-                'level': 0
-            }).execute()
-            new_xp = xp_amount
-        else:
-            current_xp = result.data[0]['xp']
-            new_xp = current_xp + xp_amount
-            
-            self.supabase.table('users').update({
-                'xp': new_xp
-            }).eq('user_id', user_id).eq('guild_id', guild_id).execute()
-        
-        # Calculate level
-        new_level = int((new_xp / 100) ** 0.5)
-        
-        # Update level
-        self.supabase.table('users').update({
-            'level': new_level
-        }).eq('user_id', user_id).eq('guild_id', guild_id).execute()
-        
+        new_xp, new_level, _ = await self.update_user_xp(user_id, xp_amount, guild_id)
         return new_xp, new_level
 
 
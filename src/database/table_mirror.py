@@ -0,0 +1,256 @@
+"""
+Local mirror of hot tables for MalaBoT.
+Keeps settings, level_roles and birthdays in process memory so cog reads never
+wait on Supabase. Loaded once at startup, then refreshed incrementally from
+each table's updated_at high-water mark; the bot's own writes are applied
+straight after they succeed.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger("table_mirror")
+
+# table -> columns that identify a row (guild_id is always part of the guild index)
+MIRRORED_TABLES = {
+    "settings": ("guild_id", "setting_key"),
+    "level_roles": ("id",),
+    "birthdays": ("guild_id", "user_id"),
+}
+
+PAGE_SIZE = 1000
+
+# Run once in the Supabase SQL editor: adds updated_at (bumped on every update)
+# to the mirrored tables so refreshes only fetch changed rows
+TABLE_MIRROR_SQL = """
+alter table settings add column if not exists updated_at timestamptz default now();
+alter table level_roles add column if not exists updated_at timestamptz default now();
+alter table birthdays add column if not exists updated_at timestamptz default now();
+
+create or replace function touch_updated_at() returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists settings_touch on settings;
+create trigger settings_touch before insert or update on settings
+    for each row execute function touch_updated_at();
+drop trigger if exists level_roles_touch on level_roles;
+create trigger level_roles_touch before insert or update on level_roles
+    for each row execute function touch_updated_at();
+drop trigger if exists birthdays_touch on birthdays;
+create trigger birthdays_touch before insert or update on birthdays
+    for each row execute function touch_updated_at();
+
+create index if not exists settings_updated_at_idx on settings (updated_at);
+create index if not exists level_roles_updated_at_idx on level_roles (updated_at);
+create index if not exists birthdays_updated_at_idx on birthdays (updated_at);
+"""
+
+
+def _key(value) -> Optional[str]:
+    """Normalize IDs so rows match whether Supabase returns them as int or text."""
+    return str(value) if value not in (None, "") else None
+
+
+class TableMirror:
+    """
+    In-memory copy of the mirrored tables, indexed by guild.
+
+    Rows deleted outside the bot (dashboard, SQL editor) leave no updated_at
+    trace, so they stay visible until the full reload every resync_interval
+    seconds (TABLE_MIRROR_RESYNC_INTERVAL). The bot's own deletes are applied
+    with delete(), and a backup restore resyncs straight away.
+    """
+
+    def __init__(self, db_manager, refresh_interval: float = 30.0, resync_interval: float = 3600.0):
+        self.db = db_manager
+        self.refresh_interval = refresh_interval
+        self.resync_interval = resync_interval
+
+        # table -> guild key -> row key -> row
+        self._rows: dict[str, dict[Optional[str], dict[tuple, dict]]] = {t: {} for t in MIRRORED_TABLES}
+        self._high_water: dict[str, Optional[str]] = {t: None for t in MIRRORED_TABLES}
+        # Tables without an updated_at column fall back to full reloads
+        self._incremental: dict[str, bool] = {t: True for t in MIRRORED_TABLES}
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.ready = False
+        self.last_refresh = 0.0
+        self.last_resync = 0.0
+
+        # Stats
+        self.refreshes = 0
+        self.rows_refreshed = 0
+        self.failed_refreshes = 0
+
+    async def start(self) -> None:
+        """Load every mirrored table, then start the refresh loop."""
+        self._lock = asyncio.Lock()
+        await self.resync()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the refresh loop."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def resync(self) -> None:
+        """Reload every mirrored table from scratch."""
+        async with self._lock:
+            for table in MIRRORED_TABLES:
+                rows = await self._fetch_all(table, lambda table=table: self.db.supabase.table(table).select("*"))
+                self._rows[table] = {}
+                self._high_water[table] = None
+                self._apply(table, rows)
+            self.ready = True
+            self.last_resync = self.last_refresh = time.monotonic()
+        logger.info(
+            "Table mirror loaded: "
+            + ", ".join(f"{t}={self.row_count(t)}" for t in MIRRORED_TABLES)
+        )
+
+    async def refresh(self) -> int:
+        """Fetch rows changed since the last refresh. Returns the number of rows applied."""
+        applied = 0
+        async with self._lock:
+            for table in MIRRORED_TABLES:
+                if not self._incremental[table]:
+                    continue
+                mark = self._high_water[table]
+
+                def build(table=table, mark=mark):
+                    query = self.db.supabase.table(table).select("*")
+                    if mark:
+                        # gte, not gt: rows sharing the mark's timestamp may have landed after it was read
+                        query = query.gte("updated_at", mark)
+                    return query.order("updated_at")
+
+                try:
+                    rows = await self._fetch_all(table, build)
+                except Exception as e:
+                    if "updated_at" not in str(e):
+                        raise
+                    logger.warning(f"{table} has no updated_at column; mirroring it by periodic resync only")
+                    self._incremental[table] = False
+                    continue
+                self._apply(table, rows)
+                applied += len(rows)
+            self.last_refresh = time.monotonic()
+        self.refreshes += 1
+        self.rows_refreshed += applied
+        return applied
+
+    # Write-through (call after the database write succeeds)
+
+    def upsert(self, table: str, row: dict) -> None:
+        """Apply a row the bot just wrote."""
+        if self.ready:
+            # Only refreshes move the high-water mark, so a concurrent out-of-band edit isn't skipped
+            self._apply(table, [row], advance=False)
+
+    def update(self, table: str, match: dict, values: dict) -> None:
+        """Apply an update the bot just made to the rows matching every column in match."""
+        for row in self._matching(table, match):
+            row.update(values)
+
+    def delete(self, table: str, match: dict) -> None:
+        """Drop the rows matching every column in match."""
+        guild_rows = self._rows[table].get(_key(match.get("guild_id")), {})
+        for row_key, row in list(guild_rows.items()):
+            if all(_key(row.get(col)) == _key(val) for col, val in match.items()):
+                del guild_rows[row_key]
+
+    # Reads
+
+    def rows(self, table: str, guild_id: Optional[int]) -> list[dict]:
+        """Get every mirrored row of a table for one guild."""
+        return list(self._rows[table].get(_key(guild_id), {}).values())
+
+    def find(self, table: str, match: dict) -> Optional[dict]:
+        """Get the first row matching every column in match."""
+        key_columns = MIRRORED_TABLES[table]
+        if all(col in match for col in key_columns):
+            guild_rows = self._rows[table].get(_key(match.get("guild_id")), {})
+            return guild_rows.get(tuple(_key(match[col]) for col in key_columns))
+        return next(iter(self._matching(table, match)), None)
+
+    def settings(self, guild_id: Optional[int]) -> dict[str, Optional[str]]:
+        """Get {setting_key: value} for one guild."""
+        return {r["setting_key"]: r.get("value") for r in self.rows("settings", guild_id)}
+
+    def row_count(self, table: str) -> int:
+        return sum(len(rows) for rows in self._rows[table].values())
+
+    def get_stats(self) -> dict:
+        """Get row counts, refresh counters and lag since the last refresh."""
+        return {
+            "ready": self.ready,
+            "rows": {t: self.row_count(t) for t in MIRRORED_TABLES},
+            "incremental": dict(self._incremental),
+            "refreshes": self.refreshes,
+            "rows_refreshed": self.rows_refreshed,
+            "failed_refreshes": self.failed_refreshes,
+            "seconds_since_refresh": (time.monotonic() - self.last_refresh) if self.ready else None,
+        }
+
+    # Internals
+
+    def _matching(self, table: str, match: dict) -> list[dict]:
+        guild_rows = self._rows[table].get(_key(match.get("guild_id")), {})
+        return [
+            row for row in guild_rows.values()
+            if all(_key(row.get(col)) == _key(val) for col, val in match.items())
+        ]
+
+    def _apply(self, table: str, rows: list[dict], advance: bool = True) -> None:
+        key_columns = MIRRORED_TABLES[table]
+        for row in rows:
+            row_key = tuple(_key(row.get(col)) for col in key_columns)
+            guild_rows = self._rows[table].setdefault(_key(row.get("guild_id")), {})
+            existing = guild_rows.get(row_key)
+            if existing is None:
+                guild_rows[row_key] = dict(row)
+            else:
+                existing.update(row)
+            stamp = row.get("updated_at") if advance else None
+            if stamp and (self._high_water[table] is None or stamp > self._high_water[table]):
+                self._high_water[table] = stamp
+
+    async def _fetch_all(self, table: str, build) -> list[dict]:
+        """Page through a select (built fresh per page) so tables larger than the API row limit load fully."""
+        rows = []
+        start = 0
+        while True:
+            query = build()
+            for column in MIRRORED_TABLES[table]:
+                query = query.order(column)
+            result = await self.db.run_query(query.range(start, start + PAGE_SIZE - 1))
+            rows.extend(result.data)
+            if len(result.data) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    async def _refresh_loop(self) -> None:
+        """Refresh every refresh_interval seconds and resync every resync_interval seconds."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                if time.monotonic() - self.last_resync >= self.resync_interval:
+                    await self.resync()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                self.failed_refreshes += 1
+                logger.error(f"Table mirror refresh failed: {e}")
@@ -0,0 +1,80 @@
+"""
+Shared Supabase transport for MalaBoT.
+One process-wide client and pooled HTTP connection set, so every DatabaseManager
+reuses warm keep-alive (and HTTP/2 where available) connections.
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+from typing import Optional
+
+import httpx
+from supabase import Client, ClientOptions, create_client
+
+from src.config.settings import settings
+
+logger = logging.getLogger("db_transport")
+
+_lock = threading.Lock()
+_client: Optional[Client] = None
+_http_client: Optional[httpx.Client] = None
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _build_http_client() -> httpx.Client:
+    """Build the pooled HTTP client shared by every Supabase request."""
+    return httpx.Client(
+        http2=http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.DB_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DB_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.DB_POOL_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.DB_REQUEST_TIMEOUT, connect=settings.DB_CONNECT_TIMEOUT),
+    )
+
+
+def get_supabase_client() -> Client:
+    """Get the process-wide Supabase client, creating it on first use."""
+    global _client, _http_client
+
+    with _lock:
+        if _client is None:
+            url = os.getenv('SUPABASE_URL')
+            key = os.getenv('SUPABASE_KEY')
+            _http_client = _build_http_client()
+            try:
+                options = ClientOptions(
+                    httpx_client=_http_client,
+                    postgrest_client_timeout=settings.DB_REQUEST_TIMEOUT,
+                )
+            except TypeError:
+                # supabase-py before httpx_client support: the shared client still
+                # reuses one keep-alive pool, just with the library's own limits
+                logger.warning("supabase-py does not accept a custom HTTP client; using its default pool")
+                _http_client.close()
+                _http_client = None
+                options = ClientOptions(postgrest_client_timeout=settings.DB_REQUEST_TIMEOUT)
+            _client = create_client(url, key, options=options)
+            logger.info(
+                f"Supabase transport ready (http2={http2_available()}, "
+                f"max_connections={settings.DB_POOL_MAX_CONNECTIONS})"
+            )
+        return _client
+
+
+def close_supabase_client() -> None:
+    """Close pooled connections. Call once at process shutdown."""
+    global _client, _http_client
+
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _client = None
+        _http_client = None
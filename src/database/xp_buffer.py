@@ -0,0 +1,355 @@
+"""
+Write-behind XP buffer for MalaBoT.
+Accumulates XP gains in memory and writes them to the users table in periodic batched upserts.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+from src.utils.level_engine import LevelCurve
+
+logger = logging.getLogger("xp_buffer")
+
+
+class XPWriteBuffer:
+    """
+    Buffers XP changes per (guild, user) and flushes them as one multi-row upsert.
+
+    Every change is appended to a local journal as the user's absolute XP/level,
+    so replaying the journal after a crash is idempotent.
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        flush_interval: float = 10.0,
+        max_pending: int = 500,
+        journal_path: str = "data/xp_journal.log",
+        idle_ttl: float = 900.0,
+        batch_size: int = 1000,
+    ):
+        self.db = db_manager
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.journal_path = journal_path
+        self.flushing_path = journal_path + ".flushing"
+        self.idle_ttl = idle_ttl
+        self.batch_size = batch_size
+
+        # (guild_id, user_id) -> [xp, level, last_seen, has_row]; has_row is False until a
+        # users row exists, and users left at 0 XP don't get one (same rule as direct writes)
+        self._state: dict[tuple[int, int], list] = {}
+        self._dirty: set[tuple[int, int]] = set()
+        # Keys with a _load in flight (-> count), and those of them discarded meanwhile
+        self._loading: dict[tuple[int, int], int] = {}
+        self._discarded: set[tuple[int, int]] = set()
+        self._journal = None
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.events = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_ms = 0.0
+
+    async def start(self) -> None:
+        """Replay any journal left by a crash and start the background flush loop."""
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+        journal_dir = os.path.dirname(self.journal_path)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+
+        recovered = self._load_journal()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+        if recovered:
+            logger.warning(f"Recovering {recovered} buffered XP rows from journal")
+            try:
+                await self.flush()
+            except Exception as e:
+                # Rows stay dirty and the journal stays on disk; the flush loop retries
+                logger.error(f"XP journal recovery flush failed: {e}")
+
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and drain everything still pending."""
+        if self._task:
+            # Holding the flush lock means the loop isn't midway through a write
+            async with self._flush_lock:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._task = None
+
+        if self._journal:
+            try:
+                await self.flush()
+            finally:
+                self._journal.close()
+                self._journal = None
+                if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) == 0:
+                    os.remove(self.journal_path)
+
+    async def add(self, user_id: int, xp_change: int, guild_id: int) -> tuple[int, int, bool]:
+        """
+        Apply an XP change in memory. Returns (new_xp, new_level, leveled_up).
+
+        A change for a user discarded while their row was loading is dropped (0, 0, False).
+        """
+        key = (guild_id, user_id)
+        # Awaited first so nothing can discard the entry between lookup and update
+        curve = await self.db.get_level_curve(guild_id)
+        entry = self._state.get(key)
+        if entry is None:
+            entry = await self._load(key)
+            if entry is None:
+                return 0, 0, False
+
+        old_level = entry[1]
+        entry[0] = max(0, entry[0] + xp_change)
+        entry[1] = curve.level(entry[0])
+        entry[2] = time.monotonic()
+
+        self._dirty.add(key)
+        self._write_journal({"g": guild_id, "u": user_id, "xp": entry[0], "level": entry[1]})
+        self.events += 1
+
+        if len(self._dirty) >= self.max_pending:
+            self._flush_event.set()
+
+        return entry[0], entry[1], entry[1] > old_level
+
+    def grant(self, guild_id: int, user_ids: list[int], xp_change: int, curve: LevelCurve) -> dict[int, tuple[int, int, bool]]:
+        """
+        Apply one XP change to every listed user that is tracked, without loading anyone.
+
+        Returns {user_id: (new_xp, new_level, leveled_up)} for the tracked users;
+        the caller writes the rest straight to the database.
+        """
+        applied = {}
+        now = time.monotonic()
+        for user_id in user_ids:
+            key = (guild_id, user_id)
+            entry = self._state.get(key)
+            if entry is None:
+                continue
+            old_level = entry[1]
+            entry[0] = max(0, entry[0] + xp_change)
+            entry[1] = curve.level(entry[0])
+            entry[2] = now
+            self._dirty.add(key)
+            self._write_journal({"g": guild_id, "u": user_id, "xp": entry[0], "level": entry[1]})
+            applied[user_id] = (entry[0], entry[1], entry[1] > old_level)
+
+        self.events += len(applied)
+        if len(self._dirty) >= self.max_pending:
+            self._flush_event.set()
+        return applied
+
+    def peek(self, user_id: int, guild_id: int) -> Optional[tuple[int, int]]:
+        """Get the buffered (xp, level) for a user, or None if not tracked."""
+        entry = self._state.get((guild_id, user_id))
+        return (entry[0], entry[1]) if entry else None
+
+    def guild_entries(self, guild_id: int) -> dict[int, tuple[int, int]]:
+        """Get buffered {user_id: (xp, level)} for every tracked user in a guild."""
+        return {
+            user_id: (entry[0], entry[1])
+            for (g, user_id), entry in self._state.items()
+            if g == guild_id
+        }
+
+    def relevel(self, guild_id: int, curve: LevelCurve) -> None:
+        """Recompute buffered levels for a guild after its level curve changed."""
+        for (g, _), entry in self._state.items():
+            if g == guild_id:
+                entry[1] = curve.level(entry[0])
+
+    def discard(self, user_id: int, guild_id: int) -> None:
+        """Forget a user's buffered XP (their row is being overwritten or deleted)."""
+        key = (guild_id, user_id)
+        self._state.pop(key, None)
+        self._dirty.discard(key)
+        if key in self._loading:
+            self._discarded.add(key)
+        self._write_journal({"g": guild_id, "u": user_id, "drop": True})
+
+    def discard_guild(self, guild_id: int) -> None:
+        """Forget all buffered XP for a guild."""
+        for key in [k for k in self._state if k[0] == guild_id]:
+            self._state.pop(key, None)
+            self._dirty.discard(key)
+        self._discarded |= {k for k in self._loading if k[0] == guild_id}
+        self._write_journal({"g": guild_id, "drop_guild": True})
+
+    async def flush(self) -> int:
+        """Write all dirty entries in batched upserts. Returns the number of rows written."""
+        async with self._flush_lock:
+            if not self._dirty:
+                self._evict_idle()
+                return 0
+
+            started = time.perf_counter()
+            batch = self._dirty
+            self._dirty = set()
+            written = [
+                key for key in batch
+                if key in self._state and (self._state[key][3] or self._state[key][0] > 0)
+            ]
+            rows = [
+                {
+                    'user_id': user_id,
+                    'guild_id': str(guild_id) if guild_id else None,
+                    'username': 'Unknown',
+                    'discriminator': '0',
+                    'xp': self._state[(guild_id, user_id)][0],
+                    'level': self._state[(guild_id, user_id)][1],
+                }
+                for guild_id, user_id in written
+            ]
+            self._rotate_journal()
+
+            try:
+                for i in range(0, len(rows), self.batch_size):
+                    await self.db.run_query(
+                        self.db.supabase.table('users').upsert(
+                            rows[i:i + self.batch_size], on_conflict='user_id,guild_id'
+                        )
+                    )
+            except Exception:
+                # Retry these keys next time; the .flushing journal keeps them crash-safe
+                self._dirty |= {k for k in batch if k in self._state}
+                raise
+
+            for key in written:
+                if key in self._state:
+                    self._state[key][3] = True
+
+            if os.path.exists(self.flushing_path):
+                os.remove(self.flushing_path)
+
+            self.flushes += 1
+            self.rows_written += len(rows)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self._evict_idle()
+            return len(rows)
+
+    def get_stats(self) -> dict:
+        """Get buffer size and write statistics."""
+        return {
+            "pending": len(self._dirty),
+            "tracked": len(self._state),
+            "events": self.events,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+    async def _flush_loop(self) -> None:
+        """Flush every flush_interval seconds, or sooner when max_pending is reached."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"XP buffer flush failed: {e}")
+
+    async def _load(self, key: tuple[int, int]) -> Optional[list]:
+        """
+        Load a user's stored XP and level as the base for buffered changes.
+
+        Returns None if the user was discarded while the row was loading (their
+        row is being deleted, so the loaded values must not be installed).
+        """
+        guild_id, user_id = key
+        self._loading[key] = self._loading.get(key, 0) + 1
+        try:
+            result = await self.db.run_query(
+                self.db.supabase.table('users').select('xp, level').eq('user_id', user_id).eq('guild_id', guild_id)
+            )
+        finally:
+            remaining = self._loading.pop(key) - 1
+            discarded = key in self._discarded
+            if remaining:
+                self._loading[key] = remaining
+            else:
+                self._discarded.discard(key)
+        if discarded:
+            return None
+
+        # Another event may have loaded the same user while we were waiting
+        entry = self._state.get(key)
+        if entry is None:
+            row = result.data[0] if result.data else {'xp': 0, 'level': 0}
+            entry = [row['xp'], row['level'], time.monotonic(), bool(result.data)]
+            self._state[key] = entry
+        return entry
+
+    def _evict_idle(self) -> None:
+        """Drop clean entries that haven't been touched for idle_ttl seconds."""
+        cutoff = time.monotonic() - self.idle_ttl
+        for key in [k for k, v in self._state.items() if v[2] < cutoff and k not in self._dirty]:
+            del self._state[key]
+
+    def _write_journal(self, record: dict) -> None:
+        """Append one record to the crash journal."""
+        if self._journal:
+            self._journal.write(json.dumps(record) + "\n")
+            self._journal.flush()
+
+    def _rotate_journal(self) -> None:
+        """Move the live journal aside so records written during a flush aren't lost."""
+        self._journal.close()
+        if os.path.exists(self.flushing_path):
+            # A previous flush failed - keep its records and append the newer ones
+            with open(self.journal_path, encoding="utf-8") as src, open(
+                self.flushing_path, "a", encoding="utf-8"
+            ) as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.flushing_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _load_journal(self) -> int:
+        """Rebuild dirty entries from journal files left behind. Returns rows recovered."""
+        states: dict[tuple[int, int], tuple[int, int]] = {}
+        for path in (self.flushing_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from the crash
+
+                    if record.get("drop_guild"):
+                        states = {k: v for k, v in states.items() if k[0] != record["g"]}
+                    elif record.get("drop"):
+                        states.pop((record["g"], record["u"]), None)
+                    else:
+                        states[(record["g"], record["u"])] = (record["xp"], record["level"])
+
+        now = time.monotonic()
+        for key, (xp, level) in states.items():
+            # Whether a row exists is unknown after a crash; writing it is the safe side
+            self._state[key] = [xp, level, now, True]
+            self._dirty.add(key)
+        return len(states)
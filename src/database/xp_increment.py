@@ -0,0 +1,139 @@
+﻿"""
+Atomic XP increment for MalaBoT.
+Adds XP and recalculates the level in a single statement instead of select + insert + update.
+
+The Postgres function below must be created once in the Supabase SQL editor
+(or a local Postgres used for testing). A SQLite stand-in with the same
+behaviour is provided for running the XP path offline.
+"""
+
+import sqlite3
+
+from src.utils.level_engine import LevelCurve, get_curve
+
+XP_INCREMENT_FUNCTION = "increment_user_xp"
+
+INCREMENT_USER_XP_SQL = """
+create unique index if not exists users_user_guild_key on users (user_id, guild_id);
+-- Serves rank lookups (count of users above an XP value) and leaderboards
+create index if not exists users_guild_xp_idx on users (guild_id, xp desc);
+
+create or replace function increment_user_xp(
+    p_user_id users.user_id%TYPE,
+    p_guild_id users.guild_id%TYPE,
+    p_xp_change integer,
+    p_progression text default 'custom',
+    p_levels integer[] default '{}',
+    p_thresholds integer[] default '{}'
+)
+returns table (new_xp integer, new_level integer, leveled_up boolean)
+language plpgsql
+as $$
+declare
+    v_xp integer;
+    v_old_level integer;
+    v_level integer;
+begin
+    if p_xp_change <= 0 then
+        -- Removing XP from a user without a row leaves them at 0: don't create one
+        update users as u set xp = greatest(0, u.xp + p_xp_change)
+        where u.user_id = p_user_id and u.guild_id = p_guild_id
+        returning u.xp, u.level into v_xp, v_old_level;
+        if not found then
+            return query select 0, 0, false;
+            return;
+        end if;
+    else
+        -- Upsert-with-increment: the row lock serialises concurrent gains for the same user
+        insert into users as u (user_id, guild_id, username, discriminator, xp, level)
+        values (p_user_id, p_guild_id, 'Unknown', '0', p_xp_change, 0)
+        on conflict (user_id, guild_id)
+        do update set xp = greatest(0, u.xp + p_xp_change)
+        returning u.xp, u.level into v_xp, v_old_level;
+    end if;
+
+    if v_xp < 50 then
+        v_level := 0;
+    elsif p_progression = 'basic' then
+        v_level := (v_xp - 50) / 100 + 1;
+    elsif p_progression = 'gradual' then
+        -- Level L needs 50 + 100 * (L(L+1)/2 - 1) XP, capped at 1000
+        v_level := least(1000, floor((sqrt(8 * ((v_xp - 50) / 100 + 1) + 1) - 1) / 2)::integer);
+    else
+        select coalesce(max(t.lvl), 0) into v_level
+        from unnest(p_levels, p_thresholds) as t(lvl, threshold)
+        where t.threshold <= v_xp;
+    end if;
+
+    if v_level <> v_old_level then
+        update users set level = v_level
+        where user_id = p_user_id and guild_id = p_guild_id;
+    end if;
+
+    return query select v_xp, v_level, v_level > v_old_level;
+end;
+$$;
+"""
+
+
+def increment_params(
+    user_id: int, guild_id: int, xp_change: int, progression_type: str, curve: LevelCurve
+) -> dict:
+    """Build the RPC payload for increment_user_xp."""
+    if progression_type in ("basic", "gradual"):
+        levels, thresholds = [], []
+    else:
+        levels, thresholds = curve.levels, curve.thresholds
+
+    return {
+        "p_user_id": user_id,
+        "p_guild_id": str(guild_id) if guild_id else None,
+        "p_xp_change": xp_change,
+        "p_progression": progression_type,
+        "p_levels": levels,
+        "p_thresholds": thresholds,
+    }
+
+
+def increment_user_xp_sqlite(
+    conn: sqlite3.Connection,
+    user_id: int,
+    guild_id: int,
+    xp_change: int,
+    progression_type: str = "custom",
+    curve: LevelCurve = None,
+) -> tuple[int, int, bool]:
+    """
+    SQLite stand-in for increment_user_xp (requires SQLite 3.35+ for RETURNING).
+
+    Returns:
+        (new_xp, new_level, leveled_up)
+    """
+    with conn:
+        if xp_change <= 0:
+            # Removing XP from a user without a row leaves them at 0: don't create one
+            row = conn.execute(
+                "UPDATE users SET xp = max(0, xp + ?) WHERE user_id = ? AND guild_id = ? "
+                "RETURNING xp, level",
+                (xp_change, user_id, str(guild_id)),
+            ).fetchone()
+            if row is None:
+                return 0, 0, False
+        else:
+            row = conn.execute(
+                "INSERT INTO users (user_id, guild_id, username, discriminator, xp, level) "
+                "VALUES (?, ?, 'Unknown', '0', ?, 0) "
+                "ON CONFLICT (user_id, guild_id) DO UPDATE SET xp = max(0, xp + ?) "
+                "RETURNING xp, level",
+                (user_id, str(guild_id), xp_change, xp_change),
+            ).fetchone()
+        new_xp, old_level = row
+
+        new_level = (curve or get_curve(progression_type)).level(new_xp)
+        if new_level != old_level:
+            conn.execute(
+                "UPDATE users SET level = ? WHERE user_id = ? AND guild_id = ?",
+                (new_level, user_id, str(guild_id)),
+            )
+
+    return new_xp, new_level, new_level > old_level
@@ -7,16 +7,26 @@ import logging
 import os
 import asyncio
 from datetime import datetime
+from src.config.settings import settings
+from src.database.schema_manifest import generated_columns
+from src.database.sqlite_backend import create_database_manager
 from src.database.supabase_models import DatabaseManager
 
 logger = logging.getLogger("backup_manager")
 
+# Tables included in every backup
+BACKUP_TABLES = ['users', 'birthdays', 'audit_log', 'mod_logs', 'health_logs', 'settings', 'system_flags']
+# Unique column each table is paged on (default "id")
+BACKUP_KEYS = {'system_flags': 'flag_name'}
+
 
 class BackupManager:
     """Manages automatic Supabase data backups and recovery"""
 
-    def __init__(self, backup_dir: str = "data/backups"):
+    def __init__(self, backup_dir: str = "data/backups", db_manager: DatabaseManager = None):
         self.backup_dir = backup_dir
+        # Reuse the bot's DatabaseManager when given; otherwise one is opened per operation
+        self.db_manager = db_manager
         self.max_backups = 7  # Keep last 7 days
 
         # Create backup directory if it doesn't exist
@@ -33,35 +43,39 @@ class BackupManager:
             Path to backup file
         """
         try:
-            db = DatabaseManager()
-            await db.initialize()
+            db = await self._open_db()
 
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_filename = f"supabase_backup_{backup_type}_{timestamp}.json"
             backup_path = os.path.join(self.backup_dir, backup_filename)
 
-            # Get all data from Supabase
-            backup_data = {
-                "timestamp": datetime.now().isoformat(),
-                "type": backup_type,
-                "tables": {}
-            }
-
-            # List of tables to backup
-            tables = ['users', 'birthdays', 'audit_log', 'mod_logs', 'health_logs', 'settings', 'system_flags']
-
-            for table in tables:
-                try:
-                    result = db.supabase.table(table).select('*').execute()
-                    backup_data["tables"][table] = result.data
-                    logger.info(f"Backed up {len(result.data)} records from {table}")
-                except Exception as e:
-                    logger.warning(f"Failed to backup table {table}: {e}")
-                    backup_data["tables"][table] = []
-
-            # Save backup to file
-            with open(backup_path, 'w') as f:
-                json.dump(backup_data, f, indent=2)
+            # Stream each table page by page straight into the file, so memory stays
+            # at one page however large the tables are
+            try:
+                with open(backup_path, 'w') as f:
+                    f.write('{\n')
+                    f.write(f'  "timestamp": {json.dumps(datetime.now().isoformat())},\n')
+                    f.write(f'  "type": {json.dumps(backup_type)},\n')
+                    f.write('  "tables": {')
+                    for index, table in enumerate(BACKUP_TABLES):
+                        f.write(f'{"," if index else ""}\n    {json.dumps(table)}: [')
+                        start = f.tell()
+                        count = 0
+                        try:
+                            async for row in db.iter_rows(table, key=BACKUP_KEYS.get(table, 'id')):
+                                f.write(f'{"," if count else ""}\n      {json.dumps(row, default=str)}')
+                                count += 1
+                            logger.info(f"Backed up {count} records from {table}")
+                        except Exception as e:
+                            logger.warning(f"Failed to backup table {table}: {e}")
+                            # Drop the partial table so the backup never holds half of one
+                            f.seek(start)
+                            f.truncate()
+                            count = 0
+                        f.write('\n    ]' if count else ']')
+                    f.write('\n  }\n}\n')
+            finally:
+                await self._close_db(db)
 
             # Verify backup
             if self.verify_backup(backup_path):
@@ -83,6 +97,19 @@ class BackupManager:
             logger.error(f" Backup creation failed: {e}")
             return None
 
+    async def _open_db(self) -> DatabaseManager:
+        """Get the shared DatabaseManager, or open a temporary one."""
+        if self.db_manager:
+            return self.db_manager
+        db = create_database_manager()
+        await db.initialize()
+        return db
+
+    async def _close_db(self, db: DatabaseManager) -> None:
+        """Close a temporary DatabaseManager (the shared one stays open)."""
+        if db is not self.db_manager:
+            await db.close()
+
     def verify_backup(self, backup_path: str) -> bool:
         """
         Verify backup file integrity
@@ -144,21 +171,32 @@ class BackupManager:
             with open(backup_path, 'r') as f:
                 backup_data = json.load(f)
 
-            db = DatabaseManager()
-            await db.initialize()
-
-            # Restore data for each table
-            for table_name, records in backup_data["tables"].items():
-                try:
-                    if records:  # Only restore if there are records
-                        # Clear existing data and insert backup data
-                        db.supabase.table(table_name).delete().neq('id', -1).execute()  # Delete all
-                        db.supabase.table(table_name).insert(records).execute()
-                        logger.info(f" Restored {len(records)} records to {table_name}")
-                    else:
-                        logger.info(f" No records to restore for {table_name}")
-                except Exception as e:
-                    logger.error(f" Failed to restore table {table_name}: {e}")
+            db = await self._open_db()
+            try:
+                # Restore data for each table
+                for table_name, records in backup_data["tables"].items():
+                    try:
+                        if records:  # Only restore if there are records
+                            # Generated columns (e.g. birthdays.birthday_md) can't be inserted
+                            computed = generated_columns(table_name)
+                            if computed:
+                                records = [{k: v for k, v in r.items() if k not in computed} for r in records]
+                            # Clear existing data and insert backup data
+                            await db.run_query(db.supabase.table(table_name).delete().neq('id', -1))  # Delete all
+                            for i in range(0, len(records), settings.DB_PAGE_SIZE):
+                                await db.run_query(db.supabase.table(table_name).insert(records[i:i + settings.DB_PAGE_SIZE]))
+                            logger.info(f" Restored {len(records)} records to {table_name}")
+                        else:
+                            logger.info(f" No records to restore for {table_name}")
+                    except Exception as e:
+                        logger.error(f" Failed to restore table {table_name}: {e}")
+
+                # The restore deleted and reinserted rows, which incremental refreshes can't see
+                if db.table_mirror:
+                    await db.table_mirror.resync()
+                db.settings_cache.invalidate()
+            finally:
+                await self._close_db(db)
 
             logger.info(f" Database restored from: {backup_path}")
             return True
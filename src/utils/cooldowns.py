@@ -0,0 +1,111 @@
+"""
+Cooldown tracker for MalaBoT.
+Remembers when each (guild, user) may next earn XP, grouping expiry times into
+fixed-width time buckets so expired entries are dropped a bucket at a time.
+"""
+
+import time
+from typing import Hashable, Optional
+
+
+class CooldownTracker:
+    """
+    Per-key cooldowns that forget keys once their cooldown has passed.
+
+    Each key is filed under the bucket its cooldown ends in. Whenever the clock
+    moves into a new bucket, every earlier bucket is dropped, so memory only
+    holds keys still cooling down. max_entries is a hard cap for bursts: past
+    it, the keys closest to expiring are let go early.
+    """
+
+    def __init__(self, bucket_seconds: float = 10.0, max_entries: int = 100_000):
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        # key -> time its cooldown ends
+        self._expires: dict[Hashable, float] = {}
+        # bucket index -> keys whose cooldown ends in that bucket (may hold stale keys)
+        self._buckets: dict[int, set[Hashable]] = {}
+        # Last bucket index swept up to
+        self._swept = -1
+
+        # Stats
+        self.blocked = 0
+        self.started = 0
+        self.evicted = 0
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def remaining(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Seconds left on a key's cooldown (0 if it isn't cooling down)."""
+        now = time.monotonic() if now is None else now
+        self._sweep(now)
+        expires = self._expires.get(key)
+        return max(0.0, expires - now) if expires is not None else 0.0
+
+    def try_start(self, key: Hashable, cooldown: float, now: Optional[float] = None) -> bool:
+        """
+        Start a cooldown unless one is running.
+
+        Returns False (and changes nothing) while the key is cooling down.
+        Check and start happen together, so two concurrent events can't both pass.
+        """
+        now = time.monotonic() if now is None else now
+        if self.remaining(key, now) > 0:
+            self.blocked += 1
+            return False
+
+        self.started += 1
+        if cooldown <= 0:
+            return True
+
+        expires = now + cooldown
+        self._expires[key] = expires
+        self._buckets.setdefault(self._bucket(expires), set()).add(key)
+        if len(self._expires) > self.max_entries:
+            self._evict(now)
+        return True
+
+    def clear(self, key: Optional[Hashable] = None) -> None:
+        """End one key's cooldown, or every cooldown."""
+        if key is None:
+            self._expires.clear()
+            self._buckets.clear()
+        else:
+            self._expires.pop(key, None)
+
+    def _sweep(self, now: float) -> None:
+        """Drop every bucket that ended before the current one."""
+        current = self._bucket(now)
+        if current <= self._swept:
+            return
+        self._swept = current
+        for index in [i for i in self._buckets if i < current]:
+            self._drop_bucket(index, now)
+
+    def _drop_bucket(self, index: int, now: float) -> None:
+        for key in self._buckets.pop(index):
+            expires = self._expires.get(key)
+            # A key restarted since it was filed here lives in a later bucket now
+            if expires is not None and self._bucket(expires) == index:
+                del self._expires[key]
+                if expires > now:
+                    self.evicted += 1
+
+    def _evict(self, now: float) -> None:
+        """Free room by dropping whole buckets, soonest-expiring first."""
+        while len(self._expires) > self.max_entries and self._buckets:
+            self._drop_bucket(min(self._buckets), now)
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def get_stats(self) -> dict:
+        """Get tracked key count and block/start counters."""
+        return {
+            "tracked": len(self._expires),
+            "buckets": len(self._buckets),
+            "started": self.started,
+            "blocked": self.blocked,
+            "evicted": self.evicted,
+        }
@@ -34,6 +34,7 @@ class HealthChecker:
         # Database checks
         results["database_exists"] = await self._check_database_exists()
         results["database_accessible"] = await self._check_database_accessible()
+        results["database_circuit_closed"] = self._check_database_circuit()
         results["tables_exist"] = await self._check_tables_exist()
 
         # Data integrity checks
@@ -76,31 +77,38 @@ class HealthChecker:
                 return False
 
             # Try a simple Supabase query
-            result = self.bot.db_manager.supabase.table('users').select('count').execute()
+            db = self.bot.db_manager
+            result = await db.run_query(db.supabase.table('users').select('count'))
             return True
         except Exception as e:
             logger.error(f" Supabase not accessible: {e}")
             return False
 
+    def _check_database_circuit(self) -> bool:
+        """Check that the query circuit breaker isn't failing queries fast"""
+        if not self.bot.db_manager:
+            return False
+
+        state = self.bot.db_manager.get_database_state()
+        if state["state"] != "closed":
+            logger.error(f" Database circuit {state['state']}: {state['last_error']}")
+            return False
+        return True
+
     async def _check_tables_exist(self) -> bool:
-        """Check if all required tables exist in Supabase"""
+        """Check every manifest table and column exists (missing indexes only warn)"""
         try:
-            required_tables = [
-                "users",
-                "birthdays", 
-                "settings",
-                "mod_logs",
-                "roast_xp",
-                "audit_log",
-                "health_logs",
-                "system_flags",
-                "verifications",
-                "appeals",
-            ]
-
-            # For Supabase, we assume tables exist if we can query them
-            # Tables are managed in Supabase dashboard
-            logger.info(" Using Supabase - tables managed in dashboard")
+            report = await self.bot.db_manager.verify_schema()
+            if report is None:
+                # schema_catalog() not installed; tables are managed in the Supabase dashboard
+                logger.info(" Schema catalog unavailable - assuming tables exist")
+                return True
+
+            for table, index in report.missing_indexes:
+                logger.warning(f" Missing index on {table} ({index.columns})")
+            if report.missing_tables or report.missing_columns:
+                logger.error(f" Schema drift: {report.problems()}")
+                return False
             return True
         except Exception as e:
             logger.error(f" Table check failed: {e}")
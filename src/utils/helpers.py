@@ -473,38 +473,7 @@ def is_staff_decorator():
 
 def xp_helper(xp: int) -> dict:
     """Helper function for XP calculations."""
-    from src.config.constants import XP_TABLE
+    from src.utils.level_engine import get_curve
 
-    # Find current level based on XP
-    level = 1
-    for lvl in sorted(XP_TABLE.keys()):
-        if xp >= XP_TABLE[lvl]:
-            level = lvl
-        else:
-            break
-
-    # Get XP thresholds
-    current_level_xp = XP_TABLE.get(level, 0)
-    next_level = level + 1
-
-    # Find next level in table
-    while next_level not in XP_TABLE and next_level <= max(XP_TABLE.keys()):
-        next_level += 1
-
-    next_level_xp = XP_TABLE.get(next_level, current_level_xp)
-    xp_needed = max(0, next_level_xp - xp)
-    xp_progress = xp - current_level_xp
-    xp_total_for_level = next_level_xp - current_level_xp
-
-    return {
-        "level": level,
-        "current_level_xp": current_level_xp,
-        "next_level_xp": next_level_xp,
-        "xp_needed": xp_needed,
-        "xp_progress": xp_progress,
-        "xp_total_for_level": xp_total_for_level,
-        "xp_percentage": (
-            (xp_progress / xp_total_for_level * 100) if xp_total_for_level > 0 else 100
-        ),
-    }
+    return get_curve("custom").progress(xp)
 
@@ -0,0 +1,154 @@
+"""
+Level engine for MalaBoT.
+Precomputes cumulative XP thresholds for each progression type and answers
+level / progress / next-threshold lookups with a binary search.
+"""
+
+import json
+import logging
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from src.config.constants import XP_TABLE
+
+logger = logging.getLogger("level_engine")
+
+# Highest level reachable on the gradual curve (and precomputed on the basic one)
+MAX_LEVEL = 1000
+
+
+class LevelCurve:
+    """
+    Sorted (level, threshold) pairs for one progression type.
+
+    thresholds[i] is the total XP needed to reach levels[i]. If step is set,
+    levels keep going past the last threshold at one level per step XP.
+    """
+
+    def __init__(self, levels: Sequence[int], thresholds: Sequence[int], step: Optional[int] = None):
+        pairs = sorted(zip(levels, thresholds))
+        self.levels: list[int] = [lvl for lvl, _ in pairs]
+        self.thresholds: list[int] = [xp for _, xp in pairs]
+        self.step = step
+
+    @classmethod
+    def from_table(cls, table: dict[int, int]) -> "LevelCurve":
+        """Build a curve from a {level: total_xp} table like XP_TABLE."""
+        return cls(list(table.keys()), list(table.values()))
+
+    def level(self, xp: int) -> int:
+        """Get the level for a total XP amount."""
+        index = bisect_right(self.thresholds, xp) - 1
+        if index < 0:
+            return 0
+        if self.step and index == len(self.thresholds) - 1:
+            return self.levels[-1] + (xp - self.thresholds[-1]) // self.step
+        return self.levels[index]
+
+    def levels_for(self, xps: Sequence[int]) -> list[int]:
+        """Batch version of level(): one sort plus a single sweep over the thresholds."""
+        levels = [0] * len(xps)
+        index = -1
+        last = len(self.thresholds) - 1
+        for position in sorted(range(len(xps)), key=xps.__getitem__):
+            xp = xps[position]
+            while index < last and self.thresholds[index + 1] <= xp:
+                index += 1
+            if index < 0:
+                levels[position] = 0
+            elif self.step and index == last:
+                levels[position] = self.levels[-1] + (xp - self.thresholds[-1]) // self.step
+            else:
+                levels[position] = self.levels[index]
+        return levels
+
+    def threshold(self, level: int) -> int:
+        """Get the total XP needed to reach a level."""
+        if self.step and level > self.levels[-1]:
+            return self.thresholds[-1] + (level - self.levels[-1]) * self.step
+        index = bisect_right(self.levels, level) - 1
+        return self.thresholds[index] if index >= 0 else 0
+
+    def next_threshold(self, level: int) -> Optional[int]:
+        """Get the total XP needed for the next level after this one, or None at the cap."""
+        if self.step and level >= self.levels[-1]:
+            return self.threshold(level + 1)
+        index = bisect_right(self.levels, level)
+        return self.thresholds[index] if index < len(self.thresholds) else None
+
+    def progress(self, xp: int) -> dict:
+        """Get level and progress-to-next-level details for a total XP amount."""
+        level = self.level(xp)
+        current_level_xp = self.threshold(level)
+        next_level_xp = self.next_threshold(level)
+        if next_level_xp is None:
+            next_level_xp = current_level_xp
+
+        xp_progress = xp - current_level_xp
+        xp_total_for_level = next_level_xp - current_level_xp
+        return {
+            "level": level,
+            "current_level_xp": current_level_xp,
+            "next_level_xp": next_level_xp,
+            "xp_needed": max(0, next_level_xp - xp),
+            "xp_progress": xp_progress,
+            "xp_total_for_level": xp_total_for_level,
+            "xp_percentage": (
+                (xp_progress / xp_total_for_level * 100) if xp_total_for_level > 0 else 100
+            ),
+        }
+
+
+def _basic_curve() -> LevelCurve:
+    # Level L needs 50 + 100 * (L - 1) XP
+    levels = list(range(MAX_LEVEL + 1))
+    return LevelCurve(levels, [0] + [50 + 100 * (lvl - 1) for lvl in levels[1:]], step=100)
+
+
+def _gradual_curve() -> LevelCurve:
+    # Level L needs 50 + 100 * (L(L+1)/2 - 1) XP, capped at MAX_LEVEL
+    levels = list(range(MAX_LEVEL + 1))
+    return LevelCurve(levels, [0] + [50 + 100 * (lvl * (lvl + 1) // 2 - 1) for lvl in levels[1:]])
+
+
+_CURVES = {
+    "basic": _basic_curve(),
+    "gradual": _gradual_curve(),
+    "custom": LevelCurve.from_table(XP_TABLE),
+}
+
+
+def get_curve(progression_type: Optional[str] = "custom", custom_curve: Optional[str] = None) -> LevelCurve:
+    """
+    Get the level curve for a progression type.
+
+    custom_curve is an optional JSON {level: total_xp} table (the guild's
+    xp_custom_curve setting) that replaces XP_TABLE for "custom" progression.
+    """
+    if progression_type in ("basic", "gradual"):
+        return _CURVES[progression_type]
+    if custom_curve:
+        return _parse_custom_curve(custom_curve)
+    return _CURVES["custom"]
+
+
+@lru_cache(maxsize=64)
+def _parse_custom_curve(custom_curve: str) -> LevelCurve:
+    """Parse and validate a guild's custom curve, falling back to XP_TABLE."""
+    try:
+        table = {int(lvl): int(xp) for lvl, xp in json.loads(custom_curve).items()}
+        curve = LevelCurve.from_table(table)
+        if curve.levels[0] != 0 or curve.thresholds[0] != 0:
+            raise ValueError("curve must start at level 0 with 0 XP")
+        if any(a >= b for a, b in zip(curve.thresholds, curve.thresholds[1:])):
+            raise ValueError("thresholds must increase with level")
+        return curve
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Invalid custom XP curve, using default table: {e}")
+        return _CURVES["custom"]
+
+
+def level_for_xp(xp: int, progression_type: str = "custom") -> int:
+    """Calculate level from XP for a built-in progression type."""
+    return get_curve(progression_type).level(xp)
@@ -1,36 +1,104 @@
-﻿"""Database migration verification utility"""
+﻿"""Database migration verification utility
 
+Run as python -m src.utils.migration_check [--dsn postgresql://...] to check
+the schema against src/database/schema_manifest.py. The fix-up DDL for any
+drift is printed and the exit status is 1, so CI can run it against a local
+Postgres (--dsn) or the configured database.
+"""
+
+import argparse
 import asyncio
 import logging
+import sys
+from typing import Optional
+
+from src.database.schema_manifest import SCHEMA_CATALOG_FUNCTION, SchemaReport, check_catalog, fetch_catalog_dsn
+from src.database.sqlite_backend import create_database_manager
 from src.database.supabase_models import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
 
-async def verify_migrations():
-    """Verify Supabase connection and basic functionality"""
+async def verify_migrations(db_manager: DatabaseManager = None):
+    """Verify Supabase connection and that the schema matches the manifest"""
+    db = db_manager
     try:
-        db = DatabaseManager()
-        await db.initialize()
+        if db is None:
+            db = create_database_manager()
+            await db.initialize()
 
         # Test basic database connectivity
         try:
             # Try a simple query to verify connection
-            result = db.supabase.table('users').select('count').execute()
+            result = await db.run_query(db.supabase.table('users').select('count'))
             logger.info("Supabase connection verified ")
-            return True
         except Exception as e:
             logger.error(f"Supabase connection failed: {e}")
             return False
 
+        # Schema drift is reported with its fix but doesn't stop the bot
+        await verify_schema(db)
+        return True
+
     except Exception as e:
         logger.error(f"Database verification failed: {e}")
         return False
     finally:
-        # Supabase doesn't need explicit connection closing
-        pass
+        # Release the query executor's worker threads (unless the caller owns the manager)
+        if db and db is not db_manager:
+            await db.close()
 
 
-if __name__ == "__main__":
-    asyncio.run(verify_migrations())
+async def verify_schema(db: Optional[DatabaseManager] = None, dsn: Optional[str] = None) -> Optional[SchemaReport]:
+    """
+    Check the schema against the manifest and log any drift with the DDL to fix it.
+
+    Reads the catalog from dsn if given, else through the database's schema_catalog() function.
+    Returns None if the catalog couldn't be read.
+    """
+    try:
+        if dsn:
+            report = check_catalog(await asyncio.to_thread(fetch_catalog_dsn, dsn))
+        else:
+            report = await db.verify_schema()
+    except Exception as e:
+        logger.error(f"Schema check failed: {e}")
+        return None
+
+    if report is None:
+        logger.warning(
+            f"Schema not verified: create the {SCHEMA_CATALOG_FUNCTION}() function from "
+            "SCHEMA_CATALOG_SQL (src/database/schema_manifest.py) and run the check with the "
+            "service-role key or --dsn"
+        )
+    elif report.ok:
+        logger.info("Schema matches manifest ")
+    else:
+        for problem in report.problems():
+            logger.warning(f"Schema drift: {problem}")
+        logger.warning(f"Run this SQL to fix the schema:\n{report.ddl()}")
+    return report
 
+
+async def _main(dsn: Optional[str]) -> int:
+    db = None if dsn else create_database_manager()
+    try:
+        report = await verify_schema(db, dsn)
+    finally:
+        if db:
+            await db.close()
+
+    if report is None:
+        return 2
+    if not report.ok:
+        print(report.ddl())
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the database schema against the manifest")
+    parser.add_argument("--dsn", help="Postgres connection string to check instead of the configured database")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    sys.exit(asyncio.run(_main(args.dsn)))
@@ -0,0 +1,315 @@
+"""
+Voice session engine for MalaBoT.
+Tracks everyone in voice, credits voice XP on a fixed tick in one batch per guild,
+and checkpoints open sessions to disk so a restart doesn't lose them.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+import discord
+
+from src.config.constants import XP_PER_VOICE_MINUTE
+
+logger = logging.getLogger("voice_sessions")
+
+
+class VoiceSession:
+    """One member's time in voice that hasn't been credited yet."""
+
+    __slots__ = ("channel_id", "eligible", "since", "seconds")
+
+    def __init__(self, channel_id: int, since: float, seconds: float = 0.0):
+        self.channel_id = channel_id
+        self.eligible = False
+        # Monotonic time seconds were last counted up to
+        self.since = since
+        # Eligible seconds not yet turned into XP
+        self.seconds = seconds
+
+    def accrue(self, now: float) -> None:
+        if self.eligible:
+            self.seconds += now - self.since
+        self.since = now
+
+
+class VoiceSessionEngine:
+    """
+    In-memory (guild, user) voice sessions credited every tick_interval seconds.
+
+    Voice state events only update memory: they count the time earned so far and
+    re-check the exclusion rules for the channels involved. Each tick turns whole
+    minutes into XP with one grant_xp_bulk call per guild and XP amount, and the
+    leftover seconds of every session are written to checkpoint_path.
+    """
+
+    def __init__(
+        self,
+        bot,
+        on_level_up: Optional[Callable[[discord.Member], Awaitable[None]]] = None,
+        tick_interval: float = 60.0,
+        checkpoint_path: str = "data/voice_sessions.json",
+        exclude_afk: bool = True,
+        exclude_muted: bool = False,
+        exclude_solo: bool = False,
+    ):
+        self.bot = bot
+        self.on_level_up = on_level_up
+        self.tick_interval = tick_interval
+        self.checkpoint_path = checkpoint_path
+        self.exclude_afk = exclude_afk
+        self.exclude_muted = exclude_muted
+        self.exclude_solo = exclude_solo
+
+        self._sessions: dict[tuple[int, int], VoiceSession] = {}
+        # Seconds still owed to members who left voice since the last tick
+        self._departed: dict[tuple[int, int], float] = {}
+        # Seconds read from the checkpoint, matched to members by the next snapshot
+        self._restored: dict[tuple[int, int], float] = {}
+        self._tick_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.ticks = 0
+        self.credited_minutes = 0
+        self.failed_ticks = 0
+        self.last_tick_ms = 0.0
+
+    async def start(self) -> None:
+        """Load the last checkpoint and start the tick loop."""
+        checkpoint_dir = os.path.dirname(self.checkpoint_path)
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        self._restored = self._load_checkpoint()
+        if self._restored:
+            logger.info(f"Restored {len(self._restored)} voice sessions from checkpoint")
+
+        self._tick_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._tick_loop())
+
+    async def stop(self) -> None:
+        """Stop the tick loop, credit whole minutes and checkpoint what's left."""
+        if not self._task:
+            return
+        async with self._tick_lock:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.tick()
+
+    def snapshot(self, guilds) -> None:
+        """
+        Reconcile sessions with who is in voice right now.
+
+        Called on ready (and after reconnects, when voice events may have been
+        missed): opens sessions for members already in voice and closes sessions
+        for members who are gone.
+        """
+        now = time.monotonic()
+        present: dict[tuple[int, int], discord.Member] = {}
+        for guild in guilds:
+            for channel in list(guild.voice_channels) + list(guild.stage_channels):
+                for member in channel.members:
+                    if not member.bot:
+                        present[(guild.id, member.id)] = member
+
+        for key in [k for k in self._sessions if k not in present]:
+            self._close(key, now)
+
+        for key, member in present.items():
+            session = self._sessions.get(key)
+            if session is None:
+                seconds = self._restored.pop(key, 0.0)
+                self._sessions[key] = VoiceSession(member.voice.channel.id, now, seconds)
+            else:
+                session.accrue(now)
+                session.channel_id = member.voice.channel.id
+
+        # Restored members who left while the bot was down are still owed their seconds
+        for key, seconds in self._restored.items():
+            self._departed[key] = self._departed.get(key, 0.0) + seconds
+        self._restored.clear()
+
+        for member in present.values():
+            self._refresh(member)
+
+    def update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
+        """Apply a voice state change: join, leave, move, or mute/deafen."""
+        if member.bot:
+            return
+
+        now = time.monotonic()
+        key = (member.guild.id, member.id)
+        channels = {c.id: c for c in (before.channel, after.channel) if c is not None}
+
+        # Count time up to now under the old rules for everyone whose rules may change
+        for channel in channels.values():
+            for other in channel.members:
+                session = self._sessions.get((member.guild.id, other.id))
+                if session:
+                    session.accrue(now)
+
+        session = self._sessions.get(key)
+        if after.channel is None:
+            self._close(key, now)
+        elif session is None:
+            self._sessions[key] = VoiceSession(after.channel.id, now)
+        else:
+            session.accrue(now)
+            session.channel_id = after.channel.id
+
+        for channel in channels.values():
+            for other in channel.members:
+                self._refresh(other)
+
+    def _close(self, key: tuple[int, int], now: float) -> None:
+        session = self._sessions.pop(key, None)
+        if session:
+            session.accrue(now)
+            if session.seconds:
+                self._departed[key] = self._departed.get(key, 0.0) + session.seconds
+
+    def _refresh(self, member: discord.Member) -> None:
+        session = self._sessions.get((member.guild.id, member.id))
+        if session:
+            session.eligible = self._is_eligible(member)
+
+    def _is_eligible(self, member: discord.Member) -> bool:
+        """Whether a member's time in voice currently earns XP."""
+        voice = member.voice
+        if voice is None or voice.channel is None:
+            return False
+        afk_channel = member.guild.afk_channel
+        if self.exclude_afk and afk_channel and voice.channel.id == afk_channel.id:
+            return False
+        if self.exclude_muted and (voice.self_mute or voice.self_deaf or voice.mute or voice.deaf):
+            return False
+        if self.exclude_solo and not any(m.id != member.id and not m.bot for m in voice.channel.members):
+            return False
+        return True
+
+    async def tick(self) -> None:
+        """Credit every session's whole minutes in one batch per guild, then checkpoint."""
+        async with self._tick_lock:
+            started = time.perf_counter()
+            now = time.monotonic()
+
+            # guild_id -> user_id -> minutes to credit
+            owed: dict[int, dict[int, int]] = {}
+            for (guild_id, user_id), session in self._sessions.items():
+                session.accrue(now)
+                minutes = int(session.seconds // 60)
+                if minutes:
+                    session.seconds -= minutes * 60
+                    owed.setdefault(guild_id, {})[user_id] = minutes
+            departed, self._departed = self._departed, {}
+            for (guild_id, user_id), seconds in departed.items():
+                minutes = int(seconds // 60)
+                if minutes:
+                    users = owed.setdefault(guild_id, {})
+                    users[user_id] = users.get(user_id, 0) + minutes
+
+            for guild_id, users in owed.items():
+                try:
+                    await self._credit(guild_id, users)
+                except Exception as e:
+                    self.failed_ticks += 1
+                    logger.error(f"Voice XP credit for guild {guild_id} failed: {e}")
+                    # Give the minutes back so the next tick retries them
+                    for user_id, minutes in users.items():
+                        session = self._sessions.get((guild_id, user_id))
+                        if session:
+                            session.seconds += minutes * 60
+                        else:
+                            key = (guild_id, user_id)
+                            self._departed[key] = self._departed.get(key, 0.0) + minutes * 60
+
+            self._save_checkpoint()
+            self.ticks += 1
+            self.last_tick_ms = (time.perf_counter() - started) * 1000
+
+    async def _credit(self, guild_id: int, users: dict[int, int]) -> None:
+        db = self.bot.db_manager
+        voice_xp_enabled = await db.get_setting("xp_voice_enabled", guild_id)
+        if voice_xp_enabled == "false":
+            return
+        xp_per_minute_str = await db.get_setting("xp_per_voice_minute", guild_id)
+        xp_per_minute = int(xp_per_minute_str) if xp_per_minute_str else XP_PER_VOICE_MINUTE
+        if xp_per_minute <= 0:
+            return
+
+        # Usually everyone earned the same minutes this tick, so this is one group
+        by_amount: dict[int, list[int]] = {}
+        for user_id, minutes in users.items():
+            by_amount.setdefault(minutes * xp_per_minute, []).append(user_id)
+
+        leveled_up = []
+        for xp_change, user_ids in by_amount.items():
+            leveled_up += await db.grant_xp_bulk(guild_id, user_ids, xp_change)
+        self.credited_minutes += sum(users.values())
+
+        guild = self.bot.get_guild(guild_id)
+        if guild and self.on_level_up:
+            for user_id, _ in leveled_up:
+                member = guild.get_member(user_id)
+                if member:
+                    await self.on_level_up(member)
+
+    def _load_checkpoint(self) -> dict[tuple[int, int], float]:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable voice checkpoint {self.checkpoint_path}: {e}")
+            return {}
+        return {(guild_id, user_id): seconds for guild_id, user_id, seconds in data.get("sessions", [])}
+
+    def _save_checkpoint(self) -> None:
+        """Write every session's uncredited seconds (written aside, then renamed over the old file)."""
+        pending: dict[tuple[int, int], float] = dict(self._restored)
+        for key, seconds in self._departed.items():
+            pending[key] = pending.get(key, 0.0) + seconds
+        for key, session in self._sessions.items():
+            pending[key] = pending.get(key, 0.0) + session.seconds
+
+        data = {
+            "saved_at": time.time(),
+            "sessions": [[guild_id, user_id, round(seconds, 1)] for (guild_id, user_id), seconds in pending.items()],
+        }
+        temp_path = self.checkpoint_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.checkpoint_path)
+        except OSError as e:
+            logger.error(f"Failed to write voice checkpoint: {e}")
+
+    def get_stats(self) -> dict:
+        """Get session counts and credit counters."""
+        return {
+            "active": len(self._sessions),
+            "eligible": sum(1 for s in self._sessions.values() if s.eligible),
+            "departed": len(self._departed),
+            "ticks": self.ticks,
+            "credited_minutes": self.credited_minutes,
+            "failed_ticks": self.failed_ticks,
+            "last_tick_ms": self.last_tick_ms,
+        }
+
+    async def _tick_loop(self) -> None:
+        """Credit voice time every tick_interval seconds."""
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Voice XP tick failed: {e}")
@@ -0,0 +1,21 @@
+"""Shared fixtures: a DatabaseManager on a throwaway SQLite file."""
+
+import os
+import tempfile
+
+# Before settings is imported: cog loggers would otherwise create data/logs in the checkout
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "malabot-tests", "bot.log"))
+
+import pytest_asyncio
+
+from src.config.settings import settings
+from src.database.sqlite_backend import SQLiteDatabaseManager
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "XP_JOURNAL_PATH", str(tmp_path / "xp_journal.log"))
+    db = SQLiteDatabaseManager(str(tmp_path / "bot.db"))
+    await db.initialize()
+    yield db
+    await db.close()
@@ -0,0 +1,118 @@
+"""Tests for the batched audit-log pipeline."""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import pytest_asyncio
+from postgrest.exceptions import APIError
+
+from src.database.audit_pipeline import AuditLogPipeline
+
+
+class FakeTable:
+    def __init__(self, name):
+        self.name = name
+
+    def insert(self, rows):
+        return self.name, rows if isinstance(rows, list) else [rows]
+
+
+class FakeDB:
+    """Records inserted rows; rows with "bad" are rejected, and the database can go down."""
+
+    def __init__(self):
+        self.supabase = SimpleNamespace(table=FakeTable)
+        self.inserted: list[tuple[str, dict]] = []
+        self.down = False
+
+    async def run_query(self, builder):
+        table, rows = builder
+        if self.down:
+            raise httpx.ConnectError("connection refused")
+        if any(row.get("bad") for row in rows):
+            raise APIError({"message": "column \"bad\" does not exist", "code": "42703"})
+        self.inserted += [(table, row) for row in rows]
+        return SimpleNamespace(data=rows)
+
+
+@pytest_asyncio.fixture
+async def pipeline():
+    pipeline = AuditLogPipeline(FakeDB(), max_queue=10, batch_size=5, flush_interval=3600)
+    await pipeline.start()
+    yield pipeline
+    pipeline._task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_one_batch_per_table(pipeline):
+    for i in range(3):
+        await pipeline.submit("audit_logs", {"n": i})
+    await pipeline.submit("mod_logs", {"n": 3})
+
+    assert await pipeline.flush()
+    assert len(pipeline.db.inserted) == 4
+    assert pipeline.get_stats()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_requeues_batch(pipeline):
+    for i in range(3):
+        await pipeline.submit("audit_logs", {"n": i})
+    pipeline.db.down = True
+
+    assert not await pipeline.flush()
+    stats = pipeline.get_stats()
+    assert stats["queued"] == 3
+    assert stats["dropped"] == 0
+    assert stats["failed_flushes"] == 1
+
+    pipeline.db.down = False
+    assert await pipeline.flush()
+    assert [row["n"] for _, row in pipeline.db.inserted] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_rejected_row_is_dropped_without_losing_the_batch(pipeline):
+    await pipeline.submit("audit_logs", {"n": 0})
+    await pipeline.submit("audit_logs", {"n": 1, "bad": True})
+    await pipeline.submit("audit_logs", {"n": 2})
+
+    assert await pipeline.flush()
+    assert [row["n"] for _, row in pipeline.db.inserted] == [0, 2]
+    stats = pipeline.get_stats()
+    assert stats["queued"] == 0
+    assert stats["dropped"] == 1
+    assert stats["written"] == 2
+
+
+@pytest.mark.asyncio
+async def test_poison_row_does_not_stall_block_policy():
+    pipeline = AuditLogPipeline(FakeDB(), max_queue=2, batch_size=2, flush_interval=3600, overflow_policy="block")
+    await pipeline.start()
+    try:
+        await pipeline.submit("audit_logs", {"n": 0, "bad": True})
+        await pipeline.submit("audit_logs", {"n": 1})
+        # The queue is full; this only returns once a flush makes room
+        await asyncio.wait_for(pipeline.submit("audit_logs", {"n": 2}), timeout=5)
+        await pipeline.stop()
+        assert [row["n"] for _, row in pipeline.db.inserted] == [1, 2]
+        assert pipeline.get_stats()["dropped"] == 1
+    finally:
+        if pipeline._task:
+            pipeline._task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_requeue_respects_max_queue(pipeline):
+    for i in range(5):
+        await pipeline.submit("audit_logs", {"n": i})
+    pipeline.db.down = True
+    assert not await pipeline.flush()
+
+    # Fill the freed room while the flush was failing, then fail again
+    for i in range(5, 10):
+        await pipeline.submit("audit_logs", {"n": i})
+    assert not await pipeline.flush()
+    assert pipeline.get_stats()["queued"] <= 10
@@ -0,0 +1,76 @@
+"""Tests for the bucketed XP cooldown tracker."""
+
+from src.utils.cooldowns import CooldownTracker
+
+
+def test_try_start_blocks_until_cooldown_ends():
+    tracker = CooldownTracker(bucket_seconds=10)
+    assert tracker.try_start("a", 60, now=100)
+    assert not tracker.try_start("a", 60, now=159)
+    assert tracker.remaining("a", now=130) == 30
+    assert tracker.try_start("a", 60, now=160)
+
+    stats = tracker.get_stats()
+    assert stats["started"] == 2
+    assert stats["blocked"] == 1
+
+
+def test_keys_are_independent():
+    tracker = CooldownTracker()
+    assert tracker.try_start((1, 5), 60, now=0)
+    assert tracker.try_start((2, 5), 60, now=0)
+    assert tracker.try_start((1, 6), 60, now=0)
+    assert not tracker.try_start((1, 5), 60, now=1)
+
+
+def test_zero_cooldown_is_never_tracked():
+    tracker = CooldownTracker()
+    assert tracker.try_start("a", 0, now=0)
+    assert tracker.try_start("a", 0, now=0)
+    assert len(tracker) == 0
+
+
+def test_expired_keys_are_forgotten_a_bucket_at_a_time():
+    tracker = CooldownTracker(bucket_seconds=10)
+    for i in range(100):
+        tracker.try_start(i, 30, now=0)
+    tracker.try_start("late", 30, now=25)
+
+    # Still inside the bucket the first batch expires in
+    assert tracker.remaining(0, now=35) == 0
+    assert len(tracker) == 101
+
+    # Moving into the next bucket drops the whole expired bucket
+    tracker.remaining("late", now=40)
+    assert len(tracker) == 1
+    assert tracker.get_stats()["evicted"] == 0
+
+
+def test_restarted_key_survives_its_old_bucket():
+    tracker = CooldownTracker(bucket_seconds=10)
+    tracker.try_start("a", 5, now=0)
+    tracker.try_start("a", 60, now=6)
+    assert tracker.remaining("a", now=20) == 46
+
+
+def test_max_entries_evicts_soonest_expiring():
+    tracker = CooldownTracker(bucket_seconds=10, max_entries=3)
+    tracker.try_start("soon", 5, now=0)
+    tracker.try_start("later", 100, now=0)
+    tracker.try_start("latest", 200, now=0)
+    tracker.try_start("new", 150, now=0)
+
+    assert len(tracker) <= 3
+    assert tracker.remaining("soon", now=1) == 0
+    assert tracker.remaining("latest", now=1) > 0
+    assert tracker.get_stats()["evicted"] == 1
+
+
+def test_clear():
+    tracker = CooldownTracker()
+    tracker.try_start("a", 60, now=0)
+    tracker.try_start("b", 60, now=0)
+    tracker.clear("a")
+    assert tracker.try_start("a", 60, now=1)
+    tracker.clear()
+    assert len(tracker) == 0
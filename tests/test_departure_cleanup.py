@@ -0,0 +1,71 @@
+"""Tests for the batched departure cleanup."""
+
+import pytest
+import pytest_asyncio
+
+
+@pytest_asyncio.fixture
+async def cleanup_db(db):
+    await db.start_departure_cleanup()
+    # Flushed by hand in these tests
+    db.departure_cleanup._task.cancel()
+    db.departure_cleanup._task = None
+    return db
+
+
+@pytest.mark.asyncio
+async def test_departed_members_are_deleted_in_one_batch(cleanup_db):
+    db = cleanup_db
+    for user_id in (1, 2, 3):
+        await db.update_user_xp(user_id, 50, 10)
+        await db.set_birthday(user_id, "2000-01-02", 10)
+
+    for user_id in (1, 2):
+        await db.cleanup_departed_member(user_id, 10)
+    assert await db.departure_cleanup.flush()
+
+    assert await db.get_user_xp(1, 10) == 0
+    assert await db.get_birthday(2, 10) is None
+    assert await db.get_user_xp(3, 10) == 50
+    stats = db.departure_cleanup.get_stats()
+    assert stats["cleaned"] == 2
+    assert stats["batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rejoin_before_flush_keeps_data(cleanup_db):
+    db = cleanup_db
+    await db.update_user_xp(1, 50, 10)
+    await db.set_birthday(1, "2000-01-02", 10)
+
+    await db.cleanup_departed_member(1, 10)
+    db.cancel_departure_cleanup(1, 10)
+    # XP earned after rejoining
+    await db.update_user_xp(1, 25, 10)
+    assert await db.departure_cleanup.flush()
+
+    assert await db.get_user_xp(1, 10) == 75
+    assert await db.get_birthday(1, 10) is not None
+    assert db.departure_cleanup.get_stats()["cancelled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_buffered_xp_is_not_written_back_after_cleanup(cleanup_db):
+    db = cleanup_db
+    await db.start_xp_buffer()
+    await db.update_user_xp(1, 50, 10)
+
+    await db.cleanup_departed_member(1, 10)
+    assert await db.departure_cleanup.flush()
+    await db.xp_buffer.flush()
+
+    assert db.xp_buffer.peek(1, 10) is None
+    result = await db.run_query(db.supabase.table('users').select('xp').eq('user_id', 1).eq('guild_id', 10))
+    assert result.data == []
+
+
+@pytest.mark.asyncio
+async def test_fallback_without_queue_deletes_immediately(db):
+    await db.update_user_xp(1, 50, 10)
+    await db.cleanup_departed_member(1, 10)
+    assert await db.get_user_xp(1, 10) == 0
@@ -0,0 +1,65 @@
+"""Tests for granting XP to many users at once against the SQLite backend."""
+
+import pytest
+
+from src.config.settings import settings
+from src.database.sqlite_backend import SQLiteQuery
+
+
+@pytest.fixture
+def small_pages(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PAGE_SIZE", 5)
+    monkeypatch.setattr(settings, "DB_IN_LIST_SIZE", 2)
+
+    in_lists = []
+    original = SQLiteQuery.in_
+
+    def record(self, column, values):
+        values = list(values)
+        in_lists.append(len(values))
+        return original(self, column, values)
+
+    monkeypatch.setattr(SQLiteQuery, "in_", record)
+    return in_lists
+
+
+@pytest.mark.asyncio
+async def test_grant_updates_existing_and_new_users(db, small_pages):
+    await db.update_user_xp(1, 40, 10)
+    curve = await db.get_level_curve(10)
+
+    user_ids = list(range(1, 13))
+    progress = []
+
+    async def report(done, total):
+        progress.append((done, total))
+
+    leveled_up = await db.grant_xp_bulk(10, user_ids, 20, progress=report)
+
+    assert await db.get_user_xp(1, 10) == 60
+    assert all([await db.get_user_xp(u, 10) == 20 for u in user_ids[1:]])
+    expected = {u for u in user_ids if curve.level(60 if u == 1 else 20) > curve.level(40 if u == 1 else 0)}
+    assert {u for u, _ in leveled_up} == expected
+    assert progress == [(5, 12), (10, 12), (12, 12)]
+    # IDs go in the URL, so no IN list may exceed DB_IN_LIST_SIZE
+    assert small_pages and max(small_pages) <= 2
+
+
+@pytest.mark.asyncio
+async def test_grant_uses_buffered_xp(db, small_pages):
+    await db.start_xp_buffer()
+    await db.update_user_xp(1, 40, 10)
+    await db.grant_xp_bulk(10, [1, 2], 5)
+
+    assert db.xp_buffer.peek(1, 10)[0] == 45
+    assert await db.get_user_xp(2, 10) == 5
+
+
+@pytest.mark.asyncio
+async def test_grant_levels_match_the_curve(db, small_pages):
+    curve = await db.get_level_curve(10)
+    amount = curve.threshold(3)
+    leveled_up = await db.grant_xp_bulk(10, [7], amount)
+
+    assert leveled_up == [(7, 3)]
+    assert await db.get_user_level(7, 10) == 3
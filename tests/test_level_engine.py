@@ -0,0 +1,82 @@
+"""Tests for the level engine: parity with the original per-call level formulas."""
+
+import pytest
+
+from src.config.constants import XP_TABLE
+from src.utils.level_engine import get_curve
+
+
+def original_level_for_xp(xp: int, progression_type: str) -> int:
+    """The loop-based level calculation the level engine replaced."""
+    if xp < 50:
+        return 0
+
+    if progression_type == "basic":
+        return ((xp - 50) // 100) + 1
+
+    if progression_type == "gradual":
+        level = 1
+        total_xp_needed = 50
+        while level < 1000:
+            total_xp_needed += (level + 1) * 100
+            if xp < total_xp_needed:
+                return level
+            level += 1
+        return 1000
+
+    level = 0
+    for lvl in sorted(XP_TABLE.keys()):
+        if xp >= XP_TABLE[lvl]:
+            level = lvl
+        else:
+            break
+    return level
+
+
+def sample_xps(curve) -> list[int]:
+    """Every threshold and its neighbours, plus values past the last one."""
+    xps = {0, 1, 49, 50}
+    for threshold in curve.thresholds:
+        xps.update((threshold - 1, threshold, threshold + 1))
+    top = curve.thresholds[-1]
+    xps.update((top * 2, top * 10))
+    return sorted(x for x in xps if x >= 0)
+
+
+@pytest.mark.parametrize("progression_type", ["basic", "gradual", "custom"])
+def test_level_matches_original_formula(progression_type):
+    curve = get_curve(progression_type)
+    for xp in sample_xps(curve):
+        assert curve.level(xp) == original_level_for_xp(xp, progression_type), xp
+
+
+@pytest.mark.parametrize("progression_type", ["basic", "gradual", "custom"])
+def test_levels_for_matches_level(progression_type):
+    curve = get_curve(progression_type)
+    xps = list(reversed(sample_xps(curve)))
+    assert curve.levels_for(xps) == [curve.level(xp) for xp in xps]
+
+
+@pytest.mark.parametrize("progression_type", ["basic", "gradual", "custom"])
+def test_thresholds_are_where_levels_start(progression_type):
+    curve = get_curve(progression_type)
+    # The custom table skips levels, so the level below is the previous table entry
+    for previous, level in zip(curve.levels[:50], curve.levels[1:50]):
+        threshold = curve.threshold(level)
+        assert curve.level(threshold) == level
+        assert curve.level(threshold - 1) == previous
+
+
+def test_progress_past_the_last_custom_level():
+    curve = get_curve("custom")
+    top = curve.thresholds[-1]
+    stats = curve.progress(top * 3)
+    assert stats["level"] == curve.levels[-1]
+    assert stats["xp_needed"] == 0
+    assert stats["xp_percentage"] == 100
+
+
+def test_invalid_custom_curve_falls_back_to_default():
+    assert get_curve("custom", '{"1": 100}') is get_curve("custom")
+    assert get_curve("custom", "not json") is get_curve("custom")
+    assert get_curve("custom", '{"0": 0, "1": 10}').level(10) == 1
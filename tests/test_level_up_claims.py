@@ -0,0 +1,51 @@
+"""Tests for level-up announcement claims."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.cogs.xp import XP
+from src.database.circuit_breaker import DatabaseUnavailable
+
+
+class FakeDB:
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def claim_level_announcement(self, user_id, guild_id, level):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def make_cog(*results):
+    return XP(SimpleNamespace(db_manager=FakeDB(results)))
+
+
+member = SimpleNamespace(id=1, guild=SimpleNamespace(id=10))
+
+
+@pytest.mark.asyncio
+async def test_claim_is_remembered():
+    cog = make_cog(True)
+    assert await cog._claim_level_up(member, 3)
+    assert not await cog._claim_level_up(member, 3)
+    assert cog.bot.db_manager.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_claim_is_retried():
+    cog = make_cog(DatabaseUnavailable("circuit open"), True)
+    with pytest.raises(DatabaseUnavailable):
+        await cog._claim_level_up(member, 3)
+    assert await cog._claim_level_up(member, 3)
+
+
+@pytest.mark.asyncio
+async def test_claim_lost_to_another_handler_is_not_cached():
+    cog = make_cog(False, False)
+    assert not await cog._claim_level_up(member, 3)
+    assert (10, 1, 3) not in cog.level_up_sent
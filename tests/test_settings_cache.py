@@ -0,0 +1,48 @@
+"""Tests for serving stale settings during outages."""
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+
+def fail_reads(db, error):
+    async def failing(key, build):
+        raise error
+    db._shared_read = failing
+
+
+@pytest.mark.asyncio
+async def test_stale_setting_served_on_transient_error(db):
+    await db.set_setting("xp_channel", "123", 1)
+    assert await db.get_setting("xp_channel", 1) == "123"
+    db.settings_cache.ttl = 0
+    db.settings_cache.store("xp_channel", "123", 1)
+
+    fail_reads(db, httpx.ConnectError("connection refused"))
+    assert await db.get_setting("xp_channel", 1) == "123"
+    assert await db.get_settings(1, ["xp_channel"]) == {"xp_channel": "123"}
+    assert db.settings_cache.stale_hits == 2
+
+
+@pytest.mark.asyncio
+async def test_non_transient_error_is_not_a_stale_hit(db):
+    db.settings_cache.ttl = 0
+    db.settings_cache.store("xp_channel", "123", 1)
+
+    fail_reads(db, APIError({"message": "permission denied", "code": "42501"}))
+    with pytest.raises(APIError):
+        await db.get_setting("xp_channel", 1)
+    with pytest.raises(APIError):
+        await db.get_settings(1, ["xp_channel"])
+    assert db.settings_cache.stale_hits == 0
+
+
+@pytest.mark.asyncio
+async def test_partial_stale_settings_raise_without_counting(db):
+    db.settings_cache.ttl = 0
+    db.settings_cache.store("xp_channel", "123", 1)
+
+    fail_reads(db, httpx.ConnectError("connection refused"))
+    with pytest.raises(httpx.ConnectError):
+        await db.get_settings(1, ["xp_channel", "xp_cooldown"])
+    assert db.settings_cache.stale_hits == 0
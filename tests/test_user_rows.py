@@ -0,0 +1,60 @@
+"""Tests for users rows: no placeholder rows are created, and only empty ones are pruned."""
+
+import pytest
+
+
+async def user_row(db, user_id, guild_id=10):
+    result = await db.run_query(db.supabase.table('users').select('*').eq('user_id', user_id).eq('guild_id', guild_id))
+    return result.data[0] if result.data else None
+
+
+@pytest.mark.asyncio
+async def test_removing_xp_from_unknown_user_creates_no_row(db):
+    assert await db.update_user_xp(1, -50, 10) == (0, 0, False)
+    assert await user_row(db, 1) is None
+
+
+@pytest.mark.asyncio
+async def test_buffered_removal_from_unknown_user_creates_no_row(db):
+    await db.start_xp_buffer()
+    assert await db.update_user_xp(1, -50, 10) == (0, 0, False)
+    assert await db.xp_buffer.flush() == 0
+    assert await user_row(db, 1) is None
+
+
+@pytest.mark.asyncio
+async def test_buffered_removal_to_zero_updates_existing_row(db):
+    await db.start_xp_buffer()
+    await db.update_user_xp(1, 50, 10)
+    await db.xp_buffer.flush()
+    await db.update_user_xp(1, -80, 10)
+    await db.xp_buffer.flush()
+    assert (await user_row(db, 1))['xp'] == 0
+
+    # A row loaded from the database is updated too, not just one the buffer created
+    db.xp_buffer._state.clear()
+    await db.update_user_xp(1, 30, 10)
+    await db.update_user_xp(1, -30, 10)
+    await db.xp_buffer.flush()
+    assert (await user_row(db, 1))['xp'] == 0
+
+
+@pytest.mark.asyncio
+async def test_lookup_creates_no_row(db):
+    assert await db.get_user_xp(1, 10) == 0
+    assert await user_row(db, 1) is None
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_rows_with_other_data(db):
+    for user_id in (1, 2, 3, 4):
+        await db.update_user_xp(user_id, 50, 10)
+        await db.update_user_xp(user_id, -50, 10)
+    await db.run_query(db.supabase.table('users').update({'total_messages': 12}).eq('user_id', 2))
+    await db.run_query(db.supabase.table('users').update({'daily_streak': 3}).eq('user_id', 3))
+    await db.run_query(db.supabase.table('users').update({'last_announced_level': 2}).eq('user_id', 4))
+
+    assert await db.prune_placeholder_users() == 1
+    assert await user_row(db, 1) is None
+    for user_id in (2, 3, 4):
+        assert await user_row(db, user_id) is not None
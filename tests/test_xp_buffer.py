@@ -0,0 +1,142 @@
+"""Tests for the write-behind XP buffer."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.database.xp_buffer import XPWriteBuffer
+from src.utils.level_engine import get_curve
+
+
+class FakeDB:
+    """Just enough of DatabaseManager for the buffer: users rows load behind a gate."""
+
+    def __init__(self, row):
+        self.row = row
+        self.supabase = MagicMock()
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.loading = asyncio.Event()
+
+    async def get_level_curve(self, guild_id):
+        return get_curve("custom")
+
+    async def run_query(self, builder):
+        self.loading.set()
+        await self.gate.wait()
+        return SimpleNamespace(data=[self.row] if self.row else [])
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "xp_journal.log")
+
+
+@pytest.mark.asyncio
+async def test_add_loads_stored_xp(journal):
+    buffer = XPWriteBuffer(FakeDB({"xp": 100, "level": 1}), journal_path=journal)
+    await buffer.start()
+    try:
+        xp, _, _ = await buffer.add(1, 10, 5)
+        assert xp == 110
+        assert buffer.peek(1, 5)[0] == 110
+    finally:
+        buffer._task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_discard_during_load_is_not_undone(journal):
+    db = FakeDB({"xp": 100, "level": 1})
+    buffer = XPWriteBuffer(db, journal_path=journal)
+    await buffer.start()
+    try:
+        db.gate.clear()
+        add = asyncio.create_task(buffer.add(1, 10, 5))
+        await db.loading.wait()
+
+        # The member leaves while their row is still loading
+        buffer.discard(1, 5)
+        db.gate.set()
+
+        assert await add == (0, 0, False)
+        assert buffer.peek(1, 5) is None
+        assert buffer.get_stats()["pending"] == 0
+
+        # Later events load the user again as normal
+        xp, _, _ = await buffer.add(1, 10, 5)
+        assert xp == 110
+    finally:
+        buffer._task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_discard_guild_during_load_is_not_undone(journal):
+    db = FakeDB({"xp": 100, "level": 1})
+    buffer = XPWriteBuffer(db, journal_path=journal)
+    await buffer.start()
+    try:
+        db.gate.clear()
+        add = asyncio.create_task(buffer.add(1, 10, 5))
+        await db.loading.wait()
+        buffer.discard_guild(5)
+        db.gate.set()
+
+        assert await add == (0, 0, False)
+        assert buffer.peek(1, 5) is None
+    finally:
+        buffer._task.cancel()
+
+
+def hold_buffer_upserts(db):
+    """Make the next users upsert (the buffer's flush) wait until the returned event is set."""
+    release = asyncio.Event()
+    waiting = asyncio.Event()
+    run_query = db.run_query
+
+    async def gated(builder):
+        if builder.table_name == 'users' and builder.op == 'upsert' and not waiting.is_set():
+            waiting.set()
+            await release.wait()
+        return await run_query(builder)
+
+    db.run_query = gated
+    return waiting, release
+
+
+@pytest.mark.asyncio
+async def test_reset_all_xp_waits_for_inflight_flush(db):
+    await db.start_xp_buffer()
+    await db.update_user_xp(1, 500, 10)
+
+    waiting, release = hold_buffer_upserts(db)
+    flush = asyncio.create_task(db.xp_buffer.flush())
+    await waiting.wait()
+
+    reset = asyncio.create_task(db.reset_all_xp(10))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(flush, reset)
+
+    result = await db.run_query(db.supabase.table('users').select('xp').eq('user_id', 1).eq('guild_id', 10))
+    assert [r['xp'] for r in result.data] == [0]
+
+
+@pytest.mark.asyncio
+async def test_set_user_xp_waits_for_inflight_flush(db):
+    await db.start_xp_buffer()
+    await db.update_user_xp(1, 500, 10)
+
+    waiting, release = hold_buffer_upserts(db)
+    flush = asyncio.create_task(db.xp_buffer.flush())
+    await waiting.wait()
+
+    set_xp = asyncio.create_task(db.set_user_xp(1, 20, 10))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(flush, set_xp)
+
+    assert await db.get_user_xp(1, 10) == 20
+    db.xp_buffer._state.clear()
+    assert await db.get_user_xp(1, 10) == 20